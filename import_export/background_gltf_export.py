@@ -0,0 +1,116 @@
+# Exports the main and collision GLBs at the same time in two background Blender processes.
+# Draco compression keeps one core busy per export, so running both side by side roughly halves
+# the wall time. Each process opens a snapshot of the current file and runs main() below:
+#
+#   blender -b snapshot.blend --python-exit-code 1 --python-expr \
+#       "import <add-on package>.import_export.background_gltf_export as worker; worker.main()" \
+#       -- --job main.json
+
+import bpy
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+from . import old_gltf_exporter
+
+# Lines of a failed worker's output repeated in the console
+LOG_TAIL_LINES = 20
+
+def save_snapshot(directory):
+    # A copy keeps the open file and its path untouched; relative paths are remapped to the copy.
+    # Images that were generated or painted but never saved or packed are not part of it.
+    snapshot_path = os.path.join(directory, "snapshot.blend")
+    bpy.ops.wm.save_as_mainfile(filepath=snapshot_path, copy=True, relative_remap=True)
+    return snapshot_path
+
+def worker_command(snapshot_path, job_path):
+    return [
+        bpy.app.binary_path, "-b", snapshot_path,
+        "--python-exit-code", "1",
+        "--python-expr", f"import {__name__} as worker; worker.main()",
+        "--", "--job", job_path,
+    ]
+
+def read_log_tail(log_path):
+    try:
+        with open(log_path, 'r', errors='replace') as f:
+            return f.read().splitlines()[-LOG_TAIL_LINES:]
+    except OSError:
+        return []
+
+def start_worker(directory, snapshot_path, name, objects, export_settings, use_cache):
+    job_path = os.path.join(directory, f"{name}.json")
+    with open(job_path, 'w') as f:
+        json.dump({
+            "name": name,
+            "objects": [obj.name for obj in objects],
+            "settings": export_settings,
+            "use_cache": use_cache,
+        }, f)
+    log_path = os.path.join(directory, f"{name}.log")
+    with open(log_path, 'w') as log:
+        process = subprocess.Popen(worker_command(snapshot_path, job_path), stdout=log, stderr=subprocess.STDOUT)
+    return {"name": name, "process": process, "log_path": log_path, "started_at": time.time()}
+
+def export_in_background(context, index, main_export_settings, collision_export_settings, use_cache=True):
+    jobs = [
+        ("main", old_gltf_exporter.main_export_objects(context, index), main_export_settings),
+        ("collisions", old_gltf_exporter.collision_export_objects(context, index), collision_export_settings),
+    ]
+    directory = tempfile.mkdtemp(prefix="vircadia_glb_export_")
+    workers = []
+    try:
+        snapshot_path = save_snapshot(directory)
+        for name, objects, export_settings in jobs:
+            print(f"Starting background export of the {name} GLB ({len(objects)} objects)...")
+            workers.append(start_worker(directory, snapshot_path, name, objects, export_settings, use_cache))
+
+        failed = []
+        for worker in workers:
+            returncode = worker["process"].wait()
+            seconds = time.time() - worker["started_at"]
+            if returncode == 0:
+                print(f"Background export of the {worker['name']} GLB finished in {seconds:.1f}s")
+                continue
+            failed.append(worker["name"])
+            print(f"Background export of the {worker['name']} GLB failed with exit code {returncode}:")
+            for line in read_log_tail(worker["log_path"]):
+                print(f"  {line}")
+        if failed:
+            raise RuntimeError(f"background export failed for: {', '.join(failed)}")
+        print(f"Successfully exported main world GLB to {main_export_settings['filepath']}")
+        print(f"Successfully exported collision objects GLB to {collision_export_settings['filepath']}")
+    finally:
+        # Don't leave workers running when something went wrong while starting them
+        for worker in workers:
+            if worker["process"].poll() is None:
+                worker["process"].kill()
+                worker["process"].wait()
+        shutil.rmtree(directory, ignore_errors=True)
+
+def parse_args(argv=None):
+    argv = sys.argv if argv is None else argv
+    argv = argv[argv.index("--") + 1:] if "--" in argv else []
+
+    parser = argparse.ArgumentParser(prog="background_gltf_export", description="Export one Vircadia GLB from a snapshot")
+    parser.add_argument("--job", required=True, help="Job file written by export_in_background")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    # Runs inside the worker process
+    args = parse_args(argv)
+    with open(args.job, 'r') as f:
+        job = json.load(f)
+
+    objects = [bpy.data.objects[name] for name in job["objects"] if name in bpy.data.objects]
+    missing = len(job["objects"]) - len(objects)
+    if missing:
+        print(f"Warning: {missing} objects are missing from the snapshot")
+
+    started_at = time.time()
+    old_gltf_exporter.export_object_list(objects, job["settings"], f"vircadia_export_{job['name']}", job["use_cache"])
+    print(f"Exported {job['settings']['filepath']} in {time.time() - started_at:.1f}s")
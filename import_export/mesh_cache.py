@@ -0,0 +1,200 @@
+import os
+import ctypes
+import hashlib
+import importlib
+import contextlib
+import numpy as np
+from .texture_cache import cache_dir, exporter_version, read_entry_files, write_entry_files, prune
+
+# Where the glTF exporter drives the Draco encoder library, newest layout first
+DRACO_MODULES = [
+    "io_scene_gltf2.io.exp.draco",
+    "io_scene_gltf2.io.exp.gltf2_io_draco_compression_extension",
+]
+
+# Encoder calls whose arguments decide the compressed output
+RECORDED_CALLS = {
+    "encoderSetCompressionLevel",
+    "encoderSetQuantizationBits",
+    "encoderSetIndices",
+    "encoderSetAttribute",
+}
+
+def find_draco_module():
+    for module_name in DRACO_MODULES:
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError:
+            continue
+        if hasattr(module, "cdll"):
+            return module
+    return None
+
+def update_digest(digest, value):
+    # False when the value can't be hashed reliably, which leaves that primitive uncached
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        data = bytes(value)
+    elif isinstance(value, np.ndarray):
+        data = np.ascontiguousarray(value).tobytes()
+    elif isinstance(value, ctypes._SimpleCData):
+        data = repr(value.value).encode()
+    elif value is None or isinstance(value, (bool, int, float, str)):
+        data = repr(value).encode()
+    else:
+        return False
+    digest.update(len(data).to_bytes(8, 'little'))
+    digest.update(data)
+    return True
+
+class InterceptedFunction:
+    # Calls go through hook(function, *args); restype/argtypes set by the exporter reach the real function
+
+    def __init__(self, function, hook):
+        object.__setattr__(self, "function", function)
+        object.__setattr__(self, "hook", hook)
+
+    def __call__(self, *args):
+        return self.hook(self.function, *args)
+
+    def __getattr__(self, name):
+        return getattr(self.function, name)
+
+    def __setattr__(self, name, value):
+        setattr(self.function, name, value)
+
+class CachingEncoderLibrary:
+    # Stands in for the Draco encoder library. It records what each encoder is given; when the same
+    # mesh data was compressed before, encoderEncode is skipped and the stored result is served.
+
+    def __init__(self, library, directory, salt, stats):
+        self._library = library
+        self._directory = directory
+        self._salt = salt
+        self._stats = stats
+        # Encoder handle -> what has been recorded and, on a hit, the stored result
+        self._encoders = {}
+        self._functions = {}
+
+    def __getattr__(self, name):
+        function = getattr(self._library, name)
+        # Looked up on the class, so a missing hook doesn't come back through __getattr__
+        hook = getattr(CachingEncoderLibrary, f"_hook_{name}", None)
+        if hook is None and name in RECORDED_CALLS:
+            hook = CachingEncoderLibrary._record
+        if hook is None:
+            return function
+        if name not in self._functions:
+            self._functions[name] = InterceptedFunction(function, lambda function, *args: hook(self, function, name, *args))
+        return self._functions[name]
+
+    def _hook_encoderCreate(self, function, name, *args):
+        encoder = function(*args)
+        digest = hashlib.sha1(self._salt.encode())
+        state = {"digest": digest, "cacheable": True, "hit": None, "miss": None}
+        for value in args:
+            state["cacheable"] &= update_digest(digest, value)
+        self._encoders[encoder] = state
+        return encoder
+
+    def _record(self, function, name, encoder, *args):
+        state = self._encoders.get(encoder)
+        if state is not None:
+            state["digest"].update(name.encode())
+            for value in args:
+                state["cacheable"] &= update_digest(state["digest"], value)
+        return function(encoder, *args)
+
+    def _hook_encoderEncode(self, function, name, encoder, *args):
+        state = self._encoders.get(encoder)
+        if state is None or not state["cacheable"]:
+            return function(encoder, *args)
+        for value in args:
+            update_digest(state["digest"], value)
+        key = state["digest"].hexdigest()
+        entry = read_entry_files(self._directory, key)
+        if entry is not None:
+            state["hit"] = entry
+            self._stats["reused"] += 1
+            return True
+        result = function(encoder, *args)
+        self._stats["encoded"] += 1
+        if result:
+            state["miss"] = {"key": key, "meta": {}, "data": None}
+        return result
+
+    def _hook_encoderGetByteLength(self, function, name, encoder):
+        state = self._encoders.get(encoder)
+        if state is not None and state["hit"] is not None:
+            return len(state["hit"][1])
+        return function(encoder)
+
+    def _hook_encoderCopy(self, function, name, encoder, buffer):
+        state = self._encoders.get(encoder)
+        if state is not None and state["hit"] is not None:
+            # The exporter hands over a bytes object of the right size for the library to fill
+            data = state["hit"][1]
+            ctypes.memmove(buffer, data, len(data))
+            return None
+        result = function(encoder, buffer)
+        if state is not None and state["miss"] is not None:
+            state["miss"]["data"] = bytes(buffer)
+        return result
+
+    def _hook_encoderGetEncodedVertexCount(self, function, name, encoder):
+        return self._encoded_count(function, name, encoder)
+
+    def _hook_encoderGetEncodedIndexCount(self, function, name, encoder):
+        return self._encoded_count(function, name, encoder)
+
+    def _encoded_count(self, function, name, encoder):
+        state = self._encoders.get(encoder)
+        if state is not None and state["hit"] is not None:
+            return state["hit"][0][name]
+        count = function(encoder)
+        if state is not None and state["miss"] is not None:
+            state["miss"]["meta"][name] = count
+        return count
+
+    def _hook_encoderRelease(self, function, name, encoder):
+        state = self._encoders.pop(encoder, None)
+        miss = state["miss"] if state is not None else None
+        if miss is not None and miss["data"] is not None:
+            write_entry_files(self._directory, miss["key"], miss["meta"], miss["data"])
+        return function(encoder)
+
+class CachingLibraryLoader:
+    # Replaces the exporter's ctypes.cdll so the Draco library it loads comes wrapped
+
+    def __init__(self, loader, directory, stats):
+        self.loader = loader
+        self.directory = directory
+        self.stats = stats
+
+    def LoadLibrary(self, path):
+        salt = f"{exporter_version()}|{os.path.basename(str(path))}"
+        return CachingEncoderLibrary(self.loader.LoadLibrary(path), self.directory, salt, self.stats)
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+@contextlib.contextmanager
+def cached_draco_encoding():
+    # While active, Draco compression of a mesh primitive is skipped when the exporter hands the
+    # encoder exactly the same vertex data and settings as an earlier export; the stored result is used
+    module = find_draco_module()
+    if module is None:
+        print("glTF Draco encoder not found, exporting without the mesh cache")
+        yield None
+        return
+
+    original_loader = module.cdll
+    directory = cache_dir("mesh_cache")
+    stats = {"reused": 0, "encoded": 0}
+    module.cdll = CachingLibraryLoader(original_loader, directory, stats)
+    try:
+        yield stats
+    finally:
+        module.cdll = original_loader
+        prune(directory)
+        if stats["reused"] or stats["encoded"]:
+            print(f"Mesh cache: {stats['reused']} primitives reused, {stats['encoded']} compressed")
@@ -1,106 +1,80 @@
 import bpy
 import os
 from .. import config
-from ..utils import visibility_utils
+from ..utils import visibility_utils, entity_index, export_presets
+from . import background_gltf_export, texture_cache, mesh_cache
 
 def load_export_settings(template_name):
-    preset_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates", template_name)
-    
-    settings = {}
-    with open(preset_path, 'r') as file:
-        for line in file:
-            if '=' in line:
-                key, value = line.split('=', 1)
-                key = key.strip().replace('op.', '')
-                value = value.strip().strip("'")
-                if value.lower() == 'true':
-                    value = True
-                elif value.lower() == 'false':
-                    value = False
-                elif value.isdigit():
-                    value = int(value)
-                elif value.replace('.', '').isdigit():
-                    value = float(value)
-                settings[key] = value
-    
-    # Remove non-export settings
-    settings = {k: v for k, v in settings.items() if k.startswith('export_') or k in ['use_selection', 'use_visible', 'use_active_collection', 'use_active_scene']}
-    
-    return settings
-
-def is_collision_object(obj):
-    collision_keywords = ["collision", "collider", "collides", "collisions", "colliders"]
-    return any(keyword in obj.name.lower() for keyword in collision_keywords)
-
-def is_collision_or_child_of_collision(obj):
-    if is_collision_object(obj):
-        return True
-    parent = obj.parent
-    while parent:
-        if is_collision_object(parent):
-            return True
-        parent = parent.parent
-    return False
-
-def is_keylight_object(obj):
-    return "keylight" in obj.name.lower()
-
-def is_sun_light(obj):
-    return obj.type == 'LIGHT' and obj.data.type == 'SUN'
-
-def is_other_light(obj):
-    return obj.type == 'LIGHT' and obj.data.type in ['POINT', 'SPOT', 'AREA']
+    # Copy of the cached, validated preset; safe to modify
+    return export_presets.get_preset(template_name).export_settings()
 
-# Updated to treat Zone and Web as custom properties
-def is_zone_object(obj):
-    # Check if the object has a custom property "type" with the value "Zone"
-    return obj.type == 'MESH' and obj.get('type') == 'Zone'
-
-def is_web_object(obj):
-    # Check if the object has a custom property "type" with the value "Web"
-    return obj.type == 'MESH' and obj.get('type') == 'Web'
-
-def vircadia_lightmap_data_exists():
-    return "vircadia_lightmapData" in bpy.data.objects
-
-def should_hide_in_main_export(obj):
+def should_hide_in_main_export(obj, index=None):
+    if index is None:
+        index = entity_index.classify_objects()
+    name = obj.name
     # Hide collision objects, keylight, sun, other lights, zones, and web objects
-    if is_collision_or_child_of_collision(obj) or is_keylight_object(obj) or is_sun_light(obj):
+    if name in index.collision_trees or name in index.keylights or name in index.suns:
         return True
-    if vircadia_lightmap_data_exists() and is_other_light(obj):
+    if index.lightmap_data is not None and name in index.other_lights:
         return True
     # Hide Zone and Web custom property objects
-    if is_zone_object(obj) or is_web_object(obj):
+    if name in index.zones or name in index.webs:
         return True
     return False
 
-def export_glb(context, filepath):
-    print(f"Starting GLB export to {filepath}")
-
-    # Store the original hide lightmaps state
-    original_hide_lightmaps = context.scene.vircadia_hide_lightmaps
-
-    # If hide lightmaps is False, set it to True
-    if not original_hide_lightmaps:
-        context.scene.vircadia_hide_lightmaps = True
-        print("Hide lightmaps set to True for export")
+# How the main and collision GLBs pick their objects
+EXPORT_MODES = [
+    ('SINGLE_PASS', "Object Lists", "Pass each export its own object list; viewport visibility is left alone"),
+    ('PARALLEL', "Background Processes", "Export both GLBs at once in two background Blender processes working on a saved snapshot"),
+    ('VISIBILITY', "Visibility Toggling", "Hide and unhide objects around each export (legacy behaviour)"),
+]
+
+def main_export_objects(context, index):
+    return [obj for obj in context.view_layer.objects if obj.type == 'EMPTY' or not should_hide_in_main_export(obj, index)]
+
+def collision_export_objects(context, index):
+    return [obj for obj in context.view_layer.objects if obj.type == 'EMPTY' or index.is_collision_tree(obj)]
+
+def run_gltf_export(export_settings, use_cache=True):
+    if not use_cache:
+        bpy.ops.export_scene.gltf(**export_settings)
+        return
+    # Unchanged textures and Draco-compressed meshes are taken from earlier exports
+    with texture_cache.cached_image_encoding(), mesh_cache.cached_draco_encoding():
+        bpy.ops.export_scene.gltf(**export_settings)
+
+def export_object_list(objects, export_settings, collection_name, use_cache=True):
+    # Export exactly these objects: they are gathered in a temporary collection handed to the exporter
+    collection = bpy.data.collections.new(collection_name)
+    # Objects disabled in viewports are left out of the evaluated scene, so enable those for the export
+    disabled = [obj for obj in objects if obj.hide_viewport]
+    try:
+        for obj in objects:
+            collection.objects.link(obj)
+        for obj in disabled:
+            obj.hide_viewport = False
+        settings = dict(export_settings)
+        settings.update(collection=collection.name, use_visible=False, use_selection=False, use_active_collection=False)
+        run_gltf_export(settings, use_cache)
+    finally:
+        for obj in disabled:
+            obj.hide_viewport = True
+        bpy.data.collections.remove(collection)
 
-    directory = os.path.dirname(filepath)
-    filename = config.DEFAULT_GLB_EXPORT_FILENAME
-    filepath = os.path.join(directory, filename)
-    print(f"Full export path: {filepath}")
+def export_by_object_lists(context, index, main_export_settings, collection_export_settings, use_cache=True):
+    # Both object lists come from one classification; no object is hidden or shown
+    main_objects = main_export_objects(context, index)
+    collision_objects = collision_export_objects(context, index)
 
-    # Load export settings for main export
-    main_export_settings = load_export_settings("Vircadia_GLTF.py")
-    main_export_settings['filepath'] = filepath
-    print(f"Main export settings: {main_export_settings}")
+    print(f"Exporting main world GLB ({len(main_objects)} objects)...")
+    export_object_list(main_objects, main_export_settings, "vircadia_export_main", use_cache)
+    print(f"Successfully exported main world GLB to {main_export_settings['filepath']}")
 
-    # Load export settings for collision export
-    collision_export_settings = load_export_settings("Vircadia_Collisions.py")
-    collision_filepath = filepath.replace('.glb', '_collisions.glb')
-    collision_export_settings['filepath'] = collision_filepath
-    print(f"Collision export settings: {collision_export_settings}")
+    print(f"Exporting collision objects GLB ({len(collision_objects)} objects)...")
+    export_object_list(collision_objects, collection_export_settings, "vircadia_export_collisions", use_cache)
+    print(f"Successfully exported collision objects GLB to {collection_export_settings['filepath']}")
 
+def export_by_visibility(context, index, main_export_settings, collision_export_settings, use_cache=True):
     # Store original visibility states
     original_lod_state = context.scene.vircadia_hide_lod_levels
     original_collision_state = context.scene.vircadia_hide_collisions
@@ -110,15 +84,15 @@ def export_glb(context, filepath):
     context.scene.vircadia_hide_lod_levels = False
     context.scene.vircadia_hide_collisions = False
     context.scene.vircadia_hide_armatures = False
-    visibility_utils.update_visibility(context.scene, context)
+    visibility_utils.update_visibility(context.scene, context, index)
 
     hidden_objects = visibility_utils.temporarily_unhide_objects(context)
 
     try:
         print("Exporting main world GLB...")
         # Hide objects based on the should_hide_in_main_export function
-        for obj in bpy.data.objects:
-            if obj.type != 'EMPTY' and should_hide_in_main_export(obj):
+        for obj in index.objects:
+            if obj.type != 'EMPTY' and should_hide_in_main_export(obj, index):
                 try:
                     if obj.name in context.view_layer.objects:
                         obj.hide_set(True)
@@ -127,16 +101,16 @@ def export_glb(context, filepath):
                 except Exception as e:
                     print(f"Warning: Could not hide object '{obj.name}': {str(e)}")
 
-        bpy.ops.export_scene.gltf(**main_export_settings)
-        print(f"Successfully exported main world GLB to {filepath}")
+        run_gltf_export(main_export_settings, use_cache)
+        print(f"Successfully exported main world GLB to {main_export_settings['filepath']}")
 
         print("Exporting collision objects GLB...")
         # Hide non-collision objects and unhide collision objects and their children
-        for obj in bpy.data.objects:
+        for obj in index.objects:
             if obj.type != 'EMPTY':
                 try:
                     if obj.name in context.view_layer.objects:
-                        if is_collision_or_child_of_collision(obj):
+                        if index.is_collision_tree(obj):
                             obj.hide_set(False)
                         else:
                             obj.hide_set(True)
@@ -145,21 +119,58 @@ def export_glb(context, filepath):
                 except Exception as e:
                     print(f"Warning: Could not change visibility of object '{obj.name}': {str(e)}")
 
-        bpy.ops.export_scene.gltf(**collision_export_settings)
-        print(f"Successfully exported collision objects GLB to {collision_filepath}")
-
-        return True
-    except Exception as e:
-        print(f"Error exporting GLB: {str(e)}")
-        return False
+        run_gltf_export(collision_export_settings, use_cache)
+        print(f"Successfully exported collision objects GLB to {collision_export_settings['filepath']}")
     finally:
         # Restore original visibility states
         context.scene.vircadia_hide_lod_levels = original_lod_state
         context.scene.vircadia_hide_collisions = original_collision_state
         context.scene.vircadia_hide_armatures = original_armature_state
-        visibility_utils.update_visibility(context.scene, context)
+        visibility_utils.update_visibility(context.scene, context, index)
         visibility_utils.restore_hidden_objects(hidden_objects)
 
+def export_glb(context, filepath, mode='SINGLE_PASS', preset=export_presets.MAIN_PRESET, use_cache=True):
+    print(f"Starting GLB export to {filepath}")
+
+    # Store the original hide lightmaps state
+    original_hide_lightmaps = context.scene.vircadia_hide_lightmaps
+
+    # If hide lightmaps is False, set it to True
+    if not original_hide_lightmaps:
+        context.scene.vircadia_hide_lightmaps = True
+        print("Hide lightmaps set to True for export")
+
+    directory = os.path.dirname(filepath)
+    filename = config.DEFAULT_GLB_EXPORT_FILENAME
+    filepath = os.path.join(directory, filename)
+    print(f"Full export path: {filepath}")
+
+    # Load export settings for main export
+    main_export_settings = load_export_settings(preset)
+    main_export_settings['filepath'] = filepath
+    print(f"Main export settings: {main_export_settings}")
+
+    # Load export settings for collision export
+    collision_export_settings = load_export_settings(export_presets.COLLISION_PRESET)
+    collision_filepath = filepath.replace('.glb', '_collisions.glb')
+    collision_export_settings['filepath'] = collision_filepath
+    print(f"Collision export settings: {collision_export_settings}")
+
+    # Classify every object once; both exports share it
+    index = entity_index.classify_objects()
+
+    try:
+        if mode == 'VISIBILITY':
+            export_by_visibility(context, index, main_export_settings, collision_export_settings, use_cache)
+        elif mode == 'PARALLEL':
+            background_gltf_export.export_in_background(context, index, main_export_settings, collision_export_settings, use_cache)
+        else:
+            export_by_object_lists(context, index, main_export_settings, collision_export_settings, use_cache)
+        return True
+    except Exception as e:
+        print(f"Error exporting GLB: {str(e)}")
+        return False
+    finally:
         # Restore the original hide lightmaps state
         context.scene.vircadia_hide_lightmaps = original_hide_lightmaps
         print(f"Hide lightmaps reset to its original state: {original_hide_lightmaps}")
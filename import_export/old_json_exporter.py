@@ -1,62 +1,74 @@
 import bpy
 import json
+import gzip
 import os
 import uuid
 from urllib.parse import urljoin
 from .. import config
-from ..utils import coordinate_utils, property_utils, visibility_utils
-
-class VircadiaJSONEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, float):
-            return f"{obj:.16f}"
-        return super().default(obj)
+from ..utils import coordinate_utils, property_utils, visibility_utils, template_cache, json_stream, entity_index
 
 def generate_random_uuid():
     return str(uuid.uuid4())
 
-def replace_placeholder_uuid(data):
-    if isinstance(data, dict):
-        for key, value in data.items():
-            if isinstance(value, str) and value == "{10000000-0000-0000-0000-000000000000}":
-                new_uuid = generate_random_uuid()
-                data[key] = "{" + new_uuid + "}"
-            elif isinstance(value, (dict, list)):
-                replace_placeholder_uuid(value)
-    elif isinstance(data, list):
-        for i, item in enumerate(data):
-            if isinstance(item, str) and item == "{10000000-0000-0000-0000-000000000000}":
-                new_uuid = generate_random_uuid()
-                data[i] = "{" + new_uuid + "}"
-            elif isinstance(item, (dict, list)):
-                replace_placeholder_uuid(item)
-
-def update_template_properties(template, custom_props):
+# Template value swapped for a fresh UUID in every exported entity
+PLACEHOLDER_UUID = "{10000000-0000-0000-0000-000000000000}"
+
+def find_placeholder_paths(data, path=()):
+    # Key/index paths to every placeholder UUID, recorded once per template file
+    items = data.items() if isinstance(data, dict) else enumerate(data)
+    paths = []
+    for key, value in items:
+        if isinstance(value, str) and value == PLACEHOLDER_UUID:
+            paths.append(path + (key,))
+        elif isinstance(value, (dict, list)):
+            paths.extend(find_placeholder_paths(value, path + (key,)))
+    return paths
+
+def compile_entity_template(template):
+    return find_placeholder_paths(template["Entities"][0])
+
+def replace_placeholders_at(entity, placeholder_paths):
+    for path in placeholder_paths:
+        container = entity
+        try:
+            for step in path[:-1]:
+                container = container[step]
+            if container[path[-1]] == PLACEHOLDER_UUID:
+                container[path[-1]] = "{" + generate_random_uuid() + "}"
+        except (KeyError, IndexError, TypeError):
+            # The exporter replaced this part of the entity, so the placeholder is gone with it
+            continue
+
+def build_suffix_index(custom_props):
+    # Every tail after an underscore in every custom property name, so "keyLight_color_red" answers
+    # "red", "color_red" and "keyLight_color_red". The first property wins, as in a linear scan.
+    index = {}
+    for custom_key in custom_props:
+        start = custom_key.find("_")
+        while start != -1:
+            index.setdefault(custom_key[start + 1:], custom_key)
+            start = custom_key.find("_", start + 1)
+    return index
+
+def update_template_properties(template, custom_props, suffix_index=None):
+    # One pass over the entity's own fields; each is matched by exact name, then by suffix
+    if suffix_index is None:
+        suffix_index = build_suffix_index(custom_props)
     for key, value in template.items():
         if isinstance(value, dict):
-            update_template_properties(value, custom_props)
-        else:
-            prop_key = f"{key}"
-            if prop_key in custom_props:
-                if "Mode" in prop_key and prop_key.lower() != "model":
-                    template[key] = "enabled" if custom_props[prop_key] else "disabled"
-                else:
-                    # Only update the property if it's not already set
-                    if template[key] == "" or template[key] is None:
-                        template[key] = custom_props[prop_key]
-            elif key == "vircadia_script":
-                # Always update vircadia_script if it exists in custom_props
-                if "vircadia_script" in custom_props:
-                    template[key] = custom_props["vircadia_script"]
-            else:
-                for custom_key in custom_props:
-                    if custom_key.endswith(f"_{key}"):
-                        if "Mode" in custom_key and custom_key.lower() != "model":
-                            template[key] = "enabled" if custom_props[custom_key] else "disabled"
-                        else:
-                            if template[key] == "" or template[key] is None:
-                                template[key] = custom_props[custom_key]
-                        break
+            update_template_properties(value, custom_props, suffix_index)
+            continue
+        prop_key = key if key in custom_props else suffix_index.get(key)
+        if prop_key is None:
+            continue
+        if "Mode" in prop_key and prop_key.lower() != "model":
+            template[key] = "enabled" if custom_props[prop_key] else "disabled"
+        # Only update the property if it's not already set
+        elif template[key] == "" or template[key] is None:
+            custom_value = custom_props[prop_key]
+            if custom_value == PLACEHOLDER_UUID:
+                custom_value = "{" + generate_random_uuid() + "}"
+            template[key] = custom_value
 
 def get_vircadia_entity_data(obj, content_path):
     entity_type = obj.get("type", "Entity")
@@ -64,6 +76,7 @@ def get_vircadia_entity_data(obj, content_path):
     # Load the appropriate template
     template = load_entity_template(entity_type.lower())
     entity_data = template["Entities"][0]
+    placeholder_paths = get_template_placeholder_paths(entity_type.lower())
 
     # Update basic properties
     entity_data["id"] = "{" + generate_random_uuid() + "}"
@@ -140,6 +153,7 @@ def get_vircadia_entity_data(obj, content_path):
 
     # Update template properties with custom properties
     update_template_properties(entity_data, custom_props)
+    replace_placeholders_at(entity_data, placeholder_paths)
 
     # Special handling for zone entities
     if entity_type.lower() == "zone":
@@ -175,9 +189,7 @@ def get_vircadia_entity_data(obj, content_path):
 
     return entity_data
 
-def load_entity_template(entity_type):
-    addon_path = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
-    
+def entity_template_filename(entity_type):
     # Map entity types to their corresponding template files
     template_map = {
         "box": "shape",
@@ -188,39 +200,66 @@ def load_entity_template(entity_type):
     
     # Get the correct template name, defaulting to the entity type if not in the map
     template_name = template_map.get(entity_type.lower(), entity_type.lower())
-    
-    template_path = os.path.join(addon_path, "templates", f"template_{template_name}.json")
-    
+    return f"template_{template_name}.json"
+
+def load_entity_template(entity_type):
+    # Parsed once per process and copied per entity, instead of re-reading the file every time
     try:
-        with open(template_path, 'r') as f:
-            return json.load(f)
+        return template_cache.load_template(entity_template_filename(entity_type))
     except FileNotFoundError:
         print(f"Warning: Template file not found for entity type '{entity_type}'. Using generic entity template.")
         # Provide a basic generic template as fallback
         return {"Entities": [{"type": entity_type}]}
 
-def has_model_entities():
-    collision_keywords = ["collider", "collision", "collides", "colliders", "collisions"]
-    
-    def is_collision_object(obj):
-        return any(keyword in obj.name.lower() for keyword in collision_keywords)
-    
-    def is_excluded_entity(obj):
-        excluded_types = ["zone", "web", "light", "image", "text", "shape"]  # Add more types here as needed
-        return obj.get("type", "").lower() in excluded_types
-    
-    return any(
-        obj.type == 'MESH' and
-        not is_excluded_entity(obj) and
-        not is_collision_object(obj)
-        for obj in bpy.data.objects
-    )
-
-def has_collision_objects():
-    collision_keywords = ["collider", "collision", "collides", "colliders", "collisions"]
-    return any(any(keyword in obj.name.lower() for keyword in collision_keywords) for obj in bpy.data.objects)
-
-def export_vircadia_json(context, filepath):
+def get_template_placeholder_paths(entity_type):
+    try:
+        return template_cache.get_compiled(entity_template_filename(entity_type), compile_entity_template)
+    except FileNotFoundError:
+        return []
+
+def has_model_entities(index=None):
+    # Any mesh that is not a collision object or a non-model entity ends up in the GLB
+    if index is None:
+        index = entity_index.classify_objects()
+    return index.has_models
+
+def has_collision_objects(index=None):
+    if index is None:
+        index = entity_index.classify_objects()
+    return bool(index.collisions)
+
+def iter_scene_entities(content_path, index):
+    # Entities are built one at a time as the writer asks for them
+    for obj in index.entities:
+        entity_type = obj["type"].lower()
+        if entity_type not in ["light", "model"]:
+            yield get_vircadia_entity_data(obj, content_path)
+
+    # Check if there are any Model entities in the Blender scene
+    if has_model_entities(index):
+        # Add the Model entity from the template
+        model_template = load_entity_template("model")
+        model_entity = model_template["Entities"][0]
+        replace_placeholders_at(model_entity, get_template_placeholder_paths("model"))
+        model_entity["modelURL"] = urljoin(content_path, config.DEFAULT_GLB_EXPORT_FILENAME)
+        yield model_entity
+
+    # Check if we need to add a collision model
+    if has_collision_objects(index):
+        collision_model_template = load_entity_template("model")
+        collision_model_entity = collision_model_template["Entities"][0]
+        replace_placeholders_at(collision_model_entity, get_template_placeholder_paths("model"))
+        collision_model_entity["modelURL"] = urljoin(content_path, config.DEFAULT_GLB_EXPORT_FILENAME.replace('.glb', '_collisions.glb'))
+        collision_model_entity["collisionless"] = False
+        collision_model_entity["ignoreForCollisions"] = False
+        collision_model_entity["visible"] = False
+        yield collision_model_entity
+
+def export_vircadia_json(context, filepath, compact=True, use_gzip=False, float_precision=6):
+    # compact drops indentation, use_gzip writes a .json.gz as the domain server stores it,
+    # float_precision is the number of decimals kept (None keeps full precision).
+    # Returns the path actually written.
+
     # First, trigger the "Force Update Properties" operator
     bpy.ops.vircadia.force_update()
     print("Forced update of properties before export")
@@ -235,58 +274,48 @@ def export_vircadia_json(context, filepath):
     if not content_path.endswith('/'):
         content_path += '/'
 
-    scene_data = {
+    if use_gzip and not filepath.endswith(".gz"):
+        filepath += ".gz"
+
+    header = {
         "DataVersion": 0,
-        "Entities": [],
         "Id": "{" + generate_random_uuid() + "}",
         "Version": 133
     }
 
+    # Classify every object once for the whole export
+    index = entity_index.classify_objects()
+
     # Temporarily unhide hidden objects for export
     hidden_objects = visibility_utils.temporarily_unhide_objects(context)
 
+    # Entities are streamed into a temporary file, so a failed export never leaves half a file behind
+    temp_path = filepath + ".tmp"
     try:
-        # Iterate over all objects in the scene
-        for obj in bpy.data.objects:
-            if "type" in obj:
-                entity_type = obj["type"].lower()
-                if entity_type not in ["light", "model"]:
-                    entity_data = get_vircadia_entity_data(obj, content_path)
-                    scene_data["Entities"].append(entity_data)
-
-        # Check if there are any Model entities in the Blender scene
-        if has_model_entities():
-            # Add the Model entity from the template
-            model_template = load_entity_template("model")
-            model_entity = model_template["Entities"][0]
-            replace_placeholder_uuid(model_entity)
-            model_entity["modelURL"] = urljoin(content_path, config.DEFAULT_GLB_EXPORT_FILENAME)
-            scene_data["Entities"].append(model_entity)
-
-        # Check if we need to add a collision model
-        if has_collision_objects():
-            collision_model_template = load_entity_template("model")
-            collision_model_entity = collision_model_template["Entities"][0]
-            replace_placeholder_uuid(collision_model_entity)
-            collision_model_entity["modelURL"] = urljoin(content_path, config.DEFAULT_GLB_EXPORT_FILENAME.replace('.glb', '_collisions.glb'))
-            collision_model_entity["collisionless"] = False
-            collision_model_entity["ignoreForCollisions"] = False
-            collision_model_entity["visible"] = False
-            scene_data["Entities"].append(collision_model_entity)
-
-        # Replace placeholder UUIDs in the scene data
-        replace_placeholder_uuid(scene_data)
-
         # Ensure the directory for the output file exists
         os.makedirs(os.path.dirname(filepath), exist_ok=True)
 
-        # Write the scene data to the specified JSON file
-        with open(filepath, 'w') as f:
-            json.dump(scene_data, f, cls=VircadiaJSONEncoder, indent=4)
-
-        print(f"Vircadia JSON exported successfully to {filepath}")
+        if use_gzip:
+            f = gzip.open(temp_path, 'wt', encoding='utf-8')
+        else:
+            f = open(temp_path, 'w', encoding='utf-8')
+        with f:
+            count = json_stream.write_array_document(
+                f,
+                "Entities",
+                iter_scene_entities(content_path, index),
+                header=header,
+                indent=None if compact else 4,
+                float_precision=float_precision
+            )
+        os.replace(temp_path, filepath)
+
+        print(f"Vircadia JSON exported successfully to {filepath} ({count} entities)")
+        return filepath
 
     finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
         # Restore the visibility of any objects that were hidden before the export
         visibility_utils.restore_hidden_objects(hidden_objects)
         
@@ -1,24 +1,56 @@
 import bpy
 import json
+import gzip
 import os
 import logging
-from ..utils import coordinate_utils, property_utils, world_setup, object_creation, collection_utils, error_handling
+from ..utils import coordinate_utils, property_utils, world_setup, object_creation, collection_utils, error_handling, json_stream, primitive_cache
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+def open_json_file(file_path):
+    # Exports may be gzipped like the domain server's models.json.gz, so go by content, not extension
+    with open(file_path, 'rb') as f:
+        compressed = f.read(2) == GZIP_MAGIC
+    if compressed:
+        return gzip.open(file_path, 'rt', encoding='utf-8')
+    return open(file_path, 'r')
 
 def load_json(file_path):
     try:
-        with open(file_path, 'r') as f:
+        with open_json_file(file_path) as f:
             return json.load(f)
     except PermissionError:
         error_handling.log_error(f"Permission denied when trying to read {file_path}")
     except FileNotFoundError:
         error_handling.log_error(f"File not found: {file_path}")
-    except json.JSONDecodeError:
+    except (json.JSONDecodeError, gzip.BadGzipFile, EOFError):
         error_handling.log_error(f"Invalid JSON file: {file_path}")
     return None
 
-def import_entities(data, json_directory):
+def iter_entities(file_path):
+    # Stream the "Entities" array one entity at a time, so large domains never sit in memory whole.
+    # Errors are logged and raised: a file that breaks off halfway must not look like a short one.
+    try:
+        with open_json_file(file_path) as f:
+            yield from json_stream.iter_array_items(f, "Entities")
+    except PermissionError:
+        error_handling.log_error(f"Permission denied when trying to read {file_path}")
+        raise
+    except FileNotFoundError:
+        error_handling.log_error(f"File not found: {file_path}")
+        raise
+    except (json.JSONDecodeError, gzip.BadGzipFile, EOFError):
+        error_handling.log_error(f"Invalid JSON file: {file_path}")
+        raise
+
+def import_entities(entities, json_directory, created=None):
+    # entities: any iterable of entity dicts, e.g. iter_entities(file_path) or data["Entities"]
+    # created: optional list that receives every object as soon as it exists, so a caller can
+    # remove them again if the entities stop partway
     zone_objs = []
-    for entity in data.get("Entities", []):
+    # Type collections are looked up once and reused for every entity
+    collections = {}
+    for entity in entities:
         logging.info(f"Processing entity: {entity.get('name', 'Unnamed')} (Type: {entity.get('type', 'Unknown')})")
         
         # Ensure "type" has only the first letter capitalized
@@ -34,8 +66,10 @@ def import_entities(data, json_directory):
             entity["shape"] = "Shape"
 
         try:
-            obj = object_creation.create_blender_object(entity)
+            obj = object_creation.create_blender_object(entity, collections)
             if obj is not None:
+                if created is not None:
+                    created.append(obj)
                 logging.info(f"Created Blender object: {obj.name}")
                 
                 # Special handling for zone objects
@@ -65,7 +99,7 @@ def import_entities(data, json_directory):
 
                 # Move the object to the appropriate collection
                 try:
-                    zone_collection = move_to_type_collection(obj, entity.get("type", "Unknown"))
+                    zone_collection = move_to_type_collection(obj, entity.get("type", "Unknown"), collections)
                     logging.info(f"Moved {obj.name} to collection {zone_collection.name}")
                 except Exception as coll_error:
                     logging.error(f"Error moving {obj.name} to collection: {str(coll_error)}")
@@ -76,11 +110,30 @@ def import_entities(data, json_directory):
             logging.error(f"Error creating object for entity {entity.get('name', 'Unnamed')}: {str(obj_error)}")
             error_handling.log_import_error(entity)
 
+    # Objects are created without operators, so the view layer is only evaluated once here
+    bpy.context.view_layer.update()
     return zone_objs
 
-def move_to_type_collection(obj, entity_type):
+def remove_objects(objects):
+    for obj in objects:
+        data = obj.data
+        bpy.data.objects.remove(obj, do_unlink=True)
+        # Shared primitives stay, other users may still need them
+        if isinstance(data, bpy.types.Mesh) and data.users == 0 and not primitive_cache.is_shared_primitive(data):
+            bpy.data.meshes.remove(data)
+
+def move_to_type_collection(obj, entity_type, collections=None):
     # Get or create the collection for this entity type
-    collection = collection_utils.get_or_create_collection(entity_type)
+    if collections is None:
+        collection = collection_utils.get_or_create_collection(entity_type)
+    else:
+        collection = collections.get(entity_type.lower())
+        if collection is None:
+            collection = collections[entity_type.lower()] = collection_utils.get_or_create_collection(entity_type)
+
+    # Freshly created objects are usually in the right place already
+    if list(obj.users_collection) == [collection]:
+        return collection
     
     # Remove the object from all other collections
     for coll in obj.users_collection:
@@ -93,15 +146,19 @@ def move_to_type_collection(obj, entity_type):
 
 def process_vircadia_json(file_path):
     logging.info(f"Starting to process Vircadia JSON: {file_path}")
-    data = load_json(file_path)
-    if data is None:
-        logging.error("Failed to load JSON data")
-        return
-
     json_directory = os.path.dirname(os.path.normpath(file_path))
     logging.info(f"JSON directory: {json_directory}")
 
-    zone_objs = import_entities(data, json_directory)
+    # One pass: objects are created while the file is still being read. A file that turns out to be
+    # corrupt partway must not leave a partial import behind, so what was created is removed again.
+    created = []
+    try:
+        zone_objs = import_entities(iter_entities(file_path), json_directory, created)
+    except Exception:
+        remove_objects(created)
+        collection_utils.remove_empty_collections()
+        raise
+    logging.info(f"Imported {len(created)} entities")
     logging.info(f"Imported {len(zone_objs)} zone objects")
 
     for zone_obj in zone_objs:
@@ -0,0 +1,217 @@
+import bpy
+import os
+import enum
+import json
+import hashlib
+import tempfile
+import importlib
+import contextlib
+import numpy as np
+
+# Where the glTF exporter defines ExportImage, newest layout first
+ENCODER_MODULES = [
+    "io_scene_gltf2.blender.exp.material.encode_image",
+    "io_scene_gltf2.blender.exp.gltf2_blender_image",
+]
+
+# Export settings that change encoded image bytes
+SETTINGS_PREFIXES = ("gltf_image", "gltf_jpeg", "gltf_webp", "gltf_add_webp")
+
+# Least recently used entries are removed past this size
+MAX_CACHE_BYTES = 1 << 30
+
+# (path, mtime, size) -> sha1 of the file, so unchanged files are read once per session
+_file_hashes = {}
+
+def cache_dir(name="texture_cache"):
+    try:
+        directory = bpy.utils.extension_path_user(__package__.rpartition(".")[0], path=name, create=True)
+    except (AttributeError, ValueError):
+        # Not installed as an extension
+        directory = os.path.join(tempfile.gettempdir(), f"vircadia_{name}")
+        os.makedirs(directory, exist_ok=True)
+    return directory
+
+def find_export_image_class():
+    for module_name in ENCODER_MODULES:
+        try:
+            return importlib.import_module(module_name).ExportImage
+        except (ImportError, AttributeError):
+            continue
+    return None
+
+def exporter_version():
+    try:
+        return ".".join(str(part) for part in importlib.import_module("io_scene_gltf2").bl_info["version"])
+    except (ImportError, AttributeError, KeyError):
+        return bpy.app.version_string
+
+def file_hash(path):
+    stat = os.stat(path)
+    memo_key = (path, stat.st_mtime_ns, stat.st_size)
+    digest = _file_hashes.get(memo_key)
+    if digest is None:
+        sha1 = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                sha1.update(chunk)
+        digest = sha1.hexdigest()
+        _file_hashes[memo_key] = digest
+    return digest
+
+def image_content_hash(image):
+    # Hash of what the exporter will read: the packed or saved file when it's current, else the pixels
+    if image.packed_file is not None and not image.is_dirty:
+        return hashlib.sha1(image.packed_file.data).hexdigest()
+    if image.source == 'FILE' and not image.is_dirty:
+        path = bpy.path.abspath(image.filepath, library=image.library)
+        if os.path.isfile(path):
+            return file_hash(path)
+    pixels = np.empty(len(image.pixels), dtype=np.float32)
+    image.pixels.foreach_get(pixels)
+    return hashlib.sha1(pixels.tobytes()).hexdigest()
+
+def image_key(image, image_hashes):
+    pointer = image.as_pointer()
+    if pointer not in image_hashes:
+        image_hashes[pointer] = "|".join((
+            image_content_hash(image),
+            f"{image.size[0]}x{image.size[1]}",
+            image.colorspace_settings.name,
+            image.alpha_mode,
+        ))
+    return image_hashes[pointer]
+
+def value_key(value, image_hashes):
+    # Stable text for the state an ExportImage encodes from, or None when some of it can't be
+    # described (computed channels, raw arrays); those images are always encoded
+    if isinstance(value, bpy.types.Image):
+        return f"image({image_key(value, image_hashes)})"
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return repr(value)
+    if isinstance(value, enum.Enum):
+        return str(value)
+    if isinstance(value, (list, tuple)):
+        parts = [value_key(item, image_hashes) for item in value]
+        return None if None in parts else "[" + ",".join(parts) + "]"
+    if isinstance(value, dict):
+        parts = []
+        for key in sorted(value, key=str):
+            item = value_key(value[key], image_hashes)
+            if item is None:
+                return None
+            parts.append(f"{key}:{item}")
+        return "{" + ",".join(parts) + "}"
+    if hasattr(value, "__dict__") and not callable(value):
+        fields = value_key(vars(value), image_hashes)
+        return None if fields is None else type(value).__name__ + fields
+    return None
+
+def encode_key(export_image, mime_type, export_settings, version, image_hashes):
+    state = value_key(export_image, image_hashes)
+    if state is None:
+        return None
+    settings = {
+        key: value for key, value in export_settings.items()
+        if key.startswith(SETTINGS_PREFIXES) and isinstance(value, (bool, int, float, str))
+    }
+    text = json.dumps([version, mime_type, settings, state], sort_keys=True)
+    return hashlib.sha1(text.encode()).hexdigest()
+
+def read_entry_files(directory, key):
+    # (meta, data) of a stored entry, or None; reading marks it as recently used for pruning
+    data_path = os.path.join(directory, key + ".bin")
+    meta_path = os.path.join(directory, key + ".json")
+    try:
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        with open(data_path, 'rb') as f:
+            data = f.read()
+        os.utime(data_path)
+    except (OSError, ValueError):
+        return None
+    return meta, data
+
+def read_entry(directory, key):
+    entry = read_entry_files(directory, key)
+    if entry is None:
+        return None
+    meta, data = entry
+    return (data, *meta["extra"]) if meta["tuple"] else data
+
+def write_entry(directory, key, result):
+    # encode() returns the bytes, or the bytes plus a few flags depending on the exporter version
+    data, extra = (result[0], list(result[1:])) if isinstance(result, tuple) else (result, [])
+    if not isinstance(data, bytes):
+        return
+    write_entry_files(directory, key, {"tuple": isinstance(result, tuple), "extra": extra}, data)
+
+def write_entry_files(directory, key, meta, data):
+    # <key>.json holds meta and <key>.bin the data. Both are written to temporary names and renamed,
+    # so concurrent exports never read half an entry; the metadata goes first because readers only
+    # trust entries whose data file exists.
+    try:
+        meta = json.dumps(meta)
+    except TypeError:
+        return
+    try:
+        for suffix, content, mode in ((".json", meta, 'w'), (".bin", data, 'wb')):
+            path = os.path.join(directory, key + suffix)
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, mode) as f:
+                f.write(content)
+            os.replace(temp_path, path)
+    except OSError as e:
+        print(f"Could not write cache entry {key}: {str(e)}")
+
+def prune(directory, max_bytes=MAX_CACHE_BYTES):
+    entries = []
+    for filename in os.listdir(directory):
+        if filename.endswith(".bin"):
+            stat = os.stat(os.path.join(directory, filename))
+            entries.append((stat.st_mtime, stat.st_size, filename[:-4]))
+    total = sum(size for _, size, _ in entries)
+    for _, size, key in sorted(entries):
+        if total <= max_bytes:
+            break
+        for suffix in (".bin", ".json"):
+            with contextlib.suppress(OSError):
+                os.remove(os.path.join(directory, key + suffix))
+        total -= size
+
+@contextlib.contextmanager
+def cached_image_encoding():
+    # While active, the glTF exporter reuses the encoded bytes of any texture it has encoded before
+    # with the same pixels and image settings, instead of encoding it again
+    export_image = find_export_image_class()
+    if export_image is None:
+        print("glTF image encoder not found, exporting without the texture cache")
+        yield None
+        return
+
+    original_encode = export_image.encode
+    directory = cache_dir()
+    version = exporter_version()
+    image_hashes = {}
+    stats = {"reused": 0, "encoded": 0}
+
+    def encode(self, mime_type, export_settings, *args, **kwargs):
+        key = None if args or kwargs else encode_key(self, mime_type, export_settings, version, image_hashes)
+        if key is not None:
+            result = read_entry(directory, key)
+            if result is not None:
+                stats["reused"] += 1
+                return result
+        result = original_encode(self, mime_type, export_settings, *args, **kwargs)
+        stats["encoded"] += 1
+        if key is not None:
+            write_entry(directory, key, result)
+        return result
+
+    export_image.encode = encode
+    try:
+        yield stats
+    finally:
+        export_image.encode = original_encode
+        prune(directory)
+        print(f"Texture cache: {stats['reused']} textures reused, {stats['encoded']} encoded")
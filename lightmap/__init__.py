@@ -1,12 +1,11 @@
 from .lightmap_utils import *
 from .generateLightmaps import generate_lightmaps
+from . import lightmap_registry
 
 def register():
-    # Nothing to register in the lightmap module itself
-    pass
+    lightmap_registry.register()
 
 def unregister():
-    # Nothing to unregister in the lightmap module itself
-    pass
+    lightmap_registry.unregister()
 
 print("lightmap/__init__.py loaded successfully")
\ No newline at end of file
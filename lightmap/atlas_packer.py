@@ -0,0 +1,162 @@
+import math
+
+# Smallest chart we bother packing, in texels
+MIN_CHART_SIZE = 8
+
+def next_power_of_two(value):
+    value = max(1, int(math.ceil(value)))
+    return 1 << (value - 1).bit_length()
+
+def compute_chart_size(surface_area, texel_density, page_size, padding=0, min_size=MIN_CHART_SIZE):
+    # Square chart holding surface_area * texel_density^2 texels, padding included
+    side = math.sqrt(max(surface_area, 0.0)) * texel_density
+    side = int(math.ceil(side)) + padding * 2
+    return max(min_size + padding * 2, min(side, page_size))
+
+class MaxRectsPage:
+    def __init__(self, size):
+        self.size = size
+        self.free_rects = [(0, 0, size, size)]
+        self.used_area = 0
+
+    def find_position(self, width, height):
+        # Best short side fit: choose the free rect leaving the smallest leftover edge
+        best = None
+        best_score = None
+        for fx, fy, fw, fh in self.free_rects:
+            if width <= fw and height <= fh:
+                score = (min(fw - width, fh - height), max(fw - width, fh - height))
+                if best_score is None or score < best_score:
+                    best = (fx, fy)
+                    best_score = score
+        return best, best_score
+
+    def insert(self, width, height):
+        position, _ = self.find_position(width, height)
+        if position is None:
+            return None
+        self.place(position[0], position[1], width, height)
+        return position
+
+    def place(self, x, y, width, height):
+        new_free = []
+        for free in self.free_rects:
+            new_free.extend(self.split_free_rect(free, x, y, width, height))
+        self.free_rects = self.prune_free_rects(new_free)
+        self.used_area += width * height
+
+    @staticmethod
+    def split_free_rect(free, x, y, width, height):
+        fx, fy, fw, fh = free
+        if x >= fx + fw or x + width <= fx or y >= fy + fh or y + height <= fy:
+            return [free]
+
+        parts = []
+        if x > fx:
+            parts.append((fx, fy, x - fx, fh))
+        if x + width < fx + fw:
+            parts.append((x + width, fy, fx + fw - (x + width), fh))
+        if y > fy:
+            parts.append((fx, fy, fw, y - fy))
+        if y + height < fy + fh:
+            parts.append((fx, y + height, fw, fy + fh - (y + height)))
+        return parts
+
+    @staticmethod
+    def prune_free_rects(rects):
+        # Drop free rects fully contained in another one
+        pruned = []
+        for i, (ax, ay, aw, ah) in enumerate(rects):
+            contained = False
+            for j, (bx, by, bw, bh) in enumerate(rects):
+                if i == j:
+                    continue
+                if ax >= bx and ay >= by and ax + aw <= bx + bw and ay + ah <= by + bh:
+                    # Keep the first of two identical rects
+                    if (ax, ay, aw, ah) != (bx, by, bw, bh) or j < i:
+                        contained = True
+                        break
+            if not contained:
+                pruned.append((ax, ay, aw, ah))
+        return pruned
+
+    def occupancy(self):
+        return self.used_area / float(self.size * self.size)
+
+def pack_charts(charts, page_size):
+    # charts: list of (key, size) squares in texels. Returns a list of pages,
+    # each a dict with "size" and "placements" of {key, x, y, size}.
+    pages = []
+    bins = []
+
+    for key, size in sorted(charts, key=lambda chart: chart[1], reverse=True):
+        size = min(size, page_size)
+
+        # Try every open page first so we open as few pages as possible
+        best_page = None
+        best_position = None
+        best_score = None
+        for index, page_bin in enumerate(bins):
+            position, score = page_bin.find_position(size, size)
+            if position is not None and (best_score is None or score < best_score):
+                best_page, best_position, best_score = index, position, score
+
+        if best_page is None:
+            bins.append(MaxRectsPage(page_size))
+            pages.append({"size": page_size, "placements": []})
+            best_page = len(bins) - 1
+            best_position = (0, 0)
+
+        bins[best_page].place(best_position[0], best_position[1], size, size)
+        pages[best_page]["placements"].append({
+            "key": key,
+            "x": best_position[0],
+            "y": best_position[1],
+            "size": size,
+        })
+
+    for page, page_bin in zip(pages, bins):
+        page["occupancy"] = page_bin.occupancy()
+
+    return pages
+
+def shelf_pack_rects(rects, row_width):
+    # rects: list of (width, height). Fills rows left to right, tallest first.
+    # Returns (positions, used_width, used_height) with positions in input order.
+    positions = [None] * len(rects)
+    x = y = row_height = used_width = 0.0
+    for index in sorted(range(len(rects)), key=lambda i: rects[i][1], reverse=True):
+        width, height = rects[index]
+        if x > 0.0 and x + width > row_width:
+            y += row_height
+            x = row_height = 0.0
+        positions[index] = (x, y)
+        x += width
+        row_height = max(row_height, height)
+        used_width = max(used_width, x)
+    return positions, used_width, y + row_height
+
+def placement_uv_transform(placement, page_size, padding=0):
+    # Scale/offset mapping a 0-1 chart into its padded slot on the page
+    inner = max(placement["size"] - padding * 2, 1)
+    scale = inner / float(page_size)
+    offset_u = (placement["x"] + padding) / float(page_size)
+    offset_v = (placement["y"] + padding) / float(page_size)
+    return scale, offset_u, offset_v
+
+def apply_uv_transform(mesh, scale, offset_u, offset_v, uv_layer_name="Lightmap"):
+    import numpy as np
+
+    uv_layer = mesh.uv_layers.get(uv_layer_name)
+    if uv_layer is None:
+        return False
+
+    coords = np.empty(len(uv_layer.data) * 2, dtype=np.float32)
+    uv_layer.data.foreach_get("uv", coords)
+    coords = coords.reshape(-1, 2)
+    coords *= scale
+    coords[:, 0] += offset_u
+    coords[:, 1] += offset_v
+    uv_layer.data.foreach_set("uv", coords.ravel())
+    mesh.update()
+    return True
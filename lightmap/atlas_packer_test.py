@@ -0,0 +1,81 @@
+import random
+import unittest
+from .atlas_packer import MaxRectsPage, next_power_of_two, compute_chart_size, pack_charts, shelf_pack_rects
+
+def overlaps(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    return ax < bx + bw and bx < ax + aw and ay < by + bh and by < ay + ah
+
+class TestAtlasPacker(unittest.TestCase):
+    def assert_no_overlaps(self, rects):
+        for i in range(len(rects)):
+            for j in range(i + 1, len(rects)):
+                self.assertFalse(overlaps(rects[i], rects[j]), f"{rects[i]} overlaps {rects[j]}")
+
+    def test_next_power_of_two(self):
+        self.assertEqual([next_power_of_two(v) for v in (0, 1, 2, 3, 64, 65, 100.5)], [1, 1, 2, 4, 64, 128, 128])
+
+    def test_chart_size_limits(self):
+        self.assertEqual(compute_chart_size(0.0, 16.0, 1024, padding=2), 12)
+        self.assertEqual(compute_chart_size(4.0, 16.0, 1024, padding=2), 36)
+        self.assertEqual(compute_chart_size(1e6, 16.0, 1024, padding=2), 1024)
+
+    def test_equal_charts_fill_one_page(self):
+        pages = pack_charts([(i, 128) for i in range(4)], 256)
+        self.assertEqual(len(pages), 1)
+        self.assertEqual(pages[0]["occupancy"], 1.0)
+        positions = sorted((p["x"], p["y"]) for p in pages[0]["placements"])
+        self.assertEqual(positions, [(0, 0), (0, 128), (128, 0), (128, 128)])
+
+    def test_overflow_opens_a_new_page(self):
+        pages = pack_charts([(i, 128) for i in range(5)], 256)
+        self.assertEqual(len(pages), 2)
+        self.assertEqual(len(pages[1]["placements"]), 1)
+
+    def test_oversized_chart_is_clamped_to_the_page(self):
+        pages = pack_charts([("big", 5000)], 1024)
+        self.assertEqual(pages[0]["placements"][0]["size"], 1024)
+
+    def test_random_charts_stay_inside_and_do_not_overlap(self):
+        rng = random.Random(7)
+        charts = [(i, rng.choice((8, 16, 24, 40, 64, 100, 128, 200))) for i in range(120)]
+        pages = pack_charts(charts, 512)
+
+        placed = sorted(p["key"] for page in pages for p in page["placements"])
+        self.assertEqual(placed, list(range(120)))
+        for page in pages:
+            rects = [(p["x"], p["y"], p["size"], p["size"]) for p in page["placements"]]
+            for x, y, w, h in rects:
+                self.assertTrue(0 <= x and 0 <= y and x + w <= 512 and y + h <= 512)
+            self.assert_no_overlaps(rects)
+            used = sum(w * h for _, _, w, h in rects)
+            self.assertAlmostEqual(page["occupancy"], used / (512 * 512))
+
+    def test_free_rects_never_cover_placed_rects(self):
+        page = MaxRectsPage(100)
+        placed = []
+        for width, height in ((30, 40), (50, 20), (20, 20), (60, 30), (10, 70)):
+            position = page.insert(width, height)
+            self.assertIsNotNone(position)
+            placed.append((position[0], position[1], width, height))
+        self.assert_no_overlaps(placed)
+        for free in page.free_rects:
+            for rect in placed:
+                self.assertFalse(overlaps(free, rect), f"free rect {free} covers {rect}")
+
+    def test_insert_fails_when_full(self):
+        page = MaxRectsPage(64)
+        self.assertEqual(page.insert(64, 64), (0, 0))
+        self.assertIsNone(page.insert(1, 1))
+
+    def test_shelf_pack(self):
+        rects = [(0.3, 0.2), (0.5, 0.4), (0.4, 0.1), (0.6, 0.3), (0.2, 0.2)]
+        positions, used_width, used_height = shelf_pack_rects(rects, 1.0)
+        boxes = [(x, y, w, h) for (x, y), (w, h) in zip(positions, rects)]
+        self.assert_no_overlaps(boxes)
+        self.assertLessEqual(used_width, 1.0)
+        self.assertAlmostEqual(used_height, max(y + h for _, y, _, h in boxes))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,195 @@
+# Headless lightmap bake. Run with the add-on enabled, passing the bake options after "--":
+#
+#   blender -b scene.blend --python-exit-code 1 --python-expr \
+#       "import bl_ext.user_default.vircadia_world_blender_tools.lightmap.bake_cli as cli; cli.main()" \
+#       -- --include "Building_*" --exclude "*_LOD*" --set samples=512 --set encoding=RGBM \
+#       --output-dir /farm/lightmaps/scene --save
+
+import bpy
+import os
+import sys
+import json
+import time
+import fnmatch
+import argparse
+from . import generateLightmaps, lightmap_utils, lightmap_registry, uv_unwrap
+
+COLLISION_KEYWORDS = ["collision", "collides", "collider", "collisions", "colliders"]
+TRUE_VALUES = {"1", "true", "yes", "on"}
+FALSE_VALUES = {"0", "false", "no", "off"}
+
+def parse_args(argv=None):
+    argv = sys.argv if argv is None else argv
+    argv = argv[argv.index("--") + 1:] if "--" in argv else []
+
+    parser = argparse.ArgumentParser(prog="bake_cli", description="Bake Vircadia lightmaps without the UI")
+    parser.add_argument("--include", action="append", default=[], metavar="PATTERN",
+                        help="Object name pattern to bake (fnmatch, repeatable). Defaults to every visible mesh")
+    parser.add_argument("--exclude", action="append", default=[], metavar="PATTERN",
+                        help="Object name pattern to skip (fnmatch, repeatable)")
+    parser.add_argument("--collection", action="append", default=[], metavar="NAME",
+                        help="Only consider objects in this collection (repeatable)")
+    parser.add_argument("--profile", metavar="NAME_OR_PATH",
+                        help="Bake profile to start from: DRAFT, PREVIEW, PRODUCTION or a saved profile .json")
+    parser.add_argument("--set", dest="overrides", action="append", default=[], metavar="KEY=VALUE",
+                        help="Override a lightmap, bake or encoding setting, e.g. samples=512 or use_atlas=true")
+    parser.add_argument("--output-dir", help="Where lightmap images, encoded lightmaps and the report are written")
+    parser.add_argument("--report", help="Timing report path. Defaults to lightmap_bake_report.json in the output directory")
+    parser.add_argument("--save", action="store_true", help="Save the .blend file after baking")
+    parser.add_argument("--save-as", metavar="PATH", help="Save the baked scene to a different .blend file")
+    return parser, parser.parse_args(argv)
+
+def coerce_value(current, value):
+    # Settings keep the type the scene property gave them
+    if isinstance(current, bool):
+        lowered = value.lower()
+        if lowered in TRUE_VALUES:
+            return True
+        if lowered in FALSE_VALUES:
+            return False
+        raise ValueError(f"expected a boolean, got '{value}'")
+    if isinstance(current, int):
+        return int(value)
+    if isinstance(current, float):
+        return float(value)
+    return value
+
+def apply_overrides(overrides, *settings_dicts):
+    for override in overrides:
+        key, separator, value = override.partition("=")
+        if not separator:
+            raise ValueError(f"override '{override}' is not KEY=VALUE")
+        key = key.strip()
+        targets = [settings for settings in settings_dicts if key in settings]
+        if not targets:
+            raise ValueError(f"unknown setting '{key}'")
+        for settings in targets:
+            settings[key] = coerce_value(settings[key], value.strip())
+
+def apply_profile(scene, profile):
+    if profile.upper() in lightmap_utils.BAKE_PROFILES:
+        lightmap_utils.apply_bake_profile(scene, profile.upper())
+        return
+    if not os.path.isfile(profile):
+        raise ValueError(f"unknown profile '{profile}'")
+    lightmap_utils.apply_snapshot(scene, lightmap_utils.load_profile(profile))
+
+def is_bakeable(obj):
+    if obj.type != 'MESH' or obj.name == "vircadia_lightmapData" or obj.hide_get():
+        return False
+    return not any(keyword in obj.name.lower() for keyword in COLLISION_KEYWORDS)
+
+def select_objects(scene, include, exclude, collections):
+    if collections:
+        candidates = []
+        for name in collections:
+            collection = bpy.data.collections.get(name)
+            if collection is None:
+                raise ValueError(f"collection '{name}' not found")
+            candidates.extend(obj for obj in collection.all_objects if obj not in candidates)
+    else:
+        candidates = list(scene.objects)
+
+    objects = []
+    for obj in candidates:
+        if not is_bakeable(obj):
+            continue
+        if include and not any(fnmatch.fnmatchcase(obj.name, pattern) for pattern in include):
+            continue
+        if any(fnmatch.fnmatchcase(obj.name, pattern) for pattern in exclude):
+            continue
+        objects.append(obj)
+    return objects
+
+def save_lightmap_images(lightmap_ids, output_dir):
+    # Generated images only live in memory; write them out so the saved .blend can find them
+    written = []
+    index = lightmap_registry.get_index()
+    for lightmap_id in sorted(lightmap_ids):
+        image = index[lightmap_id]["image"] if lightmap_id in index else None
+        if image is None:
+            continue
+        extension, file_format = (".exr", 'OPEN_EXR') if image.is_float else (".png", 'PNG')
+        filepath = os.path.join(output_dir, f"{image.name}{extension}")
+        image.filepath_raw = filepath
+        image.file_format = file_format
+        image.save()
+        written.append(filepath)
+    return written
+
+def run(args):
+    scene = bpy.context.scene
+    if not hasattr(scene, "vircadia_lightmap_texel_density"):
+        raise RuntimeError("Vircadia World Tools is not enabled in this Blender session")
+
+    if args.profile:
+        apply_profile(scene, args.profile)
+
+    lightmap_settings = lightmap_utils.get_lightmap_settings(scene)
+    bake_settings = lightmap_utils.get_bake_settings(scene)
+    encoding_settings = lightmap_utils.get_encoding_settings(scene)
+    apply_overrides(args.overrides, lightmap_settings, bake_settings, encoding_settings)
+
+    # Only the projection unwrappers work on mesh arrays; Unwrap needs bpy.ops.uv.unwrap in edit mode
+    if lightmap_settings['uv_type'] not in uv_unwrap.CHART_ANGLE_LIMITS:
+        supported = ", ".join(uv_unwrap.CHART_ANGLE_LIMITS)
+        raise ValueError(f"uv_type {lightmap_settings['uv_type']} needs the UI and can't be baked from the command line, use one of {supported}")
+
+    # Progressive refinement runs on UI timers, which never fire in background mode
+    bake_settings['progressive'] = False
+
+    output_dir = os.path.abspath(bpy.path.abspath(args.output_dir)) if args.output_dir else None
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+        encoding_settings['output_dir'] = output_dir
+
+    objects = select_objects(scene, args.include, args.exclude, args.collection)
+    report = {
+        "blend_file": bpy.data.filepath,
+        "objects": [obj.name for obj in objects],
+        "settings": {"lightmap": lightmap_settings, "bake": bake_settings, "encoding": encoding_settings},
+    }
+    if not objects:
+        report["error"] = "no objects matched the selection rules"
+        return report
+
+    existing_ids = set(lightmap_registry.get_index(scene))
+    started_at = time.time()
+    generateLightmaps.generate_lightmaps(objects, lightmap_settings, bake_settings, encoding_settings, report=report)
+    report["total_seconds"] = round(time.time() - started_at, 3)
+
+    lightmap_ids = set(lightmap_registry.get_index(scene)) - existing_ids
+    report["lightmaps"] = sorted(lightmap_ids)
+    if output_dir:
+        report["images"] = save_lightmap_images(lightmap_ids, output_dir)
+
+    if "error" not in report:
+        if args.save_as:
+            bpy.ops.wm.save_as_mainfile(filepath=os.path.abspath(args.save_as))
+        elif args.save:
+            bpy.ops.wm.save_mainfile()
+    return report
+
+def write_report(report, path):
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote lightmap bake report to {path}")
+
+def main(argv=None):
+    parser, args = parse_args(argv)
+    try:
+        report = run(args)
+    except (ValueError, KeyError) as e:
+        parser.error(str(e))
+
+    report_path = args.report
+    if report_path is None and args.output_dir:
+        report_path = os.path.join(os.path.abspath(bpy.path.abspath(args.output_dir)), "lightmap_bake_report.json")
+    if report_path:
+        write_report(report, report_path)
+
+    if "error" in report:
+        print(f"Lightmap bake failed: {report['error']}")
+        sys.exit(1)
+    print(f"Baked {len(report['lightmaps'])} lightmaps for {len(report['objects'])} objects in {report['total_seconds']}s")
+    return report
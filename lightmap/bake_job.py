@@ -0,0 +1,190 @@
+import bpy
+import os
+import json
+import time
+from .tiled_bake import get_bake_target_images
+
+# A running bake stops after the current group when cancelled from the panel, with Esc, or, for
+# command-line bakes that have no UI, when "<file>.blend.bake_cancel" is created
+CANCEL_SUFFIX = ".bake_cancel"
+LOG_SUFFIX = ".bake_log.jsonl"
+
+# The job currently baking, and a one-line summary of the last one for the panel
+active_job = None
+last_summary = ""
+
+def job_base_path():
+    if bpy.data.filepath:
+        return bpy.path.abspath(bpy.data.filepath)
+    return os.path.join(bpy.app.tempdir or os.getcwd(), "untitled.blend")
+
+def format_duration(seconds):
+    if seconds is None:
+        return "unknown"
+    seconds = int(seconds)
+    hours, remainder = divmod(seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    if hours:
+        return f"{hours}h {minutes:02d}m"
+    if minutes:
+        return f"{minutes}m {seconds:02d}s"
+    return f"{seconds}s"
+
+class BakeJob:
+    def __init__(self, bake_groups, samples):
+        self.samples = samples
+        self.groups = []
+        for group in bake_groups:
+            images = get_bake_target_images(group["objects"])
+            texels = sum(image.size[0] * image.size[1] for image in images)
+            self.groups.append({
+                "group": group,
+                "name": group["name"],
+                "images": images,
+                "status": 'PENDING',
+                # Work is measured in texel samples, so throughput carries over between groups of different size
+                "work": max(texels, 1) * samples,
+                "seconds": None,
+                "error": None,
+            })
+        self.total_work = sum(entry["work"] for entry in self.groups)
+        self.done_work = 0
+        self.baked_seconds = 0.0
+        self.started_at = None
+        self.cancelled = False
+        base_path = job_base_path()
+        self.log_path = base_path + LOG_SUFFIX
+        self.cancel_path = base_path + CANCEL_SUFFIX
+
+    def log(self, event, **fields):
+        entry = dict(time=round(time.time(), 3), event=event, **fields)
+        try:
+            with open(self.log_path, 'a') as f:
+                f.write(json.dumps(entry) + "\n")
+        except OSError as e:
+            print(f"Could not write bake log {self.log_path}: {str(e)}")
+
+    def cancel(self):
+        self.cancelled = True
+
+    def cancel_requested(self):
+        return self.cancelled or os.path.exists(self.cancel_path)
+
+    def throughput(self):
+        # Texel samples per second over the groups baked so far
+        if self.baked_seconds <= 0.0:
+            return None
+        return self.done_work / self.baked_seconds
+
+    def eta(self):
+        throughput = self.throughput()
+        if throughput is None:
+            return None
+        remaining = sum(entry["work"] for entry in self.groups if entry["status"] in ('PENDING', 'RUNNING'))
+        return remaining / throughput
+
+    def counts(self):
+        counts = {}
+        for entry in self.groups:
+            counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+        return counts
+
+    def status_text(self):
+        counts = self.counts()
+        finished = counts.get('DONE', 0) + counts.get('FAILED', 0)
+        elapsed = time.time() - self.started_at if self.started_at else 0.0
+        text = f"{finished}/{len(self.groups)} groups, {format_duration(elapsed)} elapsed"
+        if counts.get('PENDING') or counts.get('RUNNING'):
+            text += f", about {format_duration(self.eta())} left"
+        if counts.get('FAILED'):
+            text += f", {counts['FAILED']} failed"
+        if counts.get('CANCELLED'):
+            text += f", {counts['CANCELLED']} cancelled"
+        return text
+
+    def update_progress(self):
+        window_manager = bpy.context.window_manager
+        if window_manager is not None and self.total_work:
+            window_manager.progress_update(int(1000 * self.done_work / self.total_work))
+        print(f"Lightmap bake: {self.status_text()}")
+
+    def run(self, bake_group):
+        for _ in self.iter_run(bake_group):
+            pass
+        return self
+
+    def iter_run(self, bake_group):
+        # bake_group(group) unwraps and bakes one group; any exception fails only that group.
+        # Yields after every group, so a modal operator can redraw and take a cancel in between.
+        global active_job, last_summary
+        active_job = self
+        self.started_at = time.time()
+        if os.path.exists(self.cancel_path):
+            os.remove(self.cancel_path)
+        self.log("job_start", groups=len(self.groups), samples=self.samples, total_work=self.total_work)
+        print(f"Lightmap bake started, create {self.cancel_path} to stop it after the current group")
+
+        window_manager = bpy.context.window_manager
+        if window_manager is not None:
+            window_manager.progress_begin(0, 1000)
+
+        try:
+            for entry in self.groups:
+                if self.cancel_requested():
+                    for pending in self.groups:
+                        if pending["status"] == 'PENDING':
+                            pending["status"] = 'CANCELLED'
+                    self.log("job_cancelled")
+                    break
+
+                entry["status"] = 'RUNNING'
+                self.log("group_start", group=entry["name"], objects=len(entry["group"]["objects"]), work=entry["work"])
+                group_start = time.time()
+                try:
+                    bake_group(entry["group"])
+                except Exception as e:
+                    entry["status"] = 'FAILED'
+                    entry["error"] = str(e)
+                    entry["seconds"] = round(time.time() - group_start, 3)
+                    self.log("group_failed", group=entry["name"], seconds=entry["seconds"], error=entry["error"])
+                    print(f"Baking {entry['name']} failed: {str(e)}")
+                else:
+                    entry["status"] = 'DONE'
+                    entry["seconds"] = round(time.time() - group_start, 3)
+                    self.done_work += entry["work"]
+                    self.baked_seconds += entry["seconds"]
+                    self.log("group_done", group=entry["name"], seconds=entry["seconds"],
+                             samples_per_second=round(entry["work"] / max(entry["seconds"], 1e-6)), eta=self.eta())
+                self.update_progress()
+                yield self
+        finally:
+            if window_manager is not None:
+                window_manager.progress_end()
+            last_summary = self.status_text()
+            self.log("job_end", summary=last_summary, **{status.lower(): count for status, count in self.counts().items()})
+            if active_job is self:
+                active_job = None
+
+    def finished_groups(self):
+        return [entry["group"] for entry in self.groups if entry["status"] == 'DONE']
+
+    def unfinished_images(self):
+        # Objects of a failed group can also carry images another group finished; those are kept
+        images = set()
+        finished = set()
+        for entry in self.groups:
+            (finished if entry["status"] == 'DONE' else images).update(entry["images"])
+        return images - finished
+
+    def summary(self):
+        return [
+            {key: entry[key] for key in ("name", "status", "work", "seconds", "error")}
+            for entry in self.groups
+        ]
+
+def is_running():
+    return active_job is not None
+
+def cancel_active_job():
+    if active_job is not None:
+        active_job.cancel()
@@ -0,0 +1,116 @@
+import math
+from .atlas_packer import next_power_of_two, compute_chart_size, pack_charts
+
+# Per-object weight on top of surface area, e.g. 2.0 for hero props, 0.25 for distant geometry
+IMPORTANCE_PROPERTY = "vircadia_lightmap_importance"
+
+# Key of the single image used when objects are grouped manually
+MANUAL_GROUP_KEY = "__manual_group__"
+
+def get_importance(obj):
+    try:
+        return max(float(obj.get(IMPORTANCE_PROPERTY, 1.0)), 0.0)
+    except (TypeError, ValueError):
+        return 1.0
+
+def bytes_per_texel(encoding_settings):
+    # What the client uploads: RGBA8 for PNG/RGBM/RGBD, RGBA16F for half float, plus a third for mips
+    encoding = encoding_settings['encoding'] if encoding_settings else 'NONE'
+    size = 8.0 if encoding == 'HALF_EXR' else 4.0
+    if encoding_settings and encoding_settings['write_ktx2'] and encoding_settings['generate_mips']:
+        size *= 4.0 / 3.0
+    return size
+
+def format_megabytes(size_bytes):
+    return f"{size_bytes / (1024 * 1024):.1f} MB"
+
+def group_resolution(weighted_area, texel_density, min_resolution, max_resolution):
+    side = math.sqrt(max(weighted_area, 0.0)) * texel_density
+    return max(min_resolution, min(next_power_of_two(side), max_resolution))
+
+def image_resolutions(groups, texel_density, lightmap_settings):
+    return {
+        key: group_resolution(area, texel_density, lightmap_settings['min_resolution'], lightmap_settings['max_resolution'])
+        for key, area in groups
+    }
+
+def atlas_page_count(groups, texel_density, page_size, padding):
+    charts = [(key, compute_chart_size(area, texel_density, page_size, padding)) for key, area in groups]
+    return len(pack_charts(charts, page_size))
+
+def solve_texel_density(measure, budget_bytes, low=1e-3, high=1e5, iterations=48):
+    # Largest density whose predicted memory fits the budget; measure must not decrease with density
+    if measure(low) > budget_bytes:
+        return low, False
+    if measure(high) <= budget_bytes:
+        return high, True
+    for _ in range(iterations):
+        middle = math.sqrt(low * high)
+        if measure(middle) <= budget_bytes:
+            low = middle
+        else:
+            high = middle
+    return low, True
+
+def fill_budget(groups, resolutions, texel_density, budget_bytes, texel_bytes, max_resolution):
+    # Power-of-two rounding leaves headroom; spend it on the images furthest below their ideal size
+    areas = dict(groups)
+    used = sum(size * size for size in resolutions.values()) * texel_bytes
+
+    def shortfall(key):
+        return math.sqrt(max(areas[key], 0.0)) * texel_density / resolutions[key]
+
+    for key in sorted(resolutions, key=shortfall, reverse=True):
+        size = resolutions[key]
+        extra = 3 * size * size * texel_bytes
+        if size * 2 <= max_resolution and used + extra <= budget_bytes:
+            resolutions[key] = size * 2
+            used += extra
+    return resolutions
+
+def plan_memory_budget(groups, lightmap_settings, bake_settings, encoding_settings):
+    # groups: list of (key, surface area weighted by importance), one per lightmap image or atlas chart
+    budget_bytes = lightmap_settings['memory_budget'] * 1024 * 1024
+    texel_bytes = bytes_per_texel(encoding_settings)
+
+    if lightmap_settings['use_atlas']:
+        page_size = lightmap_settings['atlas_page_size']
+        padding = max(1, bake_settings['bake_margin'])
+        page_bytes = page_size * page_size * texel_bytes
+
+        def measure(texel_density):
+            return atlas_page_count(groups, texel_density, page_size, padding) * page_bytes
+
+        texel_density, fits = solve_texel_density(measure, budget_bytes)
+        resolutions = {}
+        image_count = atlas_page_count(groups, texel_density, page_size, padding)
+        predicted_bytes = image_count * page_bytes
+    else:
+        def measure(texel_density):
+            return sum(size * size for size in image_resolutions(groups, texel_density, lightmap_settings).values()) * texel_bytes
+
+        texel_density, fits = solve_texel_density(measure, budget_bytes)
+        resolutions = image_resolutions(groups, texel_density, lightmap_settings)
+        if fits:
+            resolutions = fill_budget(groups, resolutions, texel_density, budget_bytes, texel_bytes, lightmap_settings['max_resolution'])
+        image_count = len(resolutions)
+        predicted_bytes = sum(size * size for size in resolutions.values()) * texel_bytes
+
+    plan = {
+        "texel_density": texel_density,
+        "resolutions": resolutions,
+        "images": image_count,
+        "predicted_bytes": predicted_bytes,
+        "budget_bytes": budget_bytes,
+        "fits": fits,
+    }
+    print_memory_plan(plan)
+    return plan
+
+def print_memory_plan(plan):
+    print(f"Lightmap budget: {plan['texel_density']:.2f} texels per unit across {plan['images']} images, "
+          f"predicted {format_megabytes(plan['predicted_bytes'])} of {format_megabytes(plan['budget_bytes'])}")
+    for key, size in sorted(plan["resolutions"].items(), key=lambda item: -item[1]):
+        print(f"  {key}: {size}x{size}")
+    if not plan["fits"]:
+        print("Lightmap budget cannot be met even at the minimum resolution; lower Min Resolution or raise the budget")
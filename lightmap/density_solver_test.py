@@ -0,0 +1,84 @@
+import unittest
+from .density_solver import solve_texel_density, plan_memory_budget, bytes_per_texel
+
+LIGHTMAP_SETTINGS = {
+    'memory_budget': 16.0,
+    'min_resolution': 64,
+    'max_resolution': 4096,
+    'use_atlas': False,
+    'atlas_page_size': 1024,
+}
+BAKE_SETTINGS = {'bake_margin': 2}
+ENCODING_SETTINGS = {'encoding': 'RGBM', 'write_ktx2': False, 'generate_mips': False}
+GROUPS = [("hall", 400.0), ("stairs", 60.0), ("lamp", 2.0), ("crate", 6.0)]
+
+class TestSolveTexelDensity(unittest.TestCase):
+    def test_converges_to_the_budget_edge(self):
+        def measure(density):
+            return 1000.0 * density * density
+        density, fits = solve_texel_density(measure, 4.0e6)
+        self.assertTrue(fits)
+        self.assertLessEqual(measure(density), 4.0e6)
+        self.assertGreater(measure(density * 1.001), 4.0e6)
+        self.assertAlmostEqual(density, 63.2456, places=2)
+
+    def test_step_measure(self):
+        # Power-of-two rounding makes the real measures step functions
+        def measure(density):
+            return 4 ** int(density)
+        density, fits = solve_texel_density(measure, 4 ** 5)
+        self.assertTrue(fits)
+        self.assertEqual(int(density), 5)
+        self.assertGreater(density, 5.99)
+
+    def test_budget_below_minimum(self):
+        self.assertEqual(solve_texel_density(lambda density: 100.0, 10.0, low=0.5), (0.5, False))
+
+    def test_budget_above_maximum(self):
+        self.assertEqual(solve_texel_density(lambda density: 1.0, 10.0, high=50.0), (50.0, True))
+
+class TestPlanMemoryBudget(unittest.TestCase):
+    def plan(self, budget, **settings):
+        lightmap_settings = dict(LIGHTMAP_SETTINGS, memory_budget=budget, **settings)
+        return plan_memory_budget(GROUPS, lightmap_settings, BAKE_SETTINGS, ENCODING_SETTINGS)
+
+    def test_images_fit_the_budget(self):
+        for budget in (1.0, 4.0, 16.0, 64.0):
+            plan = self.plan(budget)
+            self.assertTrue(plan["fits"])
+            self.assertLessEqual(plan["predicted_bytes"], plan["budget_bytes"])
+            sizes = plan["resolutions"]
+            self.assertEqual(set(sizes), {key for key, _ in GROUPS})
+            for size in sizes.values():
+                self.assertEqual(size & (size - 1), 0)
+                self.assertTrue(64 <= size <= 4096)
+
+    def test_larger_budget_never_lowers_resolution(self):
+        small, large = self.plan(2.0), self.plan(32.0)
+        self.assertGreaterEqual(large["texel_density"], small["texel_density"])
+        for key, size in small["resolutions"].items():
+            self.assertGreaterEqual(large["resolutions"][key], size)
+
+    def test_larger_surfaces_get_larger_images(self):
+        sizes = self.plan(16.0)["resolutions"]
+        self.assertGreaterEqual(sizes["hall"], sizes["stairs"])
+        self.assertGreaterEqual(sizes["stairs"], sizes["lamp"])
+
+    def test_unreachable_budget_is_reported(self):
+        # Four images at the 64px minimum already need 64 KB
+        self.assertFalse(self.plan(0.01)["fits"])
+
+    def test_atlas_pages_fit_the_budget(self):
+        plan = self.plan(8.0, use_atlas=True)
+        self.assertTrue(plan["fits"])
+        page_bytes = 1024 * 1024 * bytes_per_texel(ENCODING_SETTINGS)
+        self.assertEqual(plan["predicted_bytes"], plan["images"] * page_bytes)
+        self.assertLessEqual(plan["predicted_bytes"], plan["budget_bytes"])
+
+    def test_bytes_per_texel(self):
+        self.assertEqual(bytes_per_texel(None), 4.0)
+        self.assertEqual(bytes_per_texel({'encoding': 'HALF_EXR', 'write_ktx2': False, 'generate_mips': False}), 8.0)
+        self.assertAlmostEqual(bytes_per_texel({'encoding': 'RGBM', 'write_ktx2': True, 'generate_mips': True}), 16.0 / 3.0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,37 +5,41 @@ import time
 import string
 import random
 from collections import defaultdict
+from .atlas_packer import compute_chart_size, pack_charts, placement_uv_transform, apply_uv_transform
+from . import tiled_bake
+from . import progressive_bake
+from . import lightmap_encoding
+from . import lightmap_postprocess
+from . import uv_unwrap
+from . import density_solver
+from . import bake_job
+from . import lightmap_denoise
+from .lightmap_utils import build_material_object_index, build_settings_snapshot, store_settings_snapshot
+from . import lightmap_registry
+from .lightmap_registry import lightmap_id_from_name
+from ..utils import primitive_cache
 
 def generate_random_string(length=16):
     return ''.join(random.choices(string.ascii_uppercase + string.digits, k=length))
 
 def ensure_cycles_render_engine():
-    max_attempts = 5
-    for attempt in range(max_attempts):
-        print(f"Attempt {attempt + 1} to set render engine to Cycles")
-        bpy.context.scene.render.engine = 'CYCLES'
-        
-        # Force Blender to update
-        bpy.context.view_layer.update()
-        
-        # Give Blender a moment to update its internal state
-        time.sleep(1)
-        
-        # Double-check that Cycles is set
-        if bpy.context.scene.render.engine == 'CYCLES':
-            print("Render engine is set to Cycles")
-            
-            # Ensure Cycles compute device is set (CPU or GPU)
-            if bpy.context.preferences.addons['cycles'].preferences.compute_device_type == 'NONE':
-                bpy.context.preferences.addons['cycles'].preferences.compute_device_type = 'CUDA'  # or 'OPTIX' or 'HIP' depending on your GPU
-            
-            # Enable all available devices
-            for device in bpy.context.preferences.addons['cycles'].preferences.devices:
-                device.use = True
-            
-            return
-    
-    raise RuntimeError("Failed to set render engine to Cycles after multiple attempts. Please set it manually in Blender.")
+    scene = bpy.context.scene
+    if scene.render.engine != 'CYCLES':
+        # Switching engines takes effect immediately, there is nothing to wait for
+        scene.render.engine = 'CYCLES'
+        if scene.render.engine != 'CYCLES':
+            raise RuntimeError("Failed to set render engine to Cycles. Please set it manually in Blender.")
+        print("Render engine is set to Cycles")
+
+    # Ensure Cycles compute device is set (CPU or GPU)
+    cycles_preferences = bpy.context.preferences.addons['cycles'].preferences
+    if cycles_preferences.compute_device_type == 'NONE':
+        cycles_preferences.compute_device_type = 'CUDA'  # or 'OPTIX' or 'HIP' depending on your GPU
+
+    # Enable all available devices
+    for device in cycles_preferences.devices:
+        if not device.use:
+            device.use = True
 
 # Dictionary to store created image texture nodes
 created_nodes = {}
@@ -47,6 +51,9 @@ material_to_objects = defaultdict(list)
 original_uv_states = {}
 
 def make_single_user(obj):
+    # Shared entity primitives get their own copy even with a single user, so the cache stays pristine
+    if primitive_cache.make_single_user(obj):
+        return
     if obj.data.users > 1:
         new_mesh = obj.data.copy()
         obj.data = new_mesh
@@ -116,12 +123,19 @@ def restore_original_uv_states():
                     uv.active_render = (uv.name == uv_state["render"])
     print("Original UV states restored.")
 
+def create_lightmap_image(name, width, height, color_space, float_buffer=False):
+    # Start fully transparent so post-processing can tell baked texels from empty ones
+    image = bpy.data.images.new(name=name, width=width, height=height, alpha=True, float_buffer=float_buffer)
+    image.generated_color = (0.0, 0.0, 0.0, 0.0)
+    image.colorspace_settings.name = color_space
+    return image
+
 def deselect_all_nodes(nodes):
     for node in nodes:
         node.select = False
     nodes.active = None
 
-def find_or_create_image_texture(mat, width, height, color_space, shared_image=None, shared_label=None):
+def find_or_create_image_texture(mat, width, height, color_space, shared_image=None, shared_label=None, float_buffer=False):
     nodes = mat.node_tree.nodes
 
     # Deselect all nodes and set active node to None
@@ -153,8 +167,7 @@ def find_or_create_image_texture(mat, width, height, color_space, shared_image=N
         random_string = generate_random_string()
         node_label = f"vircadia_lightmapData_{random_string}"
         image_node.label = node_label
-        image = bpy.data.images.new(name=node_label, width=width, height=height)
-        image.colorspace_settings.name = color_space
+        image = create_lightmap_image(node_label, width, height, color_space, float_buffer)
         image_node.image = image
 
     # Store the created node
@@ -178,8 +191,7 @@ def find_or_create_shared_image_texture(objects, lightmap_settings, width, heigh
 
     # If no existing Lightmap texture found, create a new one
     image_name = f"Lightmap_Grouped"
-    shared_image = bpy.data.images.new(name=image_name, width=width, height=height)
-    shared_image.colorspace_settings.name = lightmap_settings['color_space']
+    shared_image = create_lightmap_image(image_name, width, height, lightmap_settings['color_space'], lightmap_settings.get('float_buffer', False))
     return shared_image
 
 def calculate_object_surface_area(obj):
@@ -245,7 +257,13 @@ def process_object(obj, lightmap_settings):
             continue
 
         mat = mat_slot.material
-        find_or_create_image_texture(mat, width, height, lightmap_settings['color_space'])
+        # A memory budget fixes the size of every material's lightmap up front
+        size = lightmap_settings.get('budget_resolutions', {}).get(mat.name)
+        float_buffer = lightmap_settings.get('float_buffer', False)
+        if size:
+            find_or_create_image_texture(mat, size, size, lightmap_settings['color_space'], float_buffer=float_buffer)
+        else:
+            find_or_create_image_texture(mat, width, height, lightmap_settings['color_space'], float_buffer=float_buffer)
 
         # Add object to the list of objects sharing this material
         material_to_objects[mat.name].append(obj)
@@ -255,13 +273,15 @@ def process_grouped_objects(objects, lightmap_settings):
     total_surface_area = sum(calculate_object_surface_area(obj) for obj in objects)
     
     # Determine shared lightmap resolution
-    width, height = determine_lightmap_resolution(total_surface_area, lightmap_settings, objects[0])
+    if density_solver.MANUAL_GROUP_KEY in lightmap_settings.get('budget_resolutions', {}):
+        width = height = lightmap_settings['budget_resolutions'][density_solver.MANUAL_GROUP_KEY]
+    else:
+        width, height = determine_lightmap_resolution(total_surface_area, lightmap_settings, objects[0])
     
     # Create a shared image for all objects
     random_string = generate_random_string()
     shared_image_name = f"vircadia_lightmapData_{random_string}"
-    shared_image = bpy.data.images.new(name=shared_image_name, width=width, height=height)
-    shared_image.colorspace_settings.name = lightmap_settings['color_space']
+    shared_image = create_lightmap_image(shared_image_name, width, height, lightmap_settings['color_space'], lightmap_settings.get('float_buffer', False))
     
     # Create a shared label for all image texture nodes
     shared_label = shared_image_name
@@ -279,7 +299,101 @@ def process_grouped_objects(objects, lightmap_settings):
 
     return shared_label  # Return the shared label for potential use elsewhere
 
+def group_objects_by_shared_materials(objects):
+    # Objects sharing a material need to end up on the same lightmap page,
+    # since each material only carries a single lightmap image node
+    parent = {obj.name: obj.name for obj in objects}
+
+    def find(name):
+        while parent[name] != name:
+            parent[name] = parent[parent[name]]
+            name = parent[name]
+        return name
+
+    material_owner = {}
+    for obj in objects:
+        for mat_slot in obj.material_slots:
+            if mat_slot.material is None:
+                continue
+            owner = material_owner.setdefault(mat_slot.material.name, obj.name)
+            parent[find(obj.name)] = find(owner)
+
+    clusters = defaultdict(list)
+    for obj in objects:
+        clusters[find(obj.name)].append(obj)
+    return list(clusters.values())
+
+def process_atlas_objects(objects, lightmap_settings, bake_settings):
+    page_size = lightmap_settings['atlas_page_size']
+    padding = max(1, bake_settings['bake_margin'])
+    color_space = lightmap_settings['color_space']
+
+    mesh_objects = [obj for obj in objects if obj.type == 'MESH' and obj.data is not None]
+    clusters = group_objects_by_shared_materials(mesh_objects)
+
+    # Unwrap every cluster into its own 0-1 chart and size it from texel density
+    charts = []
+    for index, cluster in enumerate(clusters):
+        for obj in cluster:
+            make_single_user(obj)
+            ensure_uv_maps(obj)
+        unwrap_objects(cluster, lightmap_settings)
+
+        surface_area = sum(calculate_object_surface_area(obj) * density_solver.get_importance(obj) for obj in cluster)
+        chart_size = compute_chart_size(surface_area, lightmap_settings['texel_density'], page_size, padding)
+        charts.append((index, chart_size))
+
+    pages = pack_charts(charts, page_size)
+
+    bake_groups = []
+    for page in pages:
+        label = f"vircadia_lightmapData_{generate_random_string()}"
+        page_image = create_lightmap_image(label, page_size, page_size, color_space, lightmap_settings.get('float_buffer', False))
+
+        page_objects = []
+        for placement in page["placements"]:
+            scale, offset_u, offset_v = placement_uv_transform(placement, page_size, padding)
+            for obj in clusters[placement["key"]]:
+                apply_uv_transform(obj.data, scale, offset_u, offset_v)
+                for mat_slot in obj.material_slots:
+                    if mat_slot.material is None:
+                        continue
+                    find_or_create_image_texture(mat_slot.material, page_size, page_size, color_space, page_image, label)
+                page_objects.append(obj)
+
+        print(f"Atlas page {label}: {len(page['placements'])} charts, {page['occupancy'] * 100:.1f}% occupied")
+        bake_groups.append({"name": label, "objects": page_objects, "unwrap": False})
+
+    print(f"Packed {len(charts)} charts into {len(pages)} lightmap pages of {page_size}x{page_size}")
+    return bake_groups
+
+def plan_memory_budget(objects, lightmap_settings, bake_settings, encoding_settings):
+    # Describe the images generate_lightmaps is about to create, so the solver can size them together
+    mesh_objects = [obj for obj in objects if obj.type == 'MESH' and obj.data is not None]
+    weighted_areas = {obj.name: calculate_object_surface_area(obj) * density_solver.get_importance(obj) for obj in mesh_objects}
+
+    if lightmap_settings['use_atlas']:
+        clusters = group_objects_by_shared_materials(mesh_objects)
+        groups = [(index, sum(weighted_areas[obj.name] for obj in cluster)) for index, cluster in enumerate(clusters)]
+    elif lightmap_settings['automatic_grouping']:
+        material_areas = defaultdict(float)
+        for obj in mesh_objects:
+            for material_name in {slot.material.name for slot in obj.material_slots if slot.material}:
+                material_areas[material_name] += weighted_areas[obj.name]
+        groups = list(material_areas.items())
+    else:
+        groups = [(density_solver.MANUAL_GROUP_KEY, sum(weighted_areas.values()))]
+
+    return density_solver.plan_memory_budget(groups, lightmap_settings, bake_settings, encoding_settings)
+
 def unwrap_objects(objects, lightmap_settings):
+    # Projection based unwrapping works directly on mesh data: no selection, edit mode or UI context
+    uv_type = lightmap_settings['uv_type']
+    if uv_type in uv_unwrap.CHART_ANGLE_LIMITS:
+        uv_unwrap.unwrap_lightmap_uvs(objects, uv_type, lightmap_settings['margin'])
+        return
+
+    # Angle based unwrapping still needs the UV operator in edit mode
     bpy.ops.object.select_all(action='DESELECT')
     for obj in objects:
         obj.select_set(True)
@@ -292,46 +406,32 @@ def unwrap_objects(objects, lightmap_settings):
     bpy.context.scene.tool_settings.use_uv_select_sync = True
     bpy.ops.uv.select_all(action='SELECT')
     
-    # Execute the selected UV unwrapping method
-    uv_type = lightmap_settings['uv_type']
-    
-    if uv_type == 'LIGHTMAP_PACK':
-        bpy.ops.uv.lightmap_pack(
-            PREF_CONTEXT=lightmap_settings['unwrap_context'],
-            PREF_PACK_IN_ONE=True,
-            PREF_NEW_UVLAYER=False,
-            PREF_BOX_DIV=12,
-            PREF_MARGIN_DIV=lightmap_settings['margin']
-        )
-    elif uv_type == 'SMART_UV_PROJECT':
-        bpy.ops.uv.smart_project(
-            angle_limit=66.0,
-            island_margin=lightmap_settings['margin'],
-            area_weight=1.0,
-            correct_aspect=True,
-            scale_to_bounds=False
-        )
-    elif uv_type == 'UNWRAP':
-        bpy.ops.uv.unwrap(
-            method='ANGLE_BASED',
-            margin=lightmap_settings['margin']
-        )
+    bpy.ops.uv.unwrap(
+        method='ANGLE_BASED',
+        margin=lightmap_settings['margin']
+    )
     
     bpy.ops.object.mode_set(mode='OBJECT')
     bpy.ops.object.select_all(action='DESELECT')
 
+def deselect_all():
+    # Selection through the data API; the select_all operator needs a UI context
+    for obj in bpy.context.view_layer.objects:
+        obj.select_set(False)
+
 def bake_objects(objects, bake_settings):
     # Ensure we're using Cycles
     ensure_cycles_render_engine()
 
     # Select objects for baking
-    bpy.ops.object.select_all(action='DESELECT')
+    deselect_all()
     for obj in objects:
         obj.select_set(True)
     bpy.context.view_layer.objects.active = objects[0]
 
     # Ensure we're in object mode
-    bpy.ops.object.mode_set(mode='OBJECT')
+    if objects[0].mode != 'OBJECT':
+        bpy.ops.object.mode_set(mode='OBJECT')
 
     scene = bpy.context.scene
 
@@ -345,12 +445,38 @@ def bake_objects(objects, bake_settings):
     scene.cycles.adaptive_threshold = bake_settings['adaptive_threshold']
     scene.cycles.samples = bake_settings['samples']
     scene.cycles.adaptive_min_samples = bake_settings['adaptive_min_samples']
-    scene.cycles.use_denoising = bake_settings['use_denoising']
-    scene.cycles.denoiser = bake_settings['denoiser']
-    scene.cycles.denoising_input_passes = bake_settings['denoising_input_passes']
+    # Denoising runs as its own stage on the stored raw bake, see lightmap_denoise
+    scene.cycles.use_denoising = False
     scene.render.bake.margin = bake_settings['bake_margin']
 
-    # Perform baking
+    # Perform baking, splitting large lightmaps into tiles to bound memory use
+    tile_size = bake_settings['tile_size']
+    target_image = tiled_bake.get_bake_target_image(objects) if tile_size else None
+    if target_image is not None and max(target_image.size) > tile_size:
+        tiled_bake.bake_objects_tiled(objects, target_image, bake_settings, run_bake)
+    else:
+        if tile_size and any(max(image.size) > tile_size for image in tiled_bake.get_bake_target_images(objects)):
+            # Tiling swaps a single target image; a group baking into several is baked at full size
+            print(f"Warning: objects bake into more than one lightmap, baking untiled at full size despite Tile Size {tile_size}")
+        run_bake()
+
+    # Keep the raw bake plus albedo/normal passes and denoise from those
+    if bake_settings['use_denoising']:
+        for image in tiled_bake.get_bake_target_images(objects):
+            lightmap_denoise.store_bake_passes(image, objects, bake_settings)
+            lightmap_denoise.denoise_lightmap(image, bake_settings)
+            if not bake_settings['keep_bake_passes']:
+                lightmap_denoise.remove_bake_passes(image)
+
+    # Grow baked texels into empty space and weld seams instead of relying on a large bake margin
+    if bake_settings['dilation_passes'] > 0 or bake_settings['seam_welding']:
+        for image in tiled_bake.get_bake_target_images(objects):
+            lightmap_postprocess.postprocess_lightmap(image, objects, bake_settings['dilation_passes'], bake_settings['seam_welding'])
+
+    # Deselect objects after baking
+    deselect_all()
+
+def run_bake():
     try:
         bpy.ops.object.bake(type='DIFFUSE', pass_filter={'DIRECT', 'INDIRECT'})
     except RuntimeError as e:
@@ -360,14 +486,27 @@ def bake_objects(objects, bake_settings):
         print(f"Enabled devices: {[device.name for device in bpy.context.preferences.addons['cycles'].preferences.devices if device.use]}")
         raise
 
-    # Deselect objects after baking
-    bpy.ops.object.select_all(action='DESELECT')
-
 import bpy
 from collections import defaultdict
 
-def generate_lightmaps(objects, lightmap_settings, bake_settings):
+def record_stage(report, stage, started_at, **details):
+    # Optional timing report, used by the command-line bake
+    if report is not None:
+        report.setdefault("stages", []).append(dict(stage=stage, seconds=round(time.time() - started_at, 3), **details))
+
+def generate_lightmaps(objects, lightmap_settings, bake_settings, encoding_settings=None, report=None):
+    # The whole bake in one call, for scripts and the command-line bake
+    for _ in iter_generate_lightmaps(objects, lightmap_settings, bake_settings, encoding_settings, report):
+        pass
+
+def iter_generate_lightmaps(objects, lightmap_settings, bake_settings, encoding_settings=None, report=None):
+    # Yields the BakeJob after each baked group; the Generate Lightmaps operator steps through it
+    # from a modal timer so the UI stays responsive and the bake can be cancelled
     ensure_cycles_render_engine()
+
+    # Settings are read once; keep that exact set with the scene so the bake can be reproduced
+    settings_snapshot = build_settings_snapshot(lightmap_settings, bake_settings, encoding_settings)
+    store_settings_snapshot(bpy.context.scene, settings_snapshot)
     
     global created_nodes, material_to_objects, original_uv_states
     created_nodes = {}
@@ -380,25 +519,77 @@ def generate_lightmaps(objects, lightmap_settings, bake_settings):
         if obj.type == 'MESH':
             store_original_uv_state(obj)
 
+    # The encoders need the full HDR range as linear values, which 8-bit sRGB images clamp and
+    # gamma-encode; encoded lightmaps are therefore baked into float images
+    if encoding_settings and encoding_settings['encoding'] != 'NONE':
+        lightmap_settings = dict(lightmap_settings, float_buffer=True, color_space=lightmap_encoding.HDR_COLOR_SPACE)
+
     try:
-        if lightmap_settings['automatic_grouping']:
+        stage_start = time.time()
+        if lightmap_settings['memory_budget'] > 0:
+            budget_plan = plan_memory_budget(objects, lightmap_settings, bake_settings, encoding_settings)
+            lightmap_settings = dict(
+                lightmap_settings,
+                texel_density=budget_plan['texel_density'],
+                budget_resolutions=budget_plan['resolutions']
+            )
+            if report is not None:
+                report["memory_budget"] = budget_plan
+
+        bake_groups = []
+        if lightmap_settings['use_atlas']:
+            # Pack charts from all objects into shared power-of-two pages
+            bake_groups = process_atlas_objects(objects, lightmap_settings, bake_settings)
+        elif lightmap_settings['automatic_grouping']:
             # Existing logic for automatic grouping
             for obj in objects:
                 process_object(obj, lightmap_settings)
 
+            # Build the material -> objects index once instead of rescanning the scene per material
+            material_index = build_material_object_index() if lightmap_settings['factor_shared_materials'] else None
+
             for material_name, material_objects in material_to_objects.items():
                 if lightmap_settings['factor_shared_materials']:
-                    all_objects_with_material = [obj for obj in bpy.data.objects if obj.type == 'MESH' and any(slot.material and slot.material.name == material_name for slot in obj.material_slots)]
-                    unwrap_objects(all_objects_with_material, lightmap_settings)
-                    bake_objects(all_objects_with_material, bake_settings)
+                    all_objects_with_material = material_index.get(material_name, [])
+                    bake_groups.append({"name": material_name, "objects": all_objects_with_material, "unwrap": True})
                 else:
-                    unwrap_objects(material_objects, lightmap_settings)
-                    bake_objects(material_objects, bake_settings)
+                    bake_groups.append({"name": material_name, "objects": material_objects, "unwrap": True})
         else:
             # Logic for manual grouping
-            process_grouped_objects(objects, lightmap_settings)
-            unwrap_objects(objects, lightmap_settings)
-            bake_objects(objects, bake_settings)
+            shared_label = process_grouped_objects(objects, lightmap_settings)
+            bake_groups.append({"name": shared_label, "objects": objects, "unwrap": True})
+
+        # In progressive mode bake at preview samples first and refine in the background afterwards
+        initial_bake_settings = bake_settings
+        sample_schedule = []
+        if bake_settings['progressive']:
+            progressive_bake.cancel_active_job()
+            sample_schedule = progressive_bake.build_sample_schedule(bake_settings['preview_samples'], bake_settings['samples'])
+            initial_bake_settings = dict(bake_settings, samples=sample_schedule[0])
+
+        record_stage(report, "prepare", stage_start, groups=len(bake_groups))
+
+        def bake_group(group):
+            if group["unwrap"]:
+                stage_start = time.time()
+                unwrap_objects(group["objects"], lightmap_settings)
+                record_stage(report, "unwrap", stage_start, group=group["name"], objects=len(group["objects"]))
+            stage_start = time.time()
+            bake_objects(group["objects"], initial_bake_settings)
+            record_stage(report, "bake", stage_start, group=group["name"], objects=len(group["objects"]), samples=initial_bake_settings['samples'])
+
+        # Groups bake one after another with progress, ETA, a log next to the .blend and cancellation in between
+        job = bake_job.BakeJob(bake_groups, initial_bake_settings['samples'])
+        yield from job.iter_run(bake_group)
+        if report is not None:
+            report["groups"] = job.summary()
+            counts = job.counts()
+            if counts.get('FAILED') or counts.get('CANCELLED'):
+                report["error"] = job.status_text()
+
+        # Lightmaps of failed or cancelled groups are dropped rather than shipped unbaked
+        discard_unbaked_lightmaps(job.unfinished_images())
+        bake_groups = job.finished_groups()
 
         # Collect all created lightmap textures
         for node in created_nodes.values():
@@ -406,7 +597,21 @@ def generate_lightmaps(objects, lightmap_settings, bake_settings):
                 created_lightmap_textures.append(node.image)
 
         # Create materials for lightmap textures
-        create_lightmap_materials(created_lightmap_textures)
+        stage_start = time.time()
+        data_materials = create_lightmap_materials(created_lightmap_textures)
+
+        # Record the new lightmaps so nothing has to rediscover them from node labels
+        register_created_lightmaps(bake_groups, data_materials)
+
+        # Encode the new lightmaps for export (RGBM/RGBD/half float, optional KTX2)
+        lightmap_ids = {lightmap_id_from_name(texture.name) for texture in created_lightmap_textures}
+        if encoding_settings and encoding_settings['encoding'] != 'NONE':
+            record_stage(report, "materials", stage_start, lightmaps=len(data_materials))
+            stage_start = time.time()
+            lightmap_encoding.encode_lightmaps(encoding_settings, lightmap_ids)
+            record_stage(report, "encode", stage_start, encoding=encoding_settings['encoding'])
+        else:
+            record_stage(report, "materials", stage_start, lightmaps=len(data_materials))
 
         # Add correct custom properties to original objects
         for obj in objects:
@@ -416,13 +621,20 @@ def generate_lightmaps(objects, lightmap_settings, bake_settings):
                         lightmap_node = created_nodes[material_slot.material.name]
                         if lightmap_node.image:
                             # Extract the 16-digit string from the lightmap name
-                            lightmap_id = lightmap_node.image.name.split("_")[2]
+                            lightmap_id = lightmap_id_from_name(lightmap_node.image.name)
                             obj['vircadia_lightmap'] = f"vircadia_lightmapData_{lightmap_id}"
                             obj['vircadia_lightmap_texcoord'] = 1
                             break  # Only need to set these properties once per object
 
+        if len(sample_schedule) > 1:
+            progressive_bake.ProgressiveBakeJob(
+                bake_groups, bake_settings, sample_schedule[1:], bake_objects, encoding_settings, lightmap_ids
+            ).start()
+
     except Exception as e:
         print(f"An error occurred during lightmap generation: {str(e)}")
+        if report is not None:
+            report["error"] = str(e)
     finally:
         # Restore original UV states
         restore_original_uv_states()
@@ -441,27 +653,30 @@ def create_lightmap_materials(lightmap_textures):
         lightmap_collection = bpy.data.collections.new("vircadia_lightmapData")
         bpy.context.scene.collection.children.link(lightmap_collection)
 
-    # Check if vircadia_lightmapData object already exists
+    # New planes go straight into the existing vircadia_lightmapData mesh through bmesh, rather than
+    # a separate object merged with bpy.ops.object.join, which needs selection and a UI context
     existing_lightmap_obj = bpy.data.objects.get("vircadia_lightmapData")
-
-    # Create a new object for the new lightmap data
-    new_mesh = bpy.data.meshes.new("new_lightmap_data_mesh")
-    new_lightmap_obj = bpy.data.objects.new("new_lightmap_data", new_mesh)
-    lightmap_collection.objects.link(new_lightmap_obj)
+    if existing_lightmap_obj is not None and existing_lightmap_obj.type == 'MESH':
+        lightmap_obj = existing_lightmap_obj
+    else:
+        lightmap_obj = bpy.data.objects.new("vircadia_lightmapData", bpy.data.meshes.new("vircadia_lightmapData"))
+        lightmap_collection.objects.link(lightmap_obj)
 
     # Create a dictionary to group textures by their label
     texture_groups = {}
     for texture in lightmap_textures:
-        label = texture.name.split("_")[2]  # Assuming the format is "vircadia_lightmapData_XXXXXXXXXXXXXXXX"
+        label = lightmap_id_from_name(texture.name)
         if label not in texture_groups:
             texture_groups[label] = texture
 
-    # Create a bmesh to build the mesh
+    # Create a bmesh to build the mesh, starting from what the object already holds
     bm = bmesh.new()
+    bm.from_mesh(lightmap_obj.data)
+    data_materials = {}
 
     for label, texture in texture_groups.items():
         # Create a new plane in the bmesh
-        bmesh.ops.create_grid(bm, x_segments=1, y_segments=1, size=1)
+        plane = bmesh.ops.create_grid(bm, x_segments=1, y_segments=1, size=1)
 
         # Create material for the texture
         material_name = f"vircadia_lightmapData_{label}"
@@ -490,49 +705,85 @@ def create_lightmap_materials(lightmap_textures):
         links.new(tex_node.outputs['Color'], principled_node.inputs['Base Color'])
         links.new(principled_node.outputs['BSDF'], output_node.inputs['Surface'])
 
-        # Assign material to the new_lightmap_obj
-        new_lightmap_obj.data.materials.append(mat)
+        # Assign material to the lightmap data object
+        lightmap_obj.data.materials.append(mat)
+        data_materials[label] = mat
 
         # Assign the material index to the faces of this plane
-        for face in bm.faces[-4:]:  # Last 4 faces correspond to the plane we just created
-            face.material_index = len(new_lightmap_obj.data.materials) - 1
+        plane_faces = {face for vert in plane["verts"] for face in vert.link_faces}
+        for face in plane_faces:
+            face.material_index = len(lightmap_obj.data.materials) - 1
 
     # Update the mesh with bmesh data
-    bm.to_mesh(new_lightmap_obj.data)
+    bm.to_mesh(lightmap_obj.data)
     bm.free()
 
     # Update mesh to reflect changes
-    new_lightmap_obj.data.update()
-
-    final_lightmap_obj = None
-
-    if existing_lightmap_obj:
-        # If vircadia_lightmapData already exists, merge the new object into it
-        bpy.ops.object.select_all(action='DESELECT')
-        new_lightmap_obj.select_set(True)
-        existing_lightmap_obj.select_set(True)
-        bpy.context.view_layer.objects.active = existing_lightmap_obj  # Set the existing object as active
-        bpy.ops.object.join()
-        final_lightmap_obj = existing_lightmap_obj
+    lightmap_obj.data.update()
+
+    if lightmap_obj is existing_lightmap_obj:
         print(f"Merged new lightmap data into existing vircadia_lightmapData object.")
     else:
-        # If vircadia_lightmapData doesn't exist, rename the new object
-        new_lightmap_obj.name = "vircadia_lightmapData"
-        final_lightmap_obj = new_lightmap_obj
         print(f"Created new vircadia_lightmapData object.")
 
-    # Add the custom property after joining or renaming
-    final_lightmap_obj["vircadia_lightmap_mode"] = "shadowsOnly"
+    # Add the custom property to the final object
+    lightmap_obj["vircadia_lightmap_mode"] = "shadowsOnly"
 
     print(f"Updated vircadia_lightmapData object with {len(texture_groups)} new unique lightmap materials.")
     print(f"Added custom property 'vircadia_lightmap_mode' with value 'shadowsOnly' to the final object.")
 
+    return data_materials
+
+def discard_unbaked_lightmaps(images):
+    if not images:
+        return
+    for material_name, node in list(created_nodes.items()):
+        if node.image in images:
+            mat = bpy.data.materials.get(material_name)
+            if mat and mat.use_nodes:
+                mat.node_tree.nodes.remove(node)
+            del created_nodes[material_name]
+    for image in images:
+        if image.name.startswith("vircadia_lightmapData_"):
+            bpy.data.images.remove(image)
+    print(f"Discarded {len(images)} lightmaps that were not baked")
+
+def register_created_lightmaps(bake_groups, data_materials):
+    scene = bpy.context.scene
+    entries = {}
+    for material_name, node in created_nodes.items():
+        lightmap_id = lightmap_id_from_name(node.label)
+        if lightmap_id is None:
+            continue
+        entry = entries.setdefault(lightmap_id, {"image": node.image, "materials": [], "objects": []})
+        entry["materials"].append(bpy.data.materials[material_name])
+
+    for group in bake_groups:
+        for obj in group["objects"]:
+            for mat_slot in obj.material_slots:
+                if mat_slot.material and mat_slot.material.name in created_nodes:
+                    lightmap_id = lightmap_id_from_name(created_nodes[mat_slot.material.name].label)
+                    if lightmap_id in entries and obj not in entries[lightmap_id]["objects"]:
+                        entries[lightmap_id]["objects"].append(obj)
+
+    for lightmap_id, entry in entries.items():
+        lightmap_registry.register_lightmap(
+            scene,
+            lightmap_id,
+            image=entry["image"],
+            materials=entry["materials"],
+            objects=entry["objects"],
+            data_material=data_materials.get(lightmap_id),
+            save=False
+        )
+    # Written once for the whole run rather than once per lightmap
+    lightmap_registry.save_index(scene)
+
 if __name__ == "__main__":
-    # This part is for testing purposes only
-    # In actual use, the generate_lightmaps function will be called from lightmap_operators.py
-    from .lightmap_utils import get_lightmap_settings, get_bake_settings
+    # Headless bakes go through lightmap/bake_cli.py; this only bakes the current selection
+    from .lightmap_utils import get_lightmap_settings, get_bake_settings, get_encoding_settings
     scene = bpy.context.scene
     visible_selected_objects = [obj for obj in bpy.context.selected_objects if obj.type == 'MESH' and not obj.hide_get()]
     lightmap_settings = get_lightmap_settings(scene)
     bake_settings = get_bake_settings(scene)
-    generate_lightmaps(visible_selected_objects, lightmap_settings, bake_settings)
\ No newline at end of file
+    generate_lightmaps(visible_selected_objects, lightmap_settings, bake_settings, get_encoding_settings(scene))
\ No newline at end of file
@@ -0,0 +1,248 @@
+import bpy
+import os
+import tempfile
+import numpy as np
+from . import lightmap_registry
+from . import tiled_bake
+from .lightmap_postprocess import read_pixels, write_pixels, postprocess_lightmap
+
+# Image properties pointing from a lightmap to its stored bake passes
+PASS_PROPERTIES = {
+    "raw": "vircadia_lightmap_raw",
+    "albedo": "vircadia_lightmap_albedo",
+    "normal": "vircadia_lightmap_normal",
+}
+
+# Auxiliary passes are noise free, a handful of samples only anti-aliases them
+AUX_SAMPLES = 4
+
+def get_pass_image(image, pass_name):
+    name = image.get(PASS_PROPERTIES[pass_name])
+    return bpy.data.images.get(name) if name else None
+
+def ensure_pass_image(image, pass_name, float_buffer, color_space, keep):
+    pass_image = get_pass_image(image, pass_name)
+    width, height = image.size
+    if pass_image is not None and tuple(pass_image.size) != (width, height):
+        bpy.data.images.remove(pass_image)
+        pass_image = None
+    if pass_image is None:
+        pass_image = bpy.data.images.new(
+            name=f"{image.name}_{pass_name}",
+            width=width,
+            height=height,
+            float_buffer=float_buffer,
+            alpha=True
+        )
+        # Generated images without users are dropped on save, and their pixels only survive packed
+        pass_image.use_fake_user = keep
+        image[PASS_PROPERTIES[pass_name]] = pass_image.name
+    pass_image.colorspace_settings.name = color_space
+    return pass_image
+
+def has_bake_passes(image):
+    return get_pass_image(image, "raw") is not None
+
+def remove_bake_passes(image):
+    for pass_name, key in PASS_PROPERTIES.items():
+        pass_image = get_pass_image(image, pass_name)
+        if pass_image is not None:
+            bpy.data.images.remove(pass_image)
+        if key in image:
+            del image[key]
+
+def swap_lightmap_image(objects, image, replacement):
+    swapped = []
+    for obj in objects:
+        for mat_slot in obj.material_slots:
+            mat = mat_slot.material
+            if mat is None or not mat.use_nodes:
+                continue
+            node = mat.node_tree.nodes.active
+            if node is not None and node.type == 'TEX_IMAGE' and node.image == image:
+                node.image = replacement
+                swapped.append(node)
+    return swapped
+
+def bake_aux_pass(objects, image, aux_image, bake_type, bake_settings):
+    # Bake albedo/normal into aux_image through the lightmap's own image nodes, in tiles when the
+    # main bake was tiled so the memory bound holds for these passes too
+    scene = bpy.context.scene
+    samples = scene.cycles.samples
+
+    def run_bake():
+        if bake_type == 'NORMAL':
+            bpy.ops.object.bake(type='NORMAL', normal_space='OBJECT', margin=scene.render.bake.margin)
+        else:
+            bpy.ops.object.bake(type='DIFFUSE', pass_filter={'COLOR'}, margin=scene.render.bake.margin)
+
+    swapped = swap_lightmap_image(objects, image, aux_image)
+    try:
+        scene.cycles.samples = AUX_SAMPLES
+        tile_size = bake_settings['tile_size']
+        if tile_size and max(aux_image.size) > tile_size:
+            tiled_bake.bake_objects_tiled(objects, aux_image, bake_settings, run_bake)
+        else:
+            run_bake()
+    finally:
+        scene.cycles.samples = samples
+        for node in swapped:
+            node.image = image
+
+def store_bake_passes(image, objects, bake_settings):
+    # Store the noisy bake, and the auxiliary passes the first time, for the denoiser. With
+    # keep_bake_passes they are packed into the .blend so denoising can be re-run later; otherwise
+    # remove_bake_passes drops them once the lightmap is denoised.
+    keep = bake_settings['keep_bake_passes']
+    passes = []
+    raw = ensure_pass_image(image, "raw", image.is_float, image.colorspace_settings.name, keep)
+    write_pixels(raw, read_pixels(image))
+    passes.append(raw)
+
+    if get_pass_image(image, "albedo") is None:
+        albedo = ensure_pass_image(image, "albedo", False, 'sRGB', keep)
+        bake_aux_pass(objects, image, albedo, 'DIFFUSE', bake_settings)
+        passes.append(albedo)
+    if bake_settings['denoising_input_passes'] == 'RGB_ALBEDO_NORMAL' and get_pass_image(image, "normal") is None:
+        normal = ensure_pass_image(image, "normal", True, 'Non-Color', keep)
+        bake_aux_pass(objects, image, normal, 'NORMAL', bake_settings)
+        passes.append(normal)
+
+    if keep:
+        for pass_image in passes:
+            pass_image.pack()
+
+def linear_to_srgb(rgb):
+    rgb = np.maximum(rgb, 0.0)
+    return np.where(rgb <= 0.0031308, rgb * 12.92, 1.055 * np.power(rgb, 1.0 / 2.4) - 0.055)
+
+def bilateral_denoise(pixels, valid, albedo, normal, radius=3, sigma_albedo=0.1, sigma_normal=0.3):
+    # Cross-bilateral filter guided by the auxiliary passes, so edges in albedo/normal stay sharp.
+    # Only baked texels contribute.
+    height, width = valid.shape
+    sigma_space = max(radius / 2.0, 0.5)
+
+    padded_pixels = np.pad(pixels[..., :3], ((radius, radius), (radius, radius), (0, 0)), mode='edge')
+    padded_valid = np.pad(valid.astype(np.float32), radius)
+    padded_albedo = np.pad(albedo, ((radius, radius), (radius, radius), (0, 0)), mode='edge')
+    padded_normal = np.pad(normal, ((radius, radius), (radius, radius), (0, 0)), mode='edge') if normal is not None else None
+
+    color_sum = np.zeros((height, width, 3), dtype=np.float32)
+    weight_sum = np.zeros((height, width), dtype=np.float32)
+    for dy in range(-radius, radius + 1):
+        for dx in range(-radius, radius + 1):
+            rows = slice(radius + dy, radius + dy + height)
+            cols = slice(radius + dx, radius + dx + width)
+            weight = np.exp(-(dx * dx + dy * dy) / (2.0 * sigma_space * sigma_space)) * padded_valid[rows, cols]
+            albedo_distance = np.sum((padded_albedo[rows, cols] - albedo) ** 2, axis=-1)
+            weight = weight * np.exp(-albedo_distance / (2.0 * sigma_albedo * sigma_albedo))
+            if padded_normal is not None:
+                normal_distance = np.sum((padded_normal[rows, cols] - normal) ** 2, axis=-1)
+                weight = weight * np.exp(-normal_distance / (2.0 * sigma_normal * sigma_normal))
+            color_sum += padded_pixels[rows, cols] * weight[..., None]
+            weight_sum += weight
+
+    denoised = pixels.copy()
+    filtered = valid & (weight_sum > 0.0)
+    denoised[filtered, :3] = color_sum[filtered] / weight_sum[filtered][:, None]
+    return denoised
+
+def denoise_with_compositor(raw, albedo, normal, bake_settings):
+    # OpenImageDenoise through the compositor of a throwaway scene; works in background mode too
+    width, height = raw.size
+    scene = bpy.data.scenes.new("vircadia_lightmap_denoise")
+    camera_data = bpy.data.cameras.new("vircadia_lightmap_denoise")
+    camera = bpy.data.objects.new("vircadia_lightmap_denoise", camera_data)
+    output_path = os.path.join(tempfile.mkdtemp(prefix="vircadia_denoise_"), "denoised.exr")
+    try:
+        scene.collection.objects.link(camera)
+        scene.camera = camera
+        scene.render.engine = 'BLENDER_WORKBENCH'
+        scene.render.resolution_x = width
+        scene.render.resolution_y = height
+        scene.render.resolution_percentage = 100
+        scene.render.filepath = output_path
+        scene.render.image_settings.file_format = 'OPEN_EXR'
+        scene.render.image_settings.color_depth = '32'
+        scene.view_settings.view_transform = 'Standard'
+
+        scene.use_nodes = True
+        tree = scene.node_tree
+        tree.nodes.clear()
+        denoise = tree.nodes.new('CompositorNodeDenoise')
+        denoise.use_hdr = True
+        if hasattr(denoise, "prefilter"):
+            denoise.prefilter = bake_settings['denoising_prefilter']
+        if hasattr(denoise, "quality"):
+            denoise.quality = bake_settings['denoising_quality']
+
+        for image, socket in ((raw, "Image"), (albedo, "Albedo"), (normal, "Normal")):
+            if image is None:
+                continue
+            image_node = tree.nodes.new('CompositorNodeImage')
+            image_node.image = image
+            tree.links.new(image_node.outputs["Image"], denoise.inputs[socket])
+        composite = tree.nodes.new('CompositorNodeComposite')
+        tree.links.new(denoise.outputs["Image"], composite.inputs["Image"])
+
+        bpy.ops.render.render(write_still=True, scene=scene.name)
+
+        result = bpy.data.images.load(output_path)
+        try:
+            return read_pixels(result)
+        finally:
+            bpy.data.images.remove(result)
+    finally:
+        bpy.data.scenes.remove(scene)
+        bpy.data.objects.remove(camera)
+        bpy.data.cameras.remove(camera_data)
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        os.rmdir(os.path.dirname(output_path))
+
+def denoise_lightmap(image, bake_settings):
+    # Rebuild the lightmap from its stored raw bake with the current denoise settings
+    raw = get_pass_image(image, "raw")
+    if raw is None:
+        print(f"No stored bake for {image.name}, skipping denoise")
+        return False
+    albedo = get_pass_image(image, "albedo")
+    normal = get_pass_image(image, "normal") if bake_settings['denoising_input_passes'] == 'RGB_ALBEDO_NORMAL' else None
+
+    raw_pixels = read_pixels(raw)
+    valid = raw_pixels[..., 3] > 0.0
+    denoised = None
+
+    if bake_settings['denoiser'] != 'BILATERAL':
+        try:
+            denoised = denoise_with_compositor(raw, albedo, normal, bake_settings)
+            # The compositor hands back linear values; byte lightmaps store encoded ones
+            if not image.is_float and image.colorspace_settings.name == 'sRGB':
+                denoised[..., :3] = linear_to_srgb(denoised[..., :3])
+        except (RuntimeError, KeyError, OSError) as e:
+            print(f"Compositor denoise failed for {image.name}, using the CPU fallback: {str(e)}")
+
+    if denoised is None:
+        albedo_pixels = read_pixels(albedo)[..., :3] if albedo is not None else np.zeros_like(raw_pixels[..., :3])
+        normal_pixels = read_pixels(normal)[..., :3] if normal is not None else None
+        denoised = bilateral_denoise(raw_pixels, valid, albedo_pixels, normal_pixels)
+
+    # Unbaked texels stay transparent so dilation can still find them
+    denoised[..., 3] = raw_pixels[..., 3]
+    denoised[~valid] = raw_pixels[~valid]
+    write_pixels(image, denoised)
+    print(f"Denoised {image.name} with {bake_settings['denoiser']}")
+    return True
+
+def denoise_lightmaps(bake_settings):
+    # Re-run only the denoise and post-process stages for every lightmap with a stored bake
+    denoised_ids = []
+    for lightmap_id, entry in lightmap_registry.get_index().items():
+        image = entry["image"]
+        if image is None or not has_bake_passes(image):
+            continue
+        if denoise_lightmap(image, bake_settings):
+            if bake_settings['dilation_passes'] > 0 or bake_settings['seam_welding']:
+                postprocess_lightmap(image, entry["objects"], bake_settings['dilation_passes'], bake_settings['seam_welding'])
+            denoised_ids.append(lightmap_id)
+    return denoised_ids
@@ -0,0 +1,254 @@
+import bpy
+import os
+import struct
+import numpy as np
+from . import lightmap_registry
+
+# Babylon.js decodes RGBD with a fixed range of 255
+RGBD_MAX_RANGE = 255.0
+GAMMA = 2.2
+
+# Bakes feeding the encoders go into float images tagged with this space, so pixels are read back
+# as linear, unclamped radiance
+HDR_COLOR_SPACE = 'Non-Color'
+
+# Vulkan formats used in KTX2 containers
+VK_FORMAT_R8G8B8A8_UNORM = 37
+VK_FORMAT_R16G16B16A16_SFLOAT = 97
+
+KTX2_IDENTIFIER = bytes([0xAB, 0x4B, 0x54, 0x58, 0x20, 0x32, 0x30, 0xBB, 0x0D, 0x0A, 0x1A, 0x0A])
+
+def read_image_pixels(image):
+    width, height = image.size
+    pixels = np.empty(width * height * 4, dtype=np.float32)
+    image.pixels.foreach_get(pixels)
+    return pixels.reshape(height, width, 4)
+
+def encode_rgbm(rgb, max_range):
+    # Shared multiplier in alpha, rounded up so the colour channels never overflow
+    multiplier = np.max(rgb, axis=-1, keepdims=True) / max_range
+    multiplier = np.clip(multiplier, 1.0 / 255.0, 1.0)
+    multiplier = np.ceil(multiplier * 255.0) / 255.0
+    encoded = np.clip(rgb / (multiplier * max_range), 0.0, 1.0)
+    return np.concatenate([encoded, multiplier], axis=-1)
+
+def encode_rgbd(rgb):
+    # Matches Babylon's toRGBD: gamma encoded colour with the divider in alpha
+    max_rgb = np.maximum(np.max(rgb, axis=-1, keepdims=True), 1e-7)
+    divider = np.maximum(RGBD_MAX_RANGE / max_rgb, 1.0)
+    divider = np.clip(np.floor(divider) / 255.0, 0.0, 1.0)
+    encoded = np.power(np.clip(rgb * divider, 0.0, 1.0), 1.0 / GAMMA)
+    return np.concatenate([encoded, divider], axis=-1)
+
+def encode_pixels(pixels, encoding, max_range):
+    rgb = np.maximum(pixels[..., :3], 0.0)
+    if encoding == 'RGBM':
+        return encode_rgbm(rgb, max_range)
+    if encoding == 'RGBD':
+        return encode_rgbd(rgb)
+    # Half float keeps the full HDR range as is
+    return np.concatenate([rgb, np.ones_like(rgb[..., :1])], axis=-1)
+
+def downsample_axis(pixels, axis):
+    # Halve one axis, rounding the size down as KTX2 requires for level sizes (max(1, size >> level)).
+    # Odd sizes use a three-tap box filter whose weights cover the source evenly:
+    # out[i] = ((m - i) * s[2i] + m * s[2i + 1] + (i + 1) * s[2i + 2]) / n, with n = 2m + 1
+    size = pixels.shape[axis]
+    if size == 1:
+        return pixels
+    source = np.moveaxis(pixels, axis, 0)
+    if size % 2 == 0:
+        result = 0.5 * (source[0::2] + source[1::2])
+    else:
+        half = size // 2
+        i = np.arange(half, dtype=np.float32).reshape(-1, *([1] * (source.ndim - 1)))
+        result = ((half - i) * source[0:size - 1:2] + half * source[1::2] + (i + 1) * source[2::2]) / size
+    return np.moveaxis(result.astype(pixels.dtype, copy=False), 0, axis)
+
+def build_mip_chain(pixels):
+    # Box filtered in linear space, down to 1x1
+    levels = [pixels]
+    current = pixels
+    while current.shape[0] > 1 or current.shape[1] > 1:
+        current = downsample_axis(downsample_axis(current, 0), 1)
+        levels.append(current)
+    return levels
+
+def to_unorm8(encoded):
+    return np.round(np.clip(encoded, 0.0, 1.0) * 255.0).astype(np.uint8)
+
+def build_ktx2_dfd(vk_format):
+    if vk_format == VK_FORMAT_R16G16B16A16_SFLOAT:
+        bytes_per_texel, bit_length, channel_flags = 8, 16, 0xC0  # float | signed
+        lower, upper = 0xBF800000, 0x3F800000  # -1.0f, 1.0f
+    else:
+        bytes_per_texel, bit_length, channel_flags = 4, 8, 0x00
+        lower, upper = 0, 255
+
+    samples = b""
+    for index, channel_id in enumerate((0, 1, 2, 15)):
+        samples += struct.pack(
+            "<HBB4BII",
+            index * bit_length, bit_length - 1, channel_id | channel_flags,
+            0, 0, 0, 0, lower, upper
+        )
+
+    block_size = 24 + len(samples)
+    block = struct.pack(
+        "<IHHBBBB4B8B",
+        0, 2, block_size,
+        1, 1, 1, 0,  # RGBSDA colour model, BT.709 primaries, linear transfer, straight alpha
+        0, 0, 0, 0,
+        bytes_per_texel, 0, 0, 0, 0, 0, 0, 0
+    ) + samples
+    return struct.pack("<I", len(block) + 4) + block
+
+def build_ktx2_kvd():
+    key_value = b"KTXwriter\x00Vircadia World Tools\x00"
+    entry = struct.pack("<I", len(key_value)) + key_value
+    return entry + b"\x00" * (-len(entry) % 4)
+
+def write_ktx2(filepath, levels, vk_format):
+    # levels are top-down (height, width, 4) arrays, largest first
+    type_size = 2 if vk_format == VK_FORMAT_R16G16B16A16_SFLOAT else 1
+    alignment = 8 if vk_format == VK_FORMAT_R16G16B16A16_SFLOAT else 4
+    height, width = levels[0].shape[:2]
+
+    dfd = build_ktx2_dfd(vk_format)
+    kvd = build_ktx2_kvd()
+    level_index_offset = 80
+    dfd_offset = level_index_offset + 24 * len(levels)
+    kvd_offset = dfd_offset + len(dfd)
+    data_offset = kvd_offset + len(kvd)
+
+    # Mip data is stored smallest level first
+    level_data = [level.tobytes() for level in levels]
+    offsets = [0] * len(levels)
+    cursor = data_offset
+    body = b""
+    for level in reversed(range(len(levels))):
+        padding = -cursor % alignment
+        body += b"\x00" * padding
+        cursor += padding
+        offsets[level] = cursor
+        body += level_data[level]
+        cursor += len(level_data[level])
+
+    header = KTX2_IDENTIFIER + struct.pack(
+        "<9I", vk_format, type_size, width, height, 0, 0, 1, len(levels), 0
+    )
+    header += struct.pack("<4I2Q", dfd_offset, len(dfd), kvd_offset, len(kvd), 0, 0)
+    level_index = b"".join(
+        struct.pack("<3Q", offsets[level], len(level_data[level]), len(level_data[level]))
+        for level in range(len(levels))
+    )
+
+    with open(filepath, 'wb') as f:
+        f.write(header + level_index + dfd + kvd + body)
+
+def save_encoded_png(name, encoded, filepath):
+    height, width = encoded.shape[:2]
+    image = bpy.data.images.get(name)
+    if image is None or tuple(image.size) != (width, height):
+        if image is not None:
+            bpy.data.images.remove(image)
+        image = bpy.data.images.new(name=name, width=width, height=height, alpha=True)
+    image.colorspace_settings.name = 'Non-Color'
+    image.alpha_mode = 'CHANNEL_PACKED'
+    image.pixels.foreach_set(encoded.astype(np.float32).ravel())
+    image.filepath_raw = filepath
+    image.file_format = 'PNG'
+    image.save()
+    return image
+
+def save_half_exr(image, filepath):
+    scene = bpy.context.scene
+    image_settings = scene.render.image_settings
+    original = (image_settings.file_format, image_settings.color_depth, image_settings.exr_codec)
+    try:
+        image_settings.file_format = 'OPEN_EXR'
+        image_settings.color_depth = '16'
+        image_settings.exr_codec = 'ZIP'
+        image.save_render(filepath, scene=scene)
+    finally:
+        image_settings.file_format, image_settings.color_depth, image_settings.exr_codec = original
+
+def get_lightmap_data_materials(lightmap_ids=None):
+    materials = []
+    for lightmap_id, entry in lightmap_registry.get_index().items():
+        mat = entry["data_material"]
+        if mat and mat.use_nodes and (lightmap_ids is None or lightmap_id in lightmap_ids):
+            materials.append(mat)
+    return materials
+
+def encode_lightmap_material(mat, encoding_settings):
+    tex_node = next((node for node in mat.node_tree.nodes if node.type == 'TEX_IMAGE'), None)
+    if tex_node is None:
+        return False
+
+    # Always encode from the raw bake, even when re-running the stage
+    source_name = mat.get("vircadia_lightmap_source", tex_node.image.name if tex_node.image else "")
+    source = bpy.data.images.get(source_name)
+    if source is None:
+        print(f"No baked lightmap found for material {mat.name}")
+        return False
+    mat["vircadia_lightmap_source"] = source.name
+
+    encoding = encoding_settings['encoding']
+    if encoding == 'NONE':
+        tex_node.image = source
+        for key in ("vircadia_lightmap_encoding", "vircadia_lightmap_range", "vircadia_lightmap_ktx2"):
+            if key in mat:
+                del mat[key]
+        return True
+
+    output_dir = bpy.path.abspath(encoding_settings['output_dir'])
+    os.makedirs(output_dir, exist_ok=True)
+    max_range = encoding_settings['rgbm_range']
+
+    # Blender stores rows bottom-up, image files expect them top-down
+    pixels = np.flipud(read_image_pixels(source))
+    suffix = encoding.lower()
+
+    if encoding == 'HALF_EXR':
+        exr_path = os.path.join(output_dir, f"{source.name}_{suffix}.exr")
+        save_half_exr(source, exr_path)
+        print(f"Wrote half-float lightmap {exr_path}")
+    else:
+        encoded = to_unorm8(encode_pixels(pixels, encoding, max_range))
+        png_path = os.path.join(output_dir, f"{source.name}_{suffix}.png")
+        # Back to Blender's bottom-up order for the in-memory image
+        encoded_image = save_encoded_png(f"{source.name}_{suffix}", np.flipud(encoded) / 255.0, png_path)
+        tex_node.image = encoded_image
+        print(f"Wrote {encoding} lightmap {png_path}")
+
+    mat["vircadia_lightmap_encoding"] = encoding
+    # Half float stores values directly; only the 8-bit encodings need a range to decode with
+    if encoding == 'HALF_EXR':
+        if "vircadia_lightmap_range" in mat:
+            del mat["vircadia_lightmap_range"]
+    else:
+        mat["vircadia_lightmap_range"] = max_range if encoding == 'RGBM' else RGBD_MAX_RANGE
+
+    if encoding_settings['write_ktx2']:
+        levels = build_mip_chain(pixels) if encoding_settings['generate_mips'] else [pixels]
+        if encoding == 'HALF_EXR':
+            levels = [encode_pixels(level, encoding, max_range).astype(np.float16) for level in levels]
+            vk_format = VK_FORMAT_R16G16B16A16_SFLOAT
+        else:
+            levels = [to_unorm8(encode_pixels(level, encoding, max_range)) for level in levels]
+            vk_format = VK_FORMAT_R8G8B8A8_UNORM
+        ktx2_path = os.path.join(output_dir, f"{source.name}_{suffix}.ktx2")
+        write_ktx2(ktx2_path, levels, vk_format)
+        mat["vircadia_lightmap_ktx2"] = os.path.basename(ktx2_path)
+        print(f"Wrote KTX2 lightmap {ktx2_path} with {len(levels)} mip levels")
+
+    return True
+
+def encode_lightmaps(encoding_settings, lightmap_ids=None):
+    encoded_count = 0
+    for mat in get_lightmap_data_materials(lightmap_ids):
+        if encode_lightmap_material(mat, encoding_settings):
+            encoded_count += 1
+    print(f"Encoded {encoded_count} lightmaps as {encoding_settings['encoding']}")
+    return encoded_count
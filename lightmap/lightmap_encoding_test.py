@@ -0,0 +1,127 @@
+import os
+import struct
+import tempfile
+import unittest
+import numpy as np
+from .lightmap_encoding import (
+    encode_pixels, build_mip_chain, to_unorm8, write_ktx2, GAMMA, KTX2_IDENTIFIER,
+    VK_FORMAT_R8G8B8A8_UNORM, VK_FORMAT_R16G16B16A16_SFLOAT
+)
+
+def hdr_pixels(height, width, seed=3, scale=20.0):
+    rng = np.random.default_rng(seed)
+    pixels = np.ones((height, width, 4), dtype=np.float32)
+    # Spread over several orders of magnitude, as baked light is
+    pixels[..., :3] = (scale * rng.random((height, width, 3)) ** 3).astype(np.float32)
+    return pixels
+
+def read_ktx2(filepath):
+    with open(filepath, 'rb') as f:
+        data = f.read()
+    header = struct.unpack_from("<9I", data, 12)
+    index = struct.unpack_from("<4I2Q", data, 48)
+    levels = [struct.unpack_from("<3Q", data, 80 + 24 * level) for level in range(header[7])]
+    return data, header, index, levels
+
+class TestEncodings(unittest.TestCase):
+    def test_rgbm_round_trip(self):
+        max_range = 8.0
+        pixels = hdr_pixels(16, 16, scale=max_range)
+        encoded = to_unorm8(encode_pixels(pixels, 'RGBM', max_range)) / 255.0
+        multiplier = encoded[..., 3:]
+        decoded = encoded[..., :3] * multiplier * max_range
+        # Only the colour channels are rounded; the multiplier is already a multiple of 1/255
+        tolerance = 0.5 / 255.0 * multiplier * max_range + 1e-5
+        self.assertTrue(np.all(np.abs(decoded - pixels[..., :3]) <= tolerance))
+
+    def test_rgbm_clamps_above_range(self):
+        pixels = np.full((1, 1, 4), 100.0, dtype=np.float32)
+        encoded = encode_pixels(pixels, 'RGBM', 6.0)
+        np.testing.assert_allclose(encoded[0, 0], [1.0, 1.0, 1.0, 1.0])
+
+    def test_rgbd_round_trip(self):
+        pixels = hdr_pixels(16, 16, scale=200.0)
+        pixels[..., :3] = np.maximum(pixels[..., :3], 0.05)
+        encoded = to_unorm8(encode_pixels(pixels, 'RGBD', 0.0)) / 255.0
+        # Babylon's fromRGBD: linearise, then divide by alpha
+        decoded = np.power(encoded[..., :3], GAMMA) / encoded[..., 3:]
+        brightest = np.argmax(pixels[..., :3], axis=-1)[..., None]
+        original_max = np.take_along_axis(pixels[..., :3], brightest, axis=-1)
+        decoded_max = np.take_along_axis(decoded, brightest, axis=-1)
+        np.testing.assert_allclose(decoded_max, original_max, rtol=0.02)
+
+    def test_half_float_keeps_values(self):
+        pixels = hdr_pixels(4, 4, scale=1000.0)
+        encoded = encode_pixels(pixels, 'HALF_EXR', 0.0)
+        np.testing.assert_array_equal(encoded[..., :3], pixels[..., :3])
+        np.testing.assert_array_equal(encoded[..., 3], 1.0)
+
+class TestMipChain(unittest.TestCase):
+    def test_level_sizes_round_down(self):
+        # KTX2 level size is max(1, size >> level)
+        for height, width in ((5, 7), (1, 6), (16, 16), (9, 3), (1, 1)):
+            levels = build_mip_chain(hdr_pixels(height, width))
+            expected_count = max(height, width).bit_length()
+            self.assertEqual(len(levels), expected_count, (height, width))
+            for level, pixels in enumerate(levels):
+                self.assertEqual(pixels.shape, (max(1, height >> level), max(1, width >> level), 4))
+
+    def test_levels_keep_the_average(self):
+        pixels = hdr_pixels(11, 6)
+        for level in build_mip_chain(pixels):
+            np.testing.assert_allclose(level.mean(axis=(0, 1)), pixels.mean(axis=(0, 1)), rtol=1e-4)
+
+    def test_constant_image_stays_constant(self):
+        pixels = np.full((13, 5, 4), 0.25, dtype=np.float32)
+        for level in build_mip_chain(pixels):
+            np.testing.assert_allclose(level, 0.25, rtol=1e-6)
+            self.assertEqual(level.dtype, np.float32)
+
+class TestKtx2(unittest.TestCase):
+    def write(self, levels, vk_format):
+        directory = tempfile.mkdtemp()
+        filepath = os.path.join(directory, "lightmap.ktx2")
+        self.addCleanup(os.rmdir, directory)
+        self.addCleanup(os.remove, filepath)
+        write_ktx2(filepath, levels, vk_format)
+        return read_ktx2(filepath)
+
+    def check_file(self, levels, vk_format, type_size, alignment):
+        data, header, index, level_index = self.write(levels, vk_format)
+        height, width = levels[0].shape[:2]
+        self.assertEqual(data[:12], KTX2_IDENTIFIER)
+        self.assertEqual(header, (vk_format, type_size, width, height, 0, 0, 1, len(levels), 0))
+
+        dfd_offset, dfd_length, kvd_offset, kvd_length, sgd_offset, sgd_length = index
+        self.assertEqual(dfd_offset, 80 + 24 * len(levels))
+        self.assertEqual(struct.unpack_from("<I", data, dfd_offset)[0], dfd_length)
+        self.assertEqual(kvd_offset, dfd_offset + dfd_length)
+        self.assertIn(b"KTXwriter\x00", data[kvd_offset:kvd_offset + kvd_length])
+        self.assertEqual((sgd_offset, sgd_length), (0, 0))
+
+        previous_offset = len(data)
+        for level, (offset, length, uncompressed_length) in enumerate(level_index):
+            expected = levels[level].tobytes()
+            self.assertEqual(length, len(expected))
+            self.assertEqual(uncompressed_length, length)
+            self.assertEqual(offset % alignment, 0)
+            self.assertEqual(data[offset:offset + length], expected)
+            # Smallest level is stored first
+            self.assertLess(offset, previous_offset)
+            previous_offset = offset
+        self.assertEqual(level_index[0][0] + level_index[0][1], len(data))
+
+    def test_rgba8_non_power_of_two(self):
+        levels = [to_unorm8(encode_pixels(level, 'RGBM', 8.0)) for level in build_mip_chain(hdr_pixels(5, 7))]
+        self.assertEqual([level.shape[:2] for level in levels], [(5, 7), (2, 3), (1, 1)])
+        self.check_file(levels, VK_FORMAT_R8G8B8A8_UNORM, 1, 4)
+
+    def test_half_float(self):
+        levels = [encode_pixels(level, 'HALF_EXR', 0.0).astype(np.float16) for level in build_mip_chain(hdr_pixels(8, 8))]
+        self.check_file(levels, VK_FORMAT_R16G16B16A16_SFLOAT, 2, 8)
+
+    def test_single_level(self):
+        self.check_file([to_unorm8(encode_pixels(hdr_pixels(3, 3), 'RGBD', 0.0))], VK_FORMAT_R8G8B8A8_UNORM, 1, 4)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+import numpy as np
+from .uv_unwrap import face_loop_order
+
+# 8-connected neighbourhood used when growing valid texels outwards
+NEIGHBOUR_OFFSETS = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+
+def read_pixels(image):
+    width, height = image.size
+    pixels = np.empty(width * height * 4, dtype=np.float32)
+    image.pixels.foreach_get(pixels)
+    return pixels.reshape(height, width, 4)
+
+def write_pixels(image, pixels):
+    image.pixels.foreach_set(pixels.ravel())
+    image.update()
+
+def dilate_pixels(pixels, valid, passes):
+    # Each pass fills every invalid texel touching a valid one with the average of its valid neighbours
+    pixels = pixels.copy()
+    valid = valid.copy()
+    height, width = valid.shape
+
+    for _ in range(passes):
+        if valid.all():
+            break
+
+        padded_pixels = np.pad(pixels * valid[..., None], ((1, 1), (1, 1), (0, 0)))
+        padded_valid = np.pad(valid.astype(np.float32), 1)
+
+        color_sum = np.zeros_like(pixels)
+        count = np.zeros((height, width), dtype=np.float32)
+        for dy, dx in NEIGHBOUR_OFFSETS:
+            color_sum += padded_pixels[1 + dy:1 + dy + height, 1 + dx:1 + dx + width]
+            count += padded_valid[1 + dy:1 + dy + height, 1 + dx:1 + dx + width]
+
+        grow = ~valid & (count > 0)
+        if not grow.any():
+            break
+        pixels[grow] = color_sum[grow] / count[grow][:, None]
+        valid = valid | grow
+
+    return pixels, valid
+
+def read_loop_arrays(obj, uv_layer_name):
+    mesh = obj.data
+    uv_layer = mesh.uv_layers.get(uv_layer_name)
+    if uv_layer is None:
+        return None
+    loop_count, face_count = len(mesh.loops), len(mesh.polygons)
+    loop_start = np.empty(face_count, dtype=np.int64)
+    mesh.polygons.foreach_get("loop_start", loop_start)
+    loop_total = np.empty(face_count, dtype=np.int64)
+    mesh.polygons.foreach_get("loop_total", loop_total)
+    loop_vertices = np.empty(loop_count, dtype=np.int64)
+    mesh.loops.foreach_get("vertex_index", loop_vertices)
+    loop_edges = np.empty(loop_count, dtype=np.int64)
+    mesh.loops.foreach_get("edge_index", loop_edges)
+    uvs = np.empty(loop_count * 2, dtype=np.float32)
+    uv_layer.data.foreach_get("uv", uvs)
+    return loop_start, loop_total, loop_vertices, loop_edges, uvs.reshape(-1, 2)
+
+def find_seam_segments(loop_start, loop_total, loop_vertices, loop_edges, uvs):
+    # Pairs of UV segments that share a mesh edge but are split in the lightmap. Every loop starts
+    # its face's edge, which runs to the next loop around the face; only edges of two faces count.
+    order, face_of, next_order = face_loop_order(loop_start, loop_total)
+    edges = loop_edges[order]
+    sort = np.argsort(edges, kind='stable')
+    _, first, counts = np.unique(edges[sort], return_index=True, return_counts=True)
+    pairs = first[counts == 2]
+    a, b = sort[pairs], sort[pairs + 1]
+
+    a0, a1 = uvs[order[a]], uvs[next_order[a]]
+    # The two faces usually run the edge in opposite directions
+    same_direction = (loop_vertices[order[a]] == loop_vertices[order[b]])[:, None]
+    b0 = np.where(same_direction, uvs[order[b]], uvs[next_order[b]])
+    b1 = np.where(same_direction, uvs[next_order[b]], uvs[order[b]])
+
+    split = (np.hypot(*(a0 - b0).T) > 1e-6) | (np.hypot(*(a1 - b1).T) > 1e-6)
+    segments_a = np.concatenate([a0, a1], axis=1)[split]
+    segments_b = np.concatenate([b0, b1], axis=1)[split]
+    return segments_a.astype(np.float32).reshape(-1, 4), segments_b.astype(np.float32).reshape(-1, 4)
+
+def find_uv_seams(obj, uv_layer_name="Lightmap"):
+    arrays = read_loop_arrays(obj, uv_layer_name)
+    if arrays is None:
+        return np.empty((0, 4), dtype=np.float32), np.empty((0, 4), dtype=np.float32)
+    return find_seam_segments(*arrays)
+
+def sample_segments(segments, width, height, samples):
+    t = np.linspace(0.0, 1.0, samples, dtype=np.float32)[None, :]
+    u = segments[:, 0:1] + (segments[:, 2:3] - segments[:, 0:1]) * t
+    v = segments[:, 1:2] + (segments[:, 3:4] - segments[:, 1:2]) * t
+    x = np.clip((u * width).astype(np.int64), 0, width - 1)
+    y = np.clip((v * height).astype(np.int64), 0, height - 1)
+    return y.ravel(), x.ravel()
+
+def weld_seams(pixels, valid, objects):
+    welded = 0
+    for obj in objects:
+        welded += weld_segments(pixels, valid, *find_uv_seams(obj))
+    return welded
+
+def weld_segments(pixels, valid, segments_a, segments_b):
+    # Writes into pixels; returns the number of seams welded
+    height, width = pixels.shape[:2]
+    if not len(segments_a):
+        return 0
+
+    # Enough samples along the longest seam to touch every texel it crosses
+    lengths = np.maximum(
+        np.hypot((segments_a[:, 2] - segments_a[:, 0]) * width, (segments_a[:, 3] - segments_a[:, 1]) * height),
+        np.hypot((segments_b[:, 2] - segments_b[:, 0]) * width, (segments_b[:, 3] - segments_b[:, 1]) * height)
+    )
+    samples = int(min(max(np.max(lengths) * 2, 2), 4096))
+
+    ya, xa = sample_segments(segments_a, width, height, samples)
+    yb, xb = sample_segments(segments_b, width, height, samples)
+    # Average where both sides were baked, otherwise copy the baked side across
+    color_a = pixels[ya, xa]
+    color_b = pixels[yb, xb]
+    valid_a = valid[ya, xa][:, None]
+    valid_b = valid[yb, xb][:, None]
+    merged = np.where(valid_a & valid_b, 0.5 * (color_a + color_b), np.where(valid_a, color_a, color_b))
+    keep = (valid_a | valid_b)[:, 0]
+    pixels[ya[keep], xa[keep]] = merged[keep]
+    pixels[yb[keep], xb[keep]] = merged[keep]
+    return len(segments_a)
+
+def postprocess_lightmap(image, objects, dilation_passes, seam_welding):
+    pixels = read_pixels(image)
+
+    # Texels never touched by the bake keep the transparent fill colour
+    valid = pixels[..., 3] > 0.0
+    if not valid.any():
+        print(f"Skipping post-process for {image.name}: no baked texels")
+        return
+
+    if dilation_passes > 0:
+        pixels, valid = dilate_pixels(pixels, valid, dilation_passes)
+        print(f"Dilated {image.name} by {dilation_passes} passes")
+
+    if seam_welding:
+        welded = weld_seams(pixels, valid, objects)
+        print(f"Welded {welded} lightmap seams in {image.name}")
+
+    write_pixels(image, pixels)
@@ -0,0 +1,99 @@
+import unittest
+import numpy as np
+from .lightmap_postprocess import dilate_pixels, find_seam_segments, weld_segments
+
+def two_quads(uvs_right):
+    # Quads 0-1-4-3 and 1-2-5-4 sharing the edge 1-4; the left quad covers u 0-0.4
+    loop_vertices = np.array([0, 1, 4, 3, 1, 2, 5, 4])
+    edge_ids = {}
+    loop_edges = np.array([
+        edge_ids.setdefault(tuple(sorted((loop_vertices[face * 4 + corner], loop_vertices[face * 4 + (corner + 1) % 4]))), len(edge_ids))
+        for face in range(2) for corner in range(4)
+    ])
+    uvs = np.array([(0.0, 0.0), (0.4, 0.0), (0.4, 0.4), (0.0, 0.4)] + uvs_right, dtype=np.float32)
+    return np.array([0, 4]), np.array([4, 4]), loop_vertices, loop_edges, uvs
+
+class TestDilation(unittest.TestCase):
+    def test_one_pass_grows_one_texel(self):
+        pixels = np.zeros((5, 5, 4), dtype=np.float32)
+        valid = np.zeros((5, 5), dtype=bool)
+        pixels[2, 2] = (1.0, 0.5, 0.25, 1.0)
+        valid[2, 2] = True
+
+        dilated, grown = dilate_pixels(pixels, valid, 1)
+        expected = np.zeros((5, 5), dtype=bool)
+        expected[1:4, 1:4] = True
+        np.testing.assert_array_equal(grown, expected)
+        np.testing.assert_allclose(dilated[grown], np.tile(pixels[2, 2], (9, 1)))
+        np.testing.assert_array_equal(dilated[~grown], 0.0)
+        # Inputs are left untouched
+        self.assertEqual(valid.sum(), 1)
+
+    def test_grown_texels_average_their_neighbours(self):
+        pixels = np.zeros((1, 3, 4), dtype=np.float32)
+        pixels[0, 0] = 1.0
+        pixels[0, 2] = 3.0
+        valid = np.array([[True, False, True]])
+        dilated, grown = dilate_pixels(pixels, valid, 1)
+        self.assertTrue(grown.all())
+        np.testing.assert_allclose(dilated[0, 1], 2.0)
+
+    def test_passes_limit_growth(self):
+        pixels = np.zeros((1, 8, 4), dtype=np.float32)
+        valid = np.zeros((1, 8), dtype=bool)
+        valid[0, 0] = True
+        _, grown = dilate_pixels(pixels, valid, 3)
+        np.testing.assert_array_equal(grown[0], [True] * 4 + [False] * 4)
+
+    def test_nothing_to_grow_from(self):
+        pixels = np.zeros((4, 4, 4), dtype=np.float32)
+        valid = np.zeros((4, 4), dtype=bool)
+        dilated, grown = dilate_pixels(pixels, valid, 4)
+        self.assertFalse(grown.any())
+        np.testing.assert_array_equal(dilated, pixels)
+
+class TestSeamWelding(unittest.TestCase):
+    def test_split_edge_is_a_seam(self):
+        segments_a, segments_b = find_seam_segments(*two_quads([(0.6, 0.0), (1.0, 0.0), (1.0, 0.4), (0.6, 0.4)]))
+        self.assertEqual(segments_a.shape, (1, 4))
+        # Both sides run the shared edge from vertex 1 to vertex 4
+        np.testing.assert_allclose(segments_a[0], [0.4, 0.0, 0.4, 0.4])
+        np.testing.assert_allclose(segments_b[0], [0.6, 0.0, 0.6, 0.4])
+
+    def test_connected_edge_is_not_a_seam(self):
+        segments_a, segments_b = find_seam_segments(*two_quads([(0.4, 0.0), (1.0, 0.0), (1.0, 0.4), (0.4, 0.4)]))
+        self.assertEqual(segments_a.shape, (0, 4))
+        self.assertEqual(segments_b.shape, (0, 4))
+
+    def test_weld_averages_both_sides(self):
+        pixels = np.zeros((10, 10, 4), dtype=np.float32)
+        pixels[:, 4] = 1.0
+        pixels[:, 6] = 3.0
+        valid = np.ones((10, 10), dtype=bool)
+        segments_a = np.array([[0.45, 0.0, 0.45, 1.0]], dtype=np.float32)
+        segments_b = np.array([[0.65, 0.0, 0.65, 1.0]], dtype=np.float32)
+
+        self.assertEqual(weld_segments(pixels, valid, segments_a, segments_b), 1)
+        np.testing.assert_allclose(pixels[:, 4], 2.0)
+        np.testing.assert_allclose(pixels[:, 6], 2.0)
+        np.testing.assert_array_equal(pixels[:, 5], 0.0)
+
+    def test_weld_copies_the_baked_side(self):
+        pixels = np.zeros((4, 4, 4), dtype=np.float32)
+        pixels[:, 0] = 5.0
+        valid = np.zeros((4, 4), dtype=bool)
+        valid[:, 0] = True
+        segments_a = np.array([[0.1, 0.0, 0.1, 1.0]], dtype=np.float32)
+        segments_b = np.array([[0.9, 0.0, 0.9, 1.0]], dtype=np.float32)
+
+        weld_segments(pixels, valid, segments_a, segments_b)
+        np.testing.assert_allclose(pixels[:, 3], 5.0)
+        np.testing.assert_allclose(pixels[:, 0], 5.0)
+
+    def test_no_segments(self):
+        pixels = np.ones((2, 2, 4), dtype=np.float32)
+        empty = np.empty((0, 4), dtype=np.float32)
+        self.assertEqual(weld_segments(pixels, np.ones((2, 2), dtype=bool), empty, empty), 0)
+
+if __name__ == "__main__":
+    unittest.main()
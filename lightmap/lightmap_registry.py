@@ -0,0 +1,219 @@
+import bpy
+from bpy.app.handlers import persistent
+
+LIGHTMAP_PREFIX = "vircadia_lightmapData_"
+REGISTRY_PROPERTY = "vircadia_lightmap_registry"
+
+# In-memory view of the scene registry: lightmap id -> resolved datablocks.
+# Datablock references go stale on undo and file load, so handlers mark it dirty. Deleted images,
+# materials and objects are noticed by their collection shrinking, checked after every depsgraph
+# update and when the index is used, so panel polls don't touch every registered ID. Nodes are never
+# held, since Blender doesn't invalidate Python references to removed nodes; they are looked up by
+# label when needed.
+_index = {}
+_material_ids = {}
+_index_valid = False
+_index_scene = None
+_id_counts = None
+
+def lightmap_id_from_name(name):
+    # Names created by the lightmap generator look like vircadia_lightmapData_<id>
+    if not name.startswith(LIGHTMAP_PREFIX):
+        return None
+    return name[len(LIGHTMAP_PREFIX):].split("_")[0] or None
+
+def invalidate():
+    global _index_valid
+    _index_valid = False
+
+def current_id_counts():
+    return (len(bpy.data.images), len(bpy.data.materials), len(bpy.data.objects))
+
+def check_removed_ids():
+    # A count below the last one seen means something was deleted; additions only raise the baseline,
+    # so an add following a delete in the same step can't hide it
+    global _id_counts
+    counts = current_id_counts()
+    if _id_counts is not None and any(now < before for now, before in zip(counts, _id_counts)):
+        invalidate()
+    _id_counts = counts
+
+def get_registry_data(scene):
+    data = scene.get(REGISTRY_PROPERTY)
+    return data.to_dict() if data is not None else None
+
+def find_labelled_node(material, lightmap_id):
+    if not material.use_nodes:
+        return None
+    label = f"{LIGHTMAP_PREFIX}{lightmap_id}"
+    return next((node for node in material.node_tree.nodes if node.type == 'TEX_IMAGE' and node.label == label), None)
+
+def scan_legacy_lightmaps():
+    # Files baked before the registry existed: derive it from node labels once
+    data = {}
+    for mat in bpy.data.materials:
+        if not mat.use_nodes:
+            continue
+        for node in mat.node_tree.nodes:
+            if node.type == 'TEX_IMAGE':
+                lightmap_id = lightmap_id_from_name(node.label)
+                if lightmap_id:
+                    entry = data.setdefault(lightmap_id, {"image": "", "materials": [], "objects": [], "data_material": ""})
+                    if node.image and not entry["image"]:
+                        entry["image"] = node.image.name
+                    entry["materials"].append(mat.name)
+
+    lightmap_materials = {name for entry in data.values() for name in entry["materials"]}
+    for obj in bpy.data.objects:
+        if obj.type == 'MESH' and any(slot.material and slot.material.name in lightmap_materials for slot in obj.material_slots):
+            lightmap_id = lightmap_id_from_name(obj.get("vircadia_lightmap", ""))
+            if lightmap_id in data:
+                data[lightmap_id]["objects"].append(obj.name)
+
+    for lightmap_id, entry in data.items():
+        if f"{LIGHTMAP_PREFIX}{lightmap_id}" in bpy.data.materials:
+            entry["data_material"] = f"{LIGHTMAP_PREFIX}{lightmap_id}"
+    return data
+
+def rebuild_index(scene=None):
+    global _index, _material_ids, _index_valid, _index_scene
+    scene = scene or bpy.context.scene
+
+    # Legacy files are only scanned here; the result is written back on the next change,
+    # since this can run from poll/draw where ID properties are read-only
+    data = get_registry_data(scene)
+    if data is None:
+        data = scan_legacy_lightmaps()
+
+    _index = {}
+    _material_ids = {}
+    for lightmap_id, entry in data.items():
+        materials = [bpy.data.materials.get(name) for name in entry.get("materials", [])]
+        materials = [mat for mat in materials if mat is not None and find_labelled_node(mat, lightmap_id) is not None]
+        for mat in materials:
+            _material_ids.setdefault(mat.name, set()).add(lightmap_id)
+
+        _index[lightmap_id] = {
+            "image": bpy.data.images.get(entry.get("image", "")),
+            "materials": materials,
+            "objects": [obj for obj in (bpy.data.objects.get(name) for name in entry.get("objects", [])) if obj is not None],
+            "data_material": bpy.data.materials.get(entry.get("data_material", "")),
+        }
+
+    _index_valid = True
+    _index_scene = scene.name
+    return _index
+
+def get_index(scene=None):
+    scene = scene or bpy.context.scene
+    check_removed_ids()
+    if not _index_valid or _index_scene != scene.name:
+        rebuild_index(scene)
+    return _index
+
+def save_index(scene):
+    # Rewrites the whole scene property; bulk changes pass save=False and call this once at the end
+    scene[REGISTRY_PROPERTY] = {
+        lightmap_id: {
+            "image": entry["image"].name if entry["image"] else "",
+            "materials": [mat.name for mat in entry["materials"]],
+            "objects": [obj.name for obj in entry["objects"]],
+            "data_material": entry["data_material"].name if entry["data_material"] else "",
+        }
+        for lightmap_id, entry in _index.items()
+    }
+
+def register_lightmap(scene, lightmap_id, image=None, materials=(), objects=(), data_material=None, save=True):
+    index = get_index(scene)
+    entry = index.setdefault(lightmap_id, {"image": None, "materials": [], "objects": [], "data_material": None})
+
+    if image is not None:
+        entry["image"] = image
+    for mat in materials:
+        if mat not in entry["materials"] and find_labelled_node(mat, lightmap_id) is not None:
+            entry["materials"].append(mat)
+            _material_ids.setdefault(mat.name, set()).add(lightmap_id)
+    for obj in objects:
+        if obj not in entry["objects"]:
+            entry["objects"].append(obj)
+    if data_material is not None:
+        entry["data_material"] = data_material
+
+    if save:
+        save_index(scene)
+    return entry
+
+def unregister_lightmap(scene, lightmap_id, save=True):
+    index = get_index(scene)
+    entry = index.pop(lightmap_id, None)
+    if entry is not None:
+        for mat in entry["materials"]:
+            ids = _material_ids.get(mat.name)
+            if ids:
+                ids.discard(lightmap_id)
+
+    if save:
+        save_index(scene)
+
+def lightmap_ids_for_material(material):
+    get_index()
+    return set(_material_ids.get(material.name, ()))
+
+def lightmap_ids_for_object(obj):
+    ids = set()
+    for slot in obj.material_slots:
+        if slot.material:
+            ids |= lightmap_ids_for_material(slot.material)
+    return ids
+
+def iter_lightmap_materials():
+    # Every (material, lightmap node) pair, each material once; materials whose node was deleted are skipped
+    seen = set()
+    for lightmap_id, entry in get_index().items():
+        for mat in entry["materials"]:
+            if mat.name in seen:
+                continue
+            node = find_labelled_node(mat, lightmap_id)
+            if node is not None:
+                seen.add(mat.name)
+                yield mat, node
+
+def materials_for_lightmaps(lightmap_ids):
+    materials = set()
+    index = get_index()
+    for lightmap_id in lightmap_ids:
+        if lightmap_id in index:
+            materials.update(index[lightmap_id]["materials"])
+    return materials
+
+def objects_for_lightmaps(lightmap_ids):
+    objects = set()
+    index = get_index()
+    for lightmap_id in lightmap_ids:
+        if lightmap_id in index:
+            objects.update(index[lightmap_id]["objects"])
+    return objects
+
+@persistent
+def lightmap_registry_load_post(dummy):
+    invalidate()
+
+@persistent
+def lightmap_registry_undo_post(dummy):
+    invalidate()
+
+@persistent
+def lightmap_registry_depsgraph_update_post(scene, depsgraph):
+    check_removed_ids()
+
+def register():
+    bpy.app.handlers.load_post.append(lightmap_registry_load_post)
+    bpy.app.handlers.undo_post.append(lightmap_registry_undo_post)
+    bpy.app.handlers.redo_post.append(lightmap_registry_undo_post)
+    bpy.app.handlers.depsgraph_update_post.append(lightmap_registry_depsgraph_update_post)
+
+def unregister():
+    bpy.app.handlers.depsgraph_update_post.remove(lightmap_registry_depsgraph_update_post)
+    bpy.app.handlers.redo_post.remove(lightmap_registry_undo_post)
+    bpy.app.handlers.undo_post.remove(lightmap_registry_undo_post)
+    bpy.app.handlers.load_post.remove(lightmap_registry_load_post)
@@ -1,5 +1,7 @@
 import bpy
 import bmesh
+import json
+from collections import defaultdict
 
 def get_lightmap_settings(scene):
     return {
@@ -7,11 +9,14 @@ def get_lightmap_settings(scene):
         'texel_density': scene.vircadia_lightmap_texel_density,
         'min_resolution': scene.vircadia_lightmap_min_resolution,
         'max_resolution': scene.vircadia_lightmap_max_resolution,
+        'memory_budget': scene.vircadia_lightmap_memory_budget,
         'factor_shared_materials': scene.vircadia_lightmap_factor_shared_materials,
         'unwrap_context': scene.vircadia_lightmap_unwrap_context,
         'margin': scene.vircadia_lightmap_margin,
         'uv_type': scene.vircadia_lightmap_uv_type,
-        'automatic_grouping': scene.vircadia_lightmap_automatic_grouping
+        'automatic_grouping': scene.vircadia_lightmap_automatic_grouping,
+        'use_atlas': scene.vircadia_lightmap_use_atlas,
+        'atlas_page_size': int(scene.vircadia_lightmap_atlas_page_size)
     }
 
 def get_bake_settings(scene):
@@ -26,11 +31,121 @@ def get_bake_settings(scene):
         'samples': scene.vircadia_lightmap_samples,
         'adaptive_min_samples': scene.vircadia_lightmap_adaptive_min_samples,
         'use_denoising': scene.vircadia_lightmap_use_denoising,
+        'keep_bake_passes': scene.vircadia_lightmap_keep_bake_passes,
         'denoiser': scene.vircadia_lightmap_denoiser,
         'denoising_input_passes': scene.vircadia_lightmap_denoising_input_passes,
-        'bake_margin': scene.vircadia_lightmap_bake_margin
+        'denoising_prefilter': scene.vircadia_lightmap_denoising_prefilter,
+        'denoising_quality': scene.vircadia_lightmap_denoising_quality,
+        'bake_margin': scene.vircadia_lightmap_bake_margin,
+        'tile_size': scene.vircadia_lightmap_tile_size,
+        'progressive': scene.vircadia_lightmap_progressive,
+        'preview_samples': scene.vircadia_lightmap_preview_samples,
+        'noise_threshold': scene.vircadia_lightmap_noise_threshold,
+        'time_budget': scene.vircadia_lightmap_time_budget,
+        'dilation_passes': scene.vircadia_lightmap_dilation_passes,
+        'seam_welding': scene.vircadia_lightmap_seam_welding
     }
 
+def get_encoding_settings(scene):
+    return {
+        'encoding': scene.vircadia_lightmap_encoding,
+        'rgbm_range': scene.vircadia_lightmap_rgbm_range,
+        'write_ktx2': scene.vircadia_lightmap_write_ktx2,
+        'generate_mips': scene.vircadia_lightmap_generate_mips,
+        'output_dir': scene.vircadia_lightmap_output_dir
+    }
+
+# Named bake profiles; each entry is applied to the matching vircadia_lightmap_* scene property
+BAKE_PROFILES = {
+    'DRAFT': {
+        'samples': 16,
+        'use_adaptive_sampling': True,
+        'adaptive_threshold': 0.1,
+        'adaptive_min_samples': 0,
+        'use_denoising': False,
+        'denoising_input_passes': 'RGB_ALBEDO',
+        'progressive': False,
+        'dilation_passes': 2,
+        'seam_welding': False,
+    },
+    'PREVIEW': {
+        'samples': 64,
+        'use_adaptive_sampling': True,
+        'adaptive_threshold': 0.05,
+        'adaptive_min_samples': 0,
+        'use_denoising': False,
+        'denoising_input_passes': 'RGB_ALBEDO',
+        'progressive': False,
+        'dilation_passes': 4,
+        'seam_welding': True,
+    },
+    'PRODUCTION': {
+        'samples': 512,
+        'use_adaptive_sampling': True,
+        'adaptive_threshold': 0.01,
+        'adaptive_min_samples': 64,
+        'use_denoising': True,
+        'denoising_input_passes': 'RGB_ALBEDO_NORMAL',
+        'denoising_prefilter': 'ACCURATE',
+        'denoising_quality': 'HIGH',
+        'progressive': False,
+        'dilation_passes': 8,
+        'seam_welding': True,
+    },
+}
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_PROPERTY = "vircadia_lightmap_settings_snapshot"
+
+def apply_settings(scene, settings):
+    # Write plain settings back to the scene properties they were read from
+    for key, value in settings.items():
+        prop_name = f"vircadia_lightmap_{key}"
+        if not hasattr(scene, prop_name):
+            raise KeyError(f"Unknown lightmap setting '{key}'")
+        # Enum properties such as the atlas page size are stored as strings
+        if isinstance(getattr(scene, prop_name), str):
+            value = str(value)
+        setattr(scene, prop_name, value)
+
+def apply_bake_profile(scene, profile_name):
+    apply_settings(scene, BAKE_PROFILES[profile_name])
+    print(f"Applied lightmap bake profile {profile_name}")
+
+def build_settings_snapshot(lightmap_settings, bake_settings, encoding_settings):
+    return {
+        "version": SNAPSHOT_VERSION,
+        "lightmap": dict(lightmap_settings),
+        "bake": dict(bake_settings),
+        "encoding": dict(encoding_settings) if encoding_settings else {},
+    }
+
+def snapshot_settings(scene):
+    return build_settings_snapshot(get_lightmap_settings(scene), get_bake_settings(scene), get_encoding_settings(scene))
+
+def serialize_snapshot(snapshot):
+    # Sorted keys so identical settings always produce identical text
+    return json.dumps(snapshot, sort_keys=True, indent=2)
+
+def apply_snapshot(scene, snapshot):
+    for section in ("lightmap", "bake", "encoding"):
+        apply_settings(scene, snapshot.get(section, {}))
+
+def save_profile(filepath, snapshot):
+    with open(filepath, 'w') as f:
+        f.write(serialize_snapshot(snapshot))
+
+def load_profile(filepath):
+    with open(filepath, 'r') as f:
+        snapshot = json.load(f)
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported lightmap profile version in {filepath}")
+    return snapshot
+
+def store_settings_snapshot(scene, snapshot):
+    # Record exactly what a bake ran with, next to the lightmaps it produced
+    scene[SNAPSHOT_PROPERTY] = serialize_snapshot(snapshot)
+
 def setup_bake_settings(scene):
     bake_settings = get_bake_settings(scene)
     
@@ -58,6 +173,19 @@ def apply_bake_settings(settings):
         else:
             setattr(bpy.context.scene.cycles, setting, value)
 
+def build_material_object_index(objects=None):
+    # One pass over objects and their slots: material name -> mesh objects using it
+    index = defaultdict(list)
+    for obj in (bpy.data.objects if objects is None else objects):
+        if obj.type != 'MESH':
+            continue
+        seen = set()
+        for slot in obj.material_slots:
+            if slot.material and slot.material.name not in seen:
+                seen.add(slot.material.name)
+                index[slot.material.name].append(obj)
+    return index
+
 def calculate_total_surface_area(objects):
     total_area = 0.0
     for obj in objects:
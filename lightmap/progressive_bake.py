@@ -0,0 +1,158 @@
+import bpy
+import time
+import numpy as np
+from .tiled_bake import get_bake_target_image
+from . import lightmap_encoding
+
+# The job currently refining lightmaps in the background, if any
+active_job = None
+
+def build_sample_schedule(preview_samples, target_samples, factor=4):
+    schedule = []
+    samples = max(1, preview_samples)
+    while samples < target_samples:
+        schedule.append(samples)
+        samples *= factor
+    schedule.append(target_samples)
+    return schedule
+
+def read_image_pixels(image):
+    pixels = np.empty(image.size[0] * image.size[1] * 4, dtype=np.float32)
+    image.pixels.foreach_get(pixels)
+    return pixels.reshape(-1, 4)
+
+def estimate_noise(previous, current):
+    # The change between two passes approximates the error left in the earlier one;
+    # only texels that were actually baked (non-zero alpha) are considered
+    valid = current[:, 3] > 0.0
+    if not np.any(valid):
+        return 0.0
+    return float(np.mean(np.abs(current[valid, :3] - previous[valid, :3])))
+
+def activate_lightmap_uvs(objects):
+    previous = {}
+    for obj in objects:
+        uv_layers = obj.data.uv_layers
+        if "Lightmap" in uv_layers:
+            previous[obj.name] = uv_layers.active.name if uv_layers.active else None
+            uv_layers.active = uv_layers["Lightmap"]
+    return previous
+
+def restore_active_uvs(objects, previous):
+    for obj in objects:
+        name = previous.get(obj.name)
+        if name and name in obj.data.uv_layers:
+            obj.data.uv_layers.active = obj.data.uv_layers[name]
+
+def find_ui_context():
+    # Timer callbacks run with no window or area, so operators like select_all and mode_set fail
+    # their polls; refinement passes borrow a 3D view, or at least a window, for their overrides
+    window_manager = bpy.context.window_manager
+    if window_manager is None or not window_manager.windows:
+        return None
+    for window in window_manager.windows:
+        for area in window.screen.areas:
+            if area.type == 'VIEW_3D':
+                region = next((region for region in area.regions if region.type == 'WINDOW'), None)
+                return dict(window=window, screen=window.screen, area=area, region=region)
+    window = window_manager.windows[0]
+    return dict(window=window, screen=window.screen)
+
+class ProgressiveBakeJob:
+    def __init__(self, bake_groups, bake_settings, schedule, bake_fn, encoding_settings=None, lightmap_ids=None):
+        self.bake_groups = bake_groups
+        self.bake_settings = bake_settings
+        # Encoded copies written after the preview pass are refreshed once refinement stops
+        self.encoding_settings = encoding_settings
+        self.lightmap_ids = lightmap_ids
+        self.refined = False
+        self.schedule = schedule
+        self.bake_fn = bake_fn
+        self.noise_threshold = bake_settings['noise_threshold']
+        self.time_budget = bake_settings['time_budget']
+        self.pass_index = 0
+        self.group_index = 0
+        self.pass_noise = []
+        self.cancelled = False
+        self.started_at = None
+        self.last_noise = None
+
+    def start(self):
+        global active_job
+        if active_job is not None:
+            active_job.cancel()
+        active_job = self
+        self.started_at = time.time()
+        bpy.app.timers.register(self.step, first_interval=0.5)
+        print(f"Progressive bake started, remaining sample passes: {self.schedule}")
+
+    def cancel(self):
+        self.cancelled = True
+
+    def finish(self, reason):
+        global active_job
+        if active_job is self:
+            active_job = None
+        print(f"Progressive bake finished: {reason}")
+        if self.refined and self.encoding_settings and self.encoding_settings['encoding'] != 'NONE':
+            lightmap_encoding.encode_lightmaps(self.encoding_settings, self.lightmap_ids)
+        return None
+
+    def current_samples(self):
+        return self.schedule[self.pass_index] if self.pass_index < len(self.schedule) else None
+
+    def step(self):
+        # Bake one group per timer tick so the UI stays responsive between bakes
+        if self.cancelled:
+            return self.finish("cancelled")
+        if self.pass_index >= len(self.schedule):
+            return self.finish("target sample count reached")
+        if time.time() - self.started_at > self.time_budget:
+            return self.finish(f"time budget of {self.time_budget:.0f}s used")
+
+        group = self.bake_groups[self.group_index]
+        objects = [obj for obj in group["objects"] if obj.name in bpy.data.objects]
+        samples = self.current_samples()
+
+        if objects:
+            image = get_bake_target_image(objects)
+            previous = read_image_pixels(image) if image is not None else None
+
+            ui_context = find_ui_context()
+            if ui_context is None:
+                return self.finish("no window to bake in")
+
+            pass_settings = dict(self.bake_settings, samples=samples)
+            previous_uvs = activate_lightmap_uvs(objects)
+            try:
+                with bpy.context.temp_override(**ui_context):
+                    self.bake_fn(objects, pass_settings)
+            except RuntimeError as e:
+                print(f"Progressive bake pass failed for {group['name']}: {str(e)}")
+                return self.finish("bake error")
+            finally:
+                restore_active_uvs(objects, previous_uvs)
+
+            self.refined = True
+            if previous is not None:
+                self.pass_noise.append(estimate_noise(previous, read_image_pixels(image)))
+            print(f"Progressive bake: {group['name']} refined at {samples} samples")
+
+        self.group_index += 1
+        if self.group_index >= len(self.bake_groups):
+            self.group_index = 0
+            self.pass_index += 1
+            self.last_noise = max(self.pass_noise) if self.pass_noise else None
+            self.pass_noise = []
+            print(f"Progressive bake pass at {samples} samples done, estimated noise: {self.last_noise}")
+            if self.last_noise is not None and self.last_noise < self.noise_threshold:
+                return self.finish(f"noise {self.last_noise:.5f} below threshold {self.noise_threshold}")
+
+        return 0.1
+
+def is_running():
+    return active_job is not None
+
+def cancel_active_job():
+    if active_job is not None:
+        active_job.cancel()
@@ -0,0 +1,187 @@
+import bpy
+import os
+import numpy as np
+
+def plan_bake_tiles(width, height, tile_size, overlap):
+    # Each tile bakes its core region plus an overlap border, so the bake margin
+    # of charts crossing a tile edge is still computed from real neighbours.
+    # Only the core is written back when stitching.
+    tiles = []
+    index = 0
+    for core_y in range(0, height, tile_size):
+        for core_x in range(0, width, tile_size):
+            core_width = min(tile_size, width - core_x)
+            core_height = min(tile_size, height - core_y)
+            x = max(0, core_x - overlap)
+            y = max(0, core_y - overlap)
+            tiles.append({
+                "index": index,
+                "x": x,
+                "y": y,
+                "width": min(width, core_x + core_width + overlap) - x,
+                "height": min(height, core_y + core_height + overlap) - y,
+                "core_x": core_x,
+                "core_y": core_y,
+                "core_width": core_width,
+                "core_height": core_height,
+            })
+            index += 1
+    return tiles
+
+def get_bake_target_images(objects):
+    # The bake writes into the active image node of every material involved
+    images = set()
+    for obj in objects:
+        for mat_slot in obj.material_slots:
+            mat = mat_slot.material
+            if mat is None or not mat.use_nodes:
+                continue
+            node = mat.node_tree.nodes.active
+            if node is not None and node.type == 'TEX_IMAGE' and node.image is not None:
+                images.add(node.image)
+    return images
+
+def get_bake_target_image(objects):
+    images = get_bake_target_images(objects)
+    if len(images) != 1:
+        return None
+    return images.pop()
+
+def get_lightmap_uvs(obj, uv_layer_name="Lightmap"):
+    uv_layer = obj.data.uv_layers.get(uv_layer_name)
+    if uv_layer is None:
+        return None
+    coords = np.empty(len(uv_layer.data) * 2, dtype=np.float32)
+    uv_layer.data.foreach_get("uv", coords)
+    return coords
+
+def set_lightmap_uvs(obj, coords, uv_layer_name="Lightmap"):
+    uv_layer = obj.data.uv_layers.get(uv_layer_name)
+    if uv_layer is not None:
+        uv_layer.data.foreach_set("uv", coords)
+        obj.data.update()
+
+def swap_target_image(objects, target_image, replacement):
+    swapped = []
+    for obj in objects:
+        for mat_slot in obj.material_slots:
+            mat = mat_slot.material
+            if mat is None or not mat.use_nodes:
+                continue
+            node = mat.node_tree.nodes.active
+            if node is not None and node.type == 'TEX_IMAGE' and node.image == target_image:
+                node.image = replacement
+                swapped.append(node)
+    return swapped
+
+def bake_tile(objects, target_image, tile, run_bake):
+    width, height = target_image.size
+
+    # Remap the Lightmap UVs so this tile's region fills 0-1; anything outside is skipped by the baker
+    original_uvs = {}
+    for obj in objects:
+        coords = get_lightmap_uvs(obj)
+        if coords is None:
+            continue
+        original_uvs[obj.name] = coords
+        tile_coords = coords.reshape(-1, 2).copy()
+        tile_coords[:, 0] = (tile_coords[:, 0] * width - tile["x"]) / tile["width"]
+        tile_coords[:, 1] = (tile_coords[:, 1] * height - tile["y"]) / tile["height"]
+        set_lightmap_uvs(obj, tile_coords.ravel())
+
+    tile_image = bpy.data.images.new(
+        name=f"{target_image.name}_tile_{tile['index']}",
+        width=tile["width"],
+        height=tile["height"],
+        float_buffer=target_image.is_float,
+        alpha=True
+    )
+    tile_image.generated_color = (0.0, 0.0, 0.0, 0.0)
+    tile_image.colorspace_settings.name = target_image.colorspace_settings.name
+    swapped_nodes = swap_target_image(objects, target_image, tile_image)
+
+    try:
+        run_bake()
+        tile_pixels = np.empty(tile["width"] * tile["height"] * 4, dtype=np.float32)
+        tile_image.pixels.foreach_get(tile_pixels)
+    finally:
+        for node in swapped_nodes:
+            node.image = target_image
+        for obj in objects:
+            if obj.name in original_uvs:
+                set_lightmap_uvs(obj, original_uvs[obj.name])
+        bpy.data.images.remove(tile_image)
+
+    return tile_pixels.reshape(tile["height"], tile["width"], 4)
+
+def stitch_tile(pixels, tile, tile_pixels):
+    # Copy the tile's core region into the (height, width, 4) buffer of the whole image
+    core_left = tile["core_x"] - tile["x"]
+    core_top = tile["core_y"] - tile["y"]
+    pixels[tile["core_y"]:tile["core_y"] + tile["core_height"], tile["core_x"]:tile["core_x"] + tile["core_width"]] = \
+        tile_pixels[core_top:core_top + tile["core_height"], core_left:core_left + tile["core_width"]]
+
+def plan_image_tiles(target_image, bake_settings):
+    width, height = target_image.size
+    overlap = max(bake_settings['bake_margin'] * 2, 1)
+    return plan_bake_tiles(width, height, bake_settings['tile_size'], overlap)
+
+def write_stitched_pixels(target_image, pixels):
+    target_image.pixels.foreach_set(pixels.ravel())
+    target_image.update()
+
+def bake_objects_tiled(objects, target_image, bake_settings, run_bake):
+    width, height = target_image.size
+    tiles = plan_image_tiles(target_image, bake_settings)
+    print(f"Baking {target_image.name} ({width}x{height}) in {len(tiles)} tiles of {bake_settings['tile_size']}px")
+
+    # Tiles are stitched into one buffer that is written to the image once; bpy pixel slices
+    # would copy the whole image on every assignment
+    pixels = np.zeros((height, width, 4), dtype=np.float32)
+    for tile in tiles:
+        print(f"Baking tile {tile['index'] + 1}/{len(tiles)} at ({tile['core_x']}, {tile['core_y']})")
+        tile_pixels = bake_tile(objects, target_image, tile, run_bake)
+        stitch_tile(pixels, tile, tile_pixels)
+
+    write_stitched_pixels(target_image, pixels)
+
+# Distributed baking: every worker opens the same .blend, which must already hold the lightmap
+# images and Lightmap UVs (e.g. saved after a bake), and calls bake_tiles_to_directory for its share
+# of the tiles. Once all tile files are in one directory, assemble_tiles_from_directory stitches them.
+
+def tile_filepath(directory, target_image, tile):
+    return os.path.join(directory, f"{bpy.path.clean_name(target_image.name)}_tile_{tile['index']}.npy")
+
+def save_tile_pixels(tile_pixels, filepath):
+    np.save(filepath, tile_pixels.astype(np.float32))
+
+def load_tile_pixels(filepath):
+    return np.load(filepath).astype(np.float32)
+
+def bake_tiles_to_directory(objects, target_image, bake_settings, run_bake, directory, tile_indices=None):
+    # tile_indices: this worker's tiles, None for all of them. Returns the written file paths.
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for tile in plan_image_tiles(target_image, bake_settings):
+        if tile_indices is not None and tile["index"] not in tile_indices:
+            continue
+        print(f"Baking tile {tile['index']} of {target_image.name} to {directory}")
+        path = tile_filepath(directory, target_image, tile)
+        save_tile_pixels(bake_tile(objects, target_image, tile, run_bake), path)
+        paths.append(path)
+    return paths
+
+def assemble_tiles_from_directory(target_image, bake_settings, directory):
+    tiles = plan_image_tiles(target_image, bake_settings)
+    missing = [tile["index"] for tile in tiles if not os.path.exists(tile_filepath(directory, target_image, tile))]
+    if missing:
+        raise FileNotFoundError(f"Tiles {missing} of {target_image.name} are missing from {directory}")
+
+    width, height = target_image.size
+    pixels = np.zeros((height, width, 4), dtype=np.float32)
+    for tile in tiles:
+        tile_pixels = load_tile_pixels(tile_filepath(directory, target_image, tile))
+        if tile_pixels.shape != (tile["height"], tile["width"], 4):
+            raise ValueError(f"Tile {tile['index']} of {target_image.name} was baked with a different size or tile plan")
+        stitch_tile(pixels, tile, tile_pixels)
+    write_stitched_pixels(target_image, pixels)
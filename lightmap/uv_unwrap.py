@@ -0,0 +1,207 @@
+import math
+import numpy as np
+from .atlas_packer import shelf_pack_rects
+
+# Largest angle between a face and its chart's seed face for the projection based modes.
+# Lightmap Pack keeps charts near-planar, Smart UV Project matches Blender's default.
+CHART_ANGLE_LIMITS = {
+    'LIGHTMAP_PACK': 5.0,
+    'SMART_UV_PROJECT': 66.0,
+}
+
+# Margin setting (0-1) to padding around each chart, as a fraction of the packed UV square
+MARGIN_SCALE = 0.02
+
+def read_mesh_arrays(obj):
+    mesh = obj.data
+    vertex_count, loop_count, face_count = len(mesh.vertices), len(mesh.loops), len(mesh.polygons)
+
+    co = np.empty(vertex_count * 3, dtype=np.float64)
+    mesh.vertices.foreach_get("co", co)
+    loop_vertices = np.empty(loop_count, dtype=np.int64)
+    mesh.loops.foreach_get("vertex_index", loop_vertices)
+    loop_edges = np.empty(loop_count, dtype=np.int64)
+    mesh.loops.foreach_get("edge_index", loop_edges)
+    loop_start = np.empty(face_count, dtype=np.int64)
+    mesh.polygons.foreach_get("loop_start", loop_start)
+    loop_total = np.empty(face_count, dtype=np.int64)
+    mesh.polygons.foreach_get("loop_total", loop_total)
+    seams = np.empty(len(mesh.edges), dtype=bool)
+    mesh.edges.foreach_get("use_seam", seams)
+
+    # World space, so charts from different objects share one texel density
+    matrix = np.array(obj.matrix_world, dtype=np.float64)
+    co = co.reshape(-1, 3) @ matrix[:3, :3].T + matrix[:3, 3]
+
+    return {
+        "co": co,
+        "loop_vertices": loop_vertices,
+        "loop_edges": loop_edges,
+        "loop_start": loop_start,
+        "loop_total": loop_total,
+        "seams": seams,
+    }
+
+def face_loop_order(loop_start, loop_total):
+    # Loop indices grouped face by face, the owning face of each, and the next loop around that face
+    face_count = len(loop_start)
+    face_of = np.repeat(np.arange(face_count), loop_total)
+    first = np.cumsum(loop_total) - loop_total
+    corner = np.arange(len(face_of)) - np.repeat(first, loop_total)
+    order = np.repeat(loop_start, loop_total) + corner
+    next_corner = (corner + 1) % np.repeat(np.maximum(loop_total, 1), loop_total)
+    next_order = np.repeat(loop_start, loop_total) + next_corner
+    return order, face_of, next_order
+
+def face_area_vectors(co, loop_vertices, order, face_of, next_order, face_count):
+    # Newell's method: the vector length is the face area, its direction the face normal
+    current = co[loop_vertices[order]]
+    following = co[loop_vertices[next_order]]
+    area_vectors = np.zeros((face_count, 3), dtype=np.float64)
+    np.add.at(area_vectors, face_of, 0.5 * np.cross(current, following))
+    return area_vectors
+
+def face_neighbours(loop_edges, order, face_of, seams, face_count):
+    # CSR adjacency over manifold, non-seam edges
+    edges = loop_edges[order]
+    sort = np.argsort(edges, kind='stable')
+    edges, faces = edges[sort], face_of[sort]
+    shared = (edges[:-1] == edges[1:]) & ~seams[edges[:-1]]
+    # Only edges used by exactly two faces connect charts
+    if len(edges) > 2:
+        shared[1:] &= edges[1:-1] != edges[:-2]
+        shared[:-1] &= edges[1:-1] != edges[2:]
+    a, b = faces[:-1][shared], faces[1:][shared]
+    source = np.concatenate([a, b])
+    target = np.concatenate([b, a])
+    sort = np.argsort(source, kind='stable')
+    pointers = np.searchsorted(source[sort], np.arange(face_count + 1))
+    return pointers, target[sort]
+
+def segment_charts(normals, areas, pointers, neighbours, angle_limit):
+    # Flood fill from the largest faces, adding neighbours within angle_limit of the seed
+    face_count = len(normals)
+    cos_limit = math.cos(math.radians(angle_limit))
+    chart_of = [-1] * face_count
+    normal_list = normals.tolist()
+    pointer_list = pointers.tolist()
+    neighbour_list = neighbours.tolist()
+    chart_count = 0
+
+    for seed in np.argsort(-areas, kind='stable').tolist():
+        if chart_of[seed] >= 0:
+            continue
+        sx, sy, sz = normal_list[seed]
+        chart_of[seed] = chart_count
+        stack = [seed]
+        while stack:
+            face = stack.pop()
+            for other in neighbour_list[pointer_list[face]:pointer_list[face + 1]]:
+                if chart_of[other] >= 0:
+                    continue
+                nx, ny, nz = normal_list[other]
+                if nx * sx + ny * sy + nz * sz >= cos_limit:
+                    chart_of[other] = chart_count
+                    stack.append(other)
+        chart_count += 1
+
+    return np.array(chart_of, dtype=np.int64), chart_count
+
+def chart_bases(chart_normals):
+    # Horizontal u axis where possible, so walls unwrap upright
+    up = np.array([0.0, 0.0, 1.0])
+    forward = np.array([0.0, 1.0, 0.0])
+    reference = np.where((np.abs(chart_normals[:, 2]) < 0.9)[:, None], up, forward)
+    u_axes = np.cross(reference, chart_normals)
+    u_axes /= np.maximum(np.linalg.norm(u_axes, axis=1, keepdims=True), 1e-12)
+    v_axes = np.cross(chart_normals, u_axes)
+    return u_axes, v_axes
+
+def project_object_charts(obj, angle_limit):
+    arrays = read_mesh_arrays(obj)
+    face_count = len(arrays["loop_start"])
+    order, face_of, next_order = face_loop_order(arrays["loop_start"], arrays["loop_total"])
+
+    area_vectors = face_area_vectors(arrays["co"], arrays["loop_vertices"], order, face_of, next_order, face_count)
+    areas = np.linalg.norm(area_vectors, axis=1)
+    normals = area_vectors / np.maximum(areas, 1e-12)[:, None]
+
+    pointers, neighbours = face_neighbours(arrays["loop_edges"], order, face_of, arrays["seams"], face_count)
+    chart_of, chart_count = segment_charts(normals, areas, pointers, neighbours, angle_limit)
+
+    # Project each chart onto the plane of its area-weighted normal
+    chart_normals = np.zeros((chart_count, 3), dtype=np.float64)
+    np.add.at(chart_normals, chart_of, area_vectors)
+    lengths = np.linalg.norm(chart_normals, axis=1)
+    degenerate = lengths < 1e-12
+    chart_normals[degenerate] = [0.0, 0.0, 1.0]
+    chart_normals[~degenerate] /= lengths[~degenerate][:, None]
+    u_axes, v_axes = chart_bases(chart_normals)
+
+    loop_chart = chart_of[face_of]
+    points = arrays["co"][arrays["loop_vertices"][order]]
+    coords = np.stack([
+        np.einsum('ij,ij->i', points, u_axes[loop_chart]),
+        np.einsum('ij,ij->i', points, v_axes[loop_chart]),
+    ], axis=1)
+
+    # Lay every chart on its long side so rows pack tighter
+    low = np.full((chart_count, 2), np.inf)
+    high = np.full((chart_count, 2), -np.inf)
+    np.minimum.at(low, loop_chart, coords)
+    np.maximum.at(high, loop_chart, coords)
+    extents = high - low
+    rotate = extents[:, 1] > extents[:, 0]
+    if rotate.any():
+        turned = rotate[loop_chart]
+        coords[turned] = np.stack([coords[turned, 1], -coords[turned, 0]], axis=1)
+        low = np.full((chart_count, 2), np.inf)
+        high = np.full((chart_count, 2), -np.inf)
+        np.minimum.at(low, loop_chart, coords)
+        np.maximum.at(high, loop_chart, coords)
+        extents = high - low
+
+    return {
+        "order": order,
+        "loop_chart": loop_chart,
+        "coords": coords - low[loop_chart],
+        "extents": extents,
+    }
+
+def write_lightmap_uvs(obj, order, uvs, uv_layer_name="Lightmap"):
+    uv_layer = obj.data.uv_layers.get(uv_layer_name)
+    coords = np.empty((len(uv_layer.data), 2), dtype=np.float32)
+    coords[order] = uvs
+    uv_layer.data.foreach_set("uv", coords.ravel())
+    obj.data.update()
+
+def unwrap_lightmap_uvs(objects, uv_type, margin):
+    # Segment, project and pack every object's faces into one shared 0-1 Lightmap UV space,
+    # working on mesh arrays so no selection, edit mode or UI context is involved
+    angle_limit = CHART_ANGLE_LIMITS[uv_type]
+    objects = [obj for obj in objects if obj.type == 'MESH' and obj.data.uv_layers.get("Lightmap") and len(obj.data.polygons)]
+    if not objects:
+        return 0
+
+    projections = [project_object_charts(obj, angle_limit) for obj in objects]
+    extents = np.concatenate([projection["extents"] for projection in projections])
+
+    # Padding is sized against the expected packed square, then the result is normalised to 0-1
+    side = math.sqrt(max(float(np.sum(extents[:, 0] * extents[:, 1])), 1e-12) / 0.8)
+    padding = margin * MARGIN_SCALE * side
+    padded = extents + padding * 2.0
+    row_width = math.sqrt(float(np.sum(padded[:, 0] * padded[:, 1])))
+    positions, used_width, used_height = shelf_pack_rects(padded.tolist(), row_width)
+    positions = np.array(positions, dtype=np.float64) + padding
+    scale = 1.0 / max(used_width, used_height, 1e-12)
+
+    chart_offset = 0
+    for obj, projection in zip(objects, projections):
+        chart_count = len(projection["extents"])
+        offsets = positions[chart_offset:chart_offset + chart_count]
+        uvs = (projection["coords"] + offsets[projection["loop_chart"]]) * scale
+        write_lightmap_uvs(obj, projection["order"], uvs)
+        chart_offset += chart_count
+
+    print(f"Unwrapped {len(objects)} objects into {len(extents)} lightmap charts")
+    return len(extents)
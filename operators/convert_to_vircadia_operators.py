@@ -1,8 +1,6 @@
 import bpy
-import json
-import os
 from bpy.types import Operator
-from ..utils import property_utils, collection_utils, entities
+from ..utils import property_utils, collection_utils, entities, template_cache, primitive_cache
 
 class VIRCADIA_OT_convert_to_vircadia(Operator):
     bl_idname = "vircadia.convert_to_vircadia"
@@ -13,11 +11,7 @@ class VIRCADIA_OT_convert_to_vircadia(Operator):
         obj = context.active_object
         if obj and obj.type == 'MESH':
             # Load the template_model.json template
-            addon_path = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
-            json_path = os.path.join(addon_path, "templates", f"{entities.ENTITY_TEMPLATES_JSON['model']}")
-
-            with open(json_path, 'r') as f:
-                template = json.load(f)
+            template = template_cache.load_template(entities.ENTITY_TEMPLATES_JSON['model'])
 
             # Get the first entity from the template
             entity = template["Entities"][0]
@@ -73,7 +67,8 @@ class VIRCADIA_OT_selected_to_collision(Operator):
                 for prop in list(obj.keys()):
                     del obj[prop]
 
-                # Remove all materials
+                # Remove all materials, from this object's own mesh rather than a shared primitive
+                primitive_cache.make_single_user(obj)
                 obj.data.materials.clear()
 
                 # Add "collision_" prefix to the object's name
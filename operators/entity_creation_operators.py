@@ -1,9 +1,8 @@
 import bpy
-import json
 import os
 from bpy.types import Operator
 
-from ..utils import entities, object_creation, property_utils, coordinate_utils, collection_utils, world_setup
+from ..utils import entities, object_creation, property_utils, coordinate_utils, collection_utils, world_setup, primitive_cache, template_cache
 
 def get_entity_types(self, context):
     return [(t, t.capitalize(), "", i) for i, t in enumerate(entities.ENTITY_TYPES)]
@@ -19,24 +18,7 @@ class VIRCADIA_OT_create_entity(Operator):
         primitive_type = context.scene.vircadia_primitive_type if entity_type == 'model' else None
 
         # Load the appropriate template JSON based on entity type
-        addon_path = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
-        if entity_type == 'model':
-            json_path = os.path.join(addon_path, "templates", f"{entities.ENTITY_TEMPLATES_JSON[entity_type]}")
-        elif entity_type == 'image':
-            json_path = os.path.join(addon_path, "templates", f"{entities.ENTITY_TEMPLATES_JSON[entity_type]}")
-        elif entity_type == 'light':
-            json_path = os.path.join(addon_path, "templates", f"{entities.ENTITY_TEMPLATES_JSON[entity_type]}")
-        elif entity_type == 'text':
-            json_path = os.path.join(addon_path, "templates", f"{entities.ENTITY_TEMPLATES_JSON[entity_type]}")
-        elif entity_type == 'web':
-            json_path = os.path.join(addon_path, "templates", f"{entities.ENTITY_TEMPLATES_JSON[entity_type]}")
-        elif entity_type == 'zone':
-            json_path = os.path.join(addon_path, "templates", f"{entities.ENTITY_TEMPLATES_JSON[entity_type]}")
-        else:
-            json_path = os.path.join(addon_path, "templates", f"{entities.ENTITY_TEMPLATES_JSON[entity_type]}")
-        
-        with open(json_path, 'r') as f:
-            template = json.load(f)
+        template = template_cache.load_template(entities.ENTITY_TEMPLATES_JSON[entity_type])
 
         # Modify the template based on the selected type
         entity = template["Entities"][0]
@@ -94,7 +76,8 @@ class VIRCADIA_OT_create_entity(Operator):
         bpy.ops.object.select_all(action='DESELECT')
         
         if shape_type == 'box':
-            bpy.ops.mesh.primitive_cube_add()
+            # Boxes share one cube mesh; the template dimensions scale it
+            self.add_primitive_object('box', bpy.context)
         elif shape_type == 'sphere':
             bpy.ops.mesh.primitive_uv_sphere_add()
         elif shape_type == 'isosahedron':
@@ -206,7 +189,7 @@ class VIRCADIA_OT_create_entity(Operator):
         context.view_layer.active_layer_collection = layer_collection
 
         bpy.ops.object.select_all(action='DESELECT')
-        bpy.ops.mesh.primitive_cube_add()
+        self.add_primitive_object('box', context)
 
         obj = context.active_object
         obj.name = "Zone"
@@ -242,6 +225,14 @@ class VIRCADIA_OT_create_entity(Operator):
         # The active collection is already set to "Zone", so we can create the keylight directly
         world_setup.setup_sun_light(zone_obj, bpy.context.collection)
 
+    def add_primitive_object(self, shape, context):
+        # Like primitive_cube_add, but the new object instances the shared primitive mesh
+        obj = primitive_cache.new_primitive_object(shape.capitalize(), shape, context.collection)
+        obj.location = context.scene.cursor.location
+        obj.select_set(True)
+        context.view_layer.objects.active = obj
+        return obj
+
     def set_object_properties(self, obj, entity):
         # Set position
         if "position" in entity:
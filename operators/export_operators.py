@@ -3,6 +3,7 @@ import os
 import logging
 from ..import_export import old_json_exporter, old_gltf_exporter
 from .. import config
+from ..utils import export_presets
 from ..ui.tooltips import ImportExportTooltips
 
 class EXPORT_OT_vircadia_json(bpy.types.Operator):
@@ -11,6 +12,24 @@ class EXPORT_OT_vircadia_json(bpy.types.Operator):
     filepath: bpy.props.StringProperty(subtype="FILE_PATH")
     bl_description = ImportExportTooltips.EXPORT_JSON 
 
+    compact: bpy.props.BoolProperty(
+        name="Compact",
+        description="Write without indentation; roughly halves the file size",
+        default=True
+    )
+    use_gzip: bpy.props.BoolProperty(
+        name="Gzip",
+        description="Compress the file as .json.gz, the format the domain server stores entities in",
+        default=False
+    )
+    float_precision: bpy.props.IntProperty(
+        name="Float Precision",
+        description="Decimal places kept for positions, rotations and other numbers",
+        default=6,
+        min=1,
+        max=17
+    )
+
     def execute(self, context):
         logging.info("Executing JSON export")
         
@@ -20,8 +39,14 @@ class EXPORT_OT_vircadia_json(bpy.types.Operator):
             return {'CANCELLED'}
         
         try:
-            old_json_exporter.export_vircadia_json(context, self.filepath)
-            self.report({'INFO'}, f"Vircadia JSON exported successfully to {self.filepath}")
+            filepath = old_json_exporter.export_vircadia_json(
+                context,
+                self.filepath,
+                compact=self.compact,
+                use_gzip=self.use_gzip,
+                float_precision=self.float_precision
+            )
+            self.report({'INFO'}, f"Vircadia JSON exported successfully to {filepath}")
             return {'FINISHED'}
         except Exception as e:
             self.report({'ERROR'}, f"Error exporting JSON: {str(e)}")
@@ -33,15 +58,44 @@ class EXPORT_OT_vircadia_json(bpy.types.Operator):
         context.window_manager.fileselect_add(self)
         return {'RUNNING_MODAL'}
 
+# Blender only borrows the strings of dynamic enum items, so the list has to outlive the callback
+_glb_preset_items = []
+
+def glb_preset_items(self, context):
+    _glb_preset_items[:] = [
+        (name, name.replace("_", " "), f"Export the main GLB with the {name} preset")
+        for name in export_presets.list_presets() if name != export_presets.COLLISION_PRESET
+    ]
+    return _glb_preset_items
+
 class EXPORT_OT_vircadia_glb(bpy.types.Operator):
     bl_idname = "export_scene.vircadia_glb"
     bl_label = "Export Vircadia GLB"
     filepath: bpy.props.StringProperty(subtype="FILE_PATH")
     bl_description = ImportExportTooltips.EXPORT_GLB
 
+    export_mode: bpy.props.EnumProperty(
+        name="Export Mode",
+        description="How the main and collision GLBs select their objects",
+        items=old_gltf_exporter.EXPORT_MODES,
+        default='SINGLE_PASS'
+    )
+
+    preset: bpy.props.EnumProperty(
+        name="Preset",
+        description="glTF export preset for the main world GLB",
+        items=glb_preset_items
+    )
+
+    use_cache: bpy.props.BoolProperty(
+        name="Use Export Cache",
+        description="Reuse textures and Draco-compressed meshes from earlier exports when their data and settings are unchanged",
+        default=True
+    )
+
     def execute(self, context):
         logging.info("Executing GLB export")
-        success = old_gltf_exporter.export_glb(context, self.filepath)
+        success = old_gltf_exporter.export_glb(context, self.filepath, mode=self.export_mode, preset=self.preset, use_cache=self.use_cache)
         if success:
             self.report({'INFO'}, f"GLB exported successfully to {self.filepath}")
             return {'FINISHED'}
@@ -10,6 +10,7 @@ from ..ui.tooltips import ImportExportTooltips
 class IMPORT_OT_vircadia_json(bpy.types.Operator):
     bl_idname = "import_scene.vircadia_json"
     bl_label = "Import Vircadia JSON"
+    bl_options = {'REGISTER', 'UNDO'}
     filepath: bpy.props.StringProperty(subtype="FILE_PATH")
     bl_description = ImportExportTooltips.IMPORT_JSON
 
@@ -17,6 +18,11 @@ class IMPORT_OT_vircadia_json(bpy.types.Operator):
         try:
             old_json_importer.process_vircadia_json(self.filepath)
             return {'FINISHED'}
+        except (ValueError, OSError, EOFError) as e:
+            # Unreadable or corrupt file (JSONDecodeError is a ValueError, BadGzipFile an OSError);
+            # the importer has already removed anything it created
+            self.report({'ERROR'}, f"Could not read {os.path.basename(self.filepath)}, nothing was imported: {str(e)}")
+            return {'CANCELLED'}
         except Exception as e:
             self.report({'ERROR'}, f"Error importing JSON: {str(e)}")
             return {'CANCELLED'}
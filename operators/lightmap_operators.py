@@ -1,6 +1,8 @@
 import bpy
+import os
 from bpy.types import Operator
-from ..lightmap import generateLightmaps, lightmap_utils
+from ..lightmap import generateLightmaps, lightmap_utils, progressive_bake, lightmap_encoding, lightmap_registry, uv_unwrap, bake_job, lightmap_denoise
+from ..utils import primitive_cache
 
 class VIRCADIA_OT_generate_lightmaps(Operator):
     bl_idname = "vircadia.generate_lightmaps"
@@ -9,6 +11,48 @@ class VIRCADIA_OT_generate_lightmaps(Operator):
     bl_options = {'REGISTER', 'UNDO'}
 
     def execute(self, context):
+        steps = self.start_bake(context)
+        if steps is None:
+            return {'CANCELLED'}
+        for _ in steps:
+            pass
+        return self.finish_bake()
+
+    def invoke(self, context, event):
+        self._steps = self.start_bake(context)
+        if self._steps is None:
+            return {'CANCELLED'}
+        # One group per timer tick, so the panel shows progress and Esc or Cancel can stop the bake
+        window_manager = context.window_manager
+        self._timer = window_manager.event_timer_add(0.1, window=context.window)
+        window_manager.modal_handler_add(self)
+        self.report({'INFO'}, "Baking lightmaps, press Esc or use Cancel Bake to stop after the current group")
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        if event.type == 'ESC':
+            bake_job.cancel_active_job()
+            return {'RUNNING_MODAL'}
+        if event.type != 'TIMER' or event.timer != self._timer:
+            return {'PASS_THROUGH'}
+        try:
+            next(self._steps)
+        except StopIteration:
+            context.window_manager.event_timer_remove(self._timer)
+            return self.finish_bake()
+        for area in context.screen.areas:
+            area.tag_redraw()
+        return {'RUNNING_MODAL'}
+
+    def finish_bake(self):
+        if "cancelled" in bake_job.last_summary:
+            self.report({'WARNING'}, f"Lightmap generation cancelled: {bake_job.last_summary}")
+        else:
+            self.report({'INFO'}, f"Lightmap generation completed: {bake_job.last_summary}")
+        return {'FINISHED'}
+
+    def start_bake(self, context):
+        # Returns the bake's steps, or None when there is nothing to bake
         scene = context.scene
         
         # Set the "Hide Lightmaps" toggle to True
@@ -20,19 +64,16 @@ class VIRCADIA_OT_generate_lightmaps(Operator):
         # Update lightmap configuration
         lightmap_settings = lightmap_utils.get_lightmap_settings(scene)
         bake_settings = lightmap_utils.get_bake_settings(scene)
+        encoding_settings = lightmap_utils.get_encoding_settings(scene)
 
         # Get visible selected objects
         visible_selected_objects = [obj for obj in context.selected_objects if obj.type == 'MESH' and not obj.hide_get()]
 
         if not visible_selected_objects:
             self.report({'WARNING'}, "No visible mesh objects selected. Please select at least one visible mesh object.")
-            return {'CANCELLED'}
+            return None
 
-        # Generate lightmaps
-        generateLightmaps.generate_lightmaps(visible_selected_objects, lightmap_settings, bake_settings)
-
-        self.report({'INFO'}, "Lightmap generation completed")
-        return {'FINISHED'}
+        return generateLightmaps.iter_generate_lightmaps(visible_selected_objects, lightmap_settings, bake_settings, encoding_settings)
 
     def check_and_create_lightmap_data_object(self, context):
         # Store the current selection and active object
@@ -69,7 +110,7 @@ class VIRCADIA_OT_generate_lightmaps(Operator):
 
     @classmethod
     def poll(cls, context):
-        if not context.selected_objects:
+        if not context.selected_objects or bake_job.is_running():
             return False
         
         collision_keywords = ["collision", "collides", "collider", "collisions", "colliders"]
@@ -89,11 +130,7 @@ class VIRCADIA_OT_generate_lightmaps(Operator):
                     # Check if the object's materials don't have lightmap nodes
                     for material_slot in obj.material_slots:
                         if material_slot.material and material_slot.material.use_nodes:
-                            has_lightmap_node = any(
-                                node.type == 'TEX_IMAGE' and node.label.startswith('vircadia_lightmapData_')
-                                for node in material_slot.material.node_tree.nodes
-                            )
-                            if not has_lightmap_node:
+                            if not lightmap_registry.lightmap_ids_for_material(material_slot.material):
                                 return True
         
         return False
@@ -125,32 +162,31 @@ class VIRCADIA_OT_clear_lightmaps(Operator):
         # Remove materials from vircadia_lightmapData object
         self.remove_materials_from_lightmap_data(removed_materials)
 
+        registry = lightmap_registry.get_index()
+        images = [registry[lightmap_id]["image"] for lightmap_id in removed_materials if lightmap_id in registry]
+        for lightmap_id in removed_materials:
+            lightmap_registry.unregister_lightmap(context.scene, lightmap_id, save=False)
+        lightmap_registry.save_index(context.scene)
+        # Removing the pass images only after saving, as deleting IDs makes the index rebuild from the scene
+        for image in images:
+            if image is not None:
+                lightmap_denoise.remove_bake_passes(image)
+
         self.report({'INFO'}, f"Cleared lightmaps from {len(affected_objects)} objects and removed {len(removed_materials)} materials from vircadia_lightmapData")
         return {'FINISHED'}
 
     def identify_lightmap_ids(self, obj, affected_lightmap_ids):
-        for material_slot in obj.material_slots:
-            if material_slot.material and material_slot.material.use_nodes:
-                for node in material_slot.material.node_tree.nodes:
-                    if node.type == 'TEX_IMAGE' and node.label.startswith('vircadia_lightmapData_'):
-                        lightmap_id = node.label.split('_')[2]
-                        affected_lightmap_ids.add(lightmap_id)
-
-    def find_affected_objects(self, affected_lightmap_ids):
-        affected_objects = set()
-        for obj in bpy.data.objects:
-            if obj.type == 'MESH':
-                for material_slot in obj.material_slots:
-                    if material_slot.material and material_slot.material.use_nodes:
-                        for node in material_slot.material.node_tree.nodes:
-                            if node.type == 'TEX_IMAGE' and node.label.startswith('vircadia_lightmapData_'):
-                                lightmap_id = node.label.split('_')[2]
-                                if lightmap_id in affected_lightmap_ids:
-                                    affected_objects.add(obj)
-                                    break
-                    if obj in affected_objects:
-                        break
-        return affected_objects
+        affected_lightmap_ids.update(lightmap_registry.lightmap_ids_for_object(obj))
+
+    def find_affected_objects(self, affected_lightmap_ids, material_index=None):
+        if material_index is None:
+            material_index = lightmap_utils.build_material_object_index()
+
+        # Objects recorded at bake time, plus anything that has since picked up one of the lightmapped materials
+        affected_objects = lightmap_registry.objects_for_lightmaps(affected_lightmap_ids)
+        for material in lightmap_registry.materials_for_lightmaps(affected_lightmap_ids):
+            affected_objects.update(material_index.get(material.name, ()))
+        return {obj for obj in affected_objects if obj.type == 'MESH'}
 
     def clear_lightmap(self, obj, removed_materials, affected_lightmap_ids):
         # Remove Lightmap UV layer if it exists
@@ -169,12 +205,14 @@ class VIRCADIA_OT_clear_lightmaps(Operator):
 
             # Find and remove all lightmap-related nodes
             nodes_to_remove = []
+            for lightmap_id in lightmap_registry.lightmap_ids_for_material(material) & affected_lightmap_ids:
+                node = lightmap_registry.find_labelled_node(material, lightmap_id)
+                if node is not None:
+                    nodes_to_remove.append(node)
+                    removed_materials.add(lightmap_id)
             for node in nodes:
-                if node.type == 'TEX_IMAGE' and node.label.startswith('vircadia_lightmapData_'):
-                    lightmap_id = node.label.split('_')[2]
-                    if lightmap_id in affected_lightmap_ids:
-                        nodes_to_remove.append(node)
-                        removed_materials.add(lightmap_id)
+                if node in nodes_to_remove:
+                    continue
                 elif node.type == 'MIX_RGB' and any(input.is_linked and input.links[0].from_node in nodes_to_remove for input in node.inputs):
                     nodes_to_remove.append(node)
                 elif node.type == 'UVMAP' and node.uv_map == "Lightmap":
@@ -203,12 +241,12 @@ class VIRCADIA_OT_clear_lightmaps(Operator):
     def remove_materials_from_lightmap_data(self, removed_materials):
         lightmap_data_obj = bpy.data.objects.get("vircadia_lightmapData")
         if lightmap_data_obj:
+            registry = lightmap_registry.get_index()
             materials_to_remove = []
-            for mat in lightmap_data_obj.data.materials:
-                if mat and mat.name.startswith("vircadia_lightmapData_"):
-                    mat_id = mat.name.split('_')[2]
-                    if mat_id in removed_materials:
-                        materials_to_remove.append(mat)
+            for mat_id in removed_materials:
+                mat = registry[mat_id]["data_material"] if mat_id in registry else None
+                if mat and mat.name in lightmap_data_obj.data.materials:
+                    materials_to_remove.append(mat)
 
             # Remove materials and clear slots
             for mat in materials_to_remove:
@@ -243,11 +281,8 @@ class VIRCADIA_OT_clear_lightmaps(Operator):
                     return True
                 
                 # Check for lightmap nodes in materials
-                for material_slot in obj.material_slots:
-                    if material_slot.material and material_slot.material.use_nodes:
-                        for node in material_slot.material.node_tree.nodes:
-                            if node.type == 'TEX_IMAGE' and node.label.startswith('vircadia_lightmapData_'):
-                                return True
+                if lightmap_registry.lightmap_ids_for_object(obj):
+                    return True
         
         return False
 
@@ -264,33 +299,18 @@ class VIRCADIA_OT_pack_lightmap_uvs(Operator):
             self.report({'WARNING'}, "No mesh objects selected")
             return {'CANCELLED'}
         
-        bpy.ops.object.select_all(action='DESELECT')
-        for obj in selected_objects:
-            obj.select_set(True)
-        
-        context.view_layer.objects.active = selected_objects[0]
-        
-        bpy.ops.object.mode_set(mode='EDIT')
-        bpy.ops.mesh.select_all(action='SELECT')
-        
+        if context.mode != 'OBJECT':
+            bpy.ops.object.mode_set(mode='OBJECT')
+
         # Ensure 'Lightmap' UV layer exists and is active
         for obj in selected_objects:
+            primitive_cache.make_single_user(obj)
             if "Lightmap" not in obj.data.uv_layers:
                 obj.data.uv_layers.new(name="Lightmap")
             obj.data.uv_layers["Lightmap"].active = True
-        
-        bpy.ops.uv.lightmap_pack(
-            PREF_CONTEXT='ALL_FACES',
-            PREF_PACK_IN_ONE=True,
-            PREF_NEW_UVLAYER=False,
-            PREF_APPLY_IMAGE=False,
-            PREF_IMG_PX_SIZE=1024,
-            PREF_BOX_DIV=12,
-            PREF_MARGIN_DIV=0.1
-        )
-        
-        bpy.ops.object.mode_set(mode='OBJECT')
-        
+
+        uv_unwrap.unwrap_lightmap_uvs(selected_objects, 'LIGHTMAP_PACK', 0.1)
+
         self.report({'INFO'}, f"Packed lightmap UVs for {len(selected_objects)} objects")
         return {'FINISHED'}
 
@@ -298,12 +318,119 @@ class VIRCADIA_OT_pack_lightmap_uvs(Operator):
     def poll(cls, context):
         return context.selected_objects
 
+class VIRCADIA_OT_encode_lightmaps(Operator):
+    bl_idname = "vircadia.encode_lightmaps"
+    bl_label = "Encode Lightmaps"
+    bl_description = "Re-encode all baked lightmaps with the current output format settings"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        encoding_settings = lightmap_utils.get_encoding_settings(context.scene)
+        encoded_count = lightmap_encoding.encode_lightmaps(encoding_settings)
+        self.report({'INFO'}, f"Encoded {encoded_count} lightmaps as {encoding_settings['encoding']}")
+        return {'FINISHED'}
+
+    @classmethod
+    def poll(cls, context):
+        return "vircadia_lightmapData" in bpy.data.objects
+
+class VIRCADIA_OT_denoise_lightmaps(Operator):
+    bl_idname = "vircadia.denoise_lightmaps"
+    bl_label = "Denoise Lightmaps"
+    bl_description = "Denoise the stored raw bakes again with the current denoise settings, without rebaking"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        bake_settings = lightmap_utils.get_bake_settings(context.scene)
+        encoding_settings = lightmap_utils.get_encoding_settings(context.scene)
+
+        denoised_ids = lightmap_denoise.denoise_lightmaps(bake_settings)
+        if not denoised_ids:
+            self.report({'WARNING'}, "No lightmaps with a stored raw bake found. Bake with denoising enabled first.")
+            return {'CANCELLED'}
+
+        # Encoded copies are derived from the lightmap, so refresh them as well
+        if encoding_settings['encoding'] != 'NONE':
+            lightmap_encoding.encode_lightmaps(encoding_settings, set(denoised_ids))
+
+        self.report({'INFO'}, f"Denoised {len(denoised_ids)} lightmaps with {bake_settings['denoiser']}")
+        return {'FINISHED'}
+
+    @classmethod
+    def poll(cls, context):
+        return any(
+            entry["image"] is not None and lightmap_denoise.has_bake_passes(entry["image"])
+            for entry in lightmap_registry.get_index().values()
+        )
+
+class VIRCADIA_OT_stop_progressive_bake(Operator):
+    bl_idname = "vircadia.stop_progressive_bake"
+    bl_label = "Stop Progressive Bake"
+    bl_description = "Stop refining lightmaps in the background and keep the current result"
+
+    def execute(self, context):
+        progressive_bake.cancel_active_job()
+        self.report({'INFO'}, "Progressive bake stopped")
+        return {'FINISHED'}
+
+    @classmethod
+    def poll(cls, context):
+        return progressive_bake.is_running()
+
+class VIRCADIA_OT_cancel_lightmap_bake(Operator):
+    bl_idname = "vircadia.cancel_lightmap_bake"
+    bl_label = "Cancel Bake"
+    bl_description = "Stop the running lightmap bake after the current group; groups already baked are kept"
+
+    def execute(self, context):
+        bake_job.cancel_active_job()
+        self.report({'INFO'}, "Lightmap bake will stop after the current group")
+        return {'FINISHED'}
+
+    @classmethod
+    def poll(cls, context):
+        return bake_job.is_running()
+
+class VIRCADIA_OT_save_lightmap_profile(Operator):
+    bl_idname = "vircadia.save_lightmap_profile"
+    bl_label = "Save Profile"
+    bl_description = "Save the current lightmap, bake and encoding settings as a profile for the command-line bake (--profile)"
+
+    filepath: bpy.props.StringProperty(subtype="FILE_PATH")
+    filter_glob: bpy.props.StringProperty(default="*.json", options={'HIDDEN'})
+
+    def execute(self, context):
+        filepath = bpy.path.ensure_ext(self.filepath, ".json")
+        try:
+            lightmap_utils.save_profile(filepath, lightmap_utils.snapshot_settings(context.scene))
+        except OSError as e:
+            self.report({'ERROR'}, f"Could not save lightmap profile: {str(e)}")
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"Lightmap profile saved to {filepath}")
+        return {'FINISHED'}
+
+    def invoke(self, context, event):
+        directory = os.path.dirname(bpy.data.filepath) if bpy.data.filepath else ""
+        self.filepath = os.path.join(directory, "lightmap_profile.json")
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
 def register():
     bpy.utils.register_class(VIRCADIA_OT_generate_lightmaps)
     bpy.utils.register_class(VIRCADIA_OT_clear_lightmaps)
     bpy.utils.register_class(VIRCADIA_OT_pack_lightmap_uvs)
+    bpy.utils.register_class(VIRCADIA_OT_encode_lightmaps)
+    bpy.utils.register_class(VIRCADIA_OT_denoise_lightmaps)
+    bpy.utils.register_class(VIRCADIA_OT_stop_progressive_bake)
+    bpy.utils.register_class(VIRCADIA_OT_cancel_lightmap_bake)
+    bpy.utils.register_class(VIRCADIA_OT_save_lightmap_profile)
 
 def unregister():
+    bpy.utils.unregister_class(VIRCADIA_OT_save_lightmap_profile)
+    bpy.utils.unregister_class(VIRCADIA_OT_cancel_lightmap_bake)
+    bpy.utils.unregister_class(VIRCADIA_OT_stop_progressive_bake)
+    bpy.utils.unregister_class(VIRCADIA_OT_denoise_lightmaps)
+    bpy.utils.unregister_class(VIRCADIA_OT_encode_lightmaps)
     bpy.utils.unregister_class(VIRCADIA_OT_pack_lightmap_uvs)
     bpy.utils.unregister_class(VIRCADIA_OT_clear_lightmaps)
     bpy.utils.unregister_class(VIRCADIA_OT_generate_lightmaps)
@@ -1,7 +1,7 @@
 import bpy
 from bpy.types import Panel
 from bpy.props import EnumProperty
-from ..lightmap import lightmap_utils
+from ..lightmap import lightmap_utils, progressive_bake, bake_job
 
 class VIRCADIA_PT_lightmap_panel(Panel):
     bl_label = "Lightmap Generation"
@@ -27,15 +27,22 @@ class VIRCADIA_PT_lightmap_panel(Panel):
         box.prop(scene, "vircadia_lightmap_texel_density", text="Texel Density")
         box.prop(scene, "vircadia_lightmap_min_resolution", text="Min Resolution")
         box.prop(scene, "vircadia_lightmap_max_resolution", text="Max Resolution")
+        box.prop(scene, "vircadia_lightmap_memory_budget", text="Memory Budget (MB)")
         # box.prop(scene, "vircadia_lightmap_factor_shared_materials", text="Factor Shared Materials")
         box.prop(scene, "vircadia_lightmap_margin", text="Margin")
         box.prop(scene, "vircadia_lightmap_unwrap_context", text="Unwrap Context")
         box.prop(scene, "vircadia_lightmap_uv_type", text="UV Type")
+        box.prop(scene, "vircadia_lightmap_use_atlas", text="Atlas Packing")
+        if scene.vircadia_lightmap_use_atlas:
+            box.prop(scene, "vircadia_lightmap_atlas_page_size", text="Page Size")
         # box.prop(scene, "vircadia_lightmap_automatic_grouping") #TODO revamp grouping later
 
         # Bake settings
         box = layout.box()
         box.label(text="Bake Settings")
+        row = box.row(align=True)
+        row.prop(scene, "vircadia_lightmap_bake_profile", text="Profile")
+        row.operator("vircadia.save_lightmap_profile", text="", icon='FILE_TICK')
         # box.prop(scene, "vircadia_lightmap_bake_type", text="Bake Type")
         box.prop(scene, "vircadia_lightmap_use_pass_direct", text="Use Direct")
         box.prop(scene, "vircadia_lightmap_use_pass_indirect", text="Use Indirect")
@@ -46,8 +53,18 @@ class VIRCADIA_PT_lightmap_panel(Panel):
         box.prop(scene, "vircadia_lightmap_samples", text="Samples")
         box.prop(scene, "vircadia_lightmap_adaptive_min_samples", text="Min Samples")
         box.prop(scene, "vircadia_lightmap_use_denoising", text="Use Denoising")
+        if scene.vircadia_lightmap_use_denoising:
+            box.prop(scene, "vircadia_lightmap_keep_bake_passes", text="Keep Bake Passes")
         box.prop(scene, "vircadia_lightmap_denoiser", text="Denoiser")
         box.prop(scene, "vircadia_lightmap_bake_margin", text="Bake Margin")
+        box.prop(scene, "vircadia_lightmap_dilation_passes", text="Dilation Passes")
+        box.prop(scene, "vircadia_lightmap_seam_welding", text="Weld Seams")
+        box.prop(scene, "vircadia_lightmap_tile_size", text="Tile Size")
+        box.prop(scene, "vircadia_lightmap_progressive", text="Progressive Bake")
+        if scene.vircadia_lightmap_progressive:
+            box.prop(scene, "vircadia_lightmap_preview_samples", text="Preview Samples")
+            box.prop(scene, "vircadia_lightmap_noise_threshold", text="Noise Threshold")
+            box.prop(scene, "vircadia_lightmap_time_budget", text="Time Budget")
         
         if scene.vircadia_lightmap_denoiser == 'OPTIX':
             box.prop(scene, "vircadia_lightmap_denoising_input_passes", text="Passes")
@@ -55,13 +72,47 @@ class VIRCADIA_PT_lightmap_panel(Panel):
             box.prop(scene, "vircadia_lightmap_denoising_input_passes", text="Passes")
             box.prop(scene, "vircadia_lightmap_denoising_prefilter", text="Prefilter")
             box.prop(scene, "vircadia_lightmap_denoising_quality", text="Quality")
+        elif scene.vircadia_lightmap_denoiser == 'BILATERAL':
+            box.prop(scene, "vircadia_lightmap_denoising_input_passes", text="Passes")
+        # Denoising works from the stored raw bake, so it can be redone without baking again
+        box.operator("vircadia.denoise_lightmaps", text="Re-denoise Lightmaps")
+
+        # Output format settings
+        box = layout.box()
+        box.label(text="Output Format")
+        box.prop(scene, "vircadia_lightmap_encoding", text="Encoding")
+        if scene.vircadia_lightmap_encoding != 'NONE':
+            if scene.vircadia_lightmap_encoding == 'RGBM':
+                box.prop(scene, "vircadia_lightmap_rgbm_range", text="RGBM Range")
+            box.prop(scene, "vircadia_lightmap_write_ktx2", text="Write KTX2")
+            if scene.vircadia_lightmap_write_ktx2:
+                box.prop(scene, "vircadia_lightmap_generate_mips", text="Mipmaps")
+            box.prop(scene, "vircadia_lightmap_output_dir", text="Output")
+            box.operator("vircadia.encode_lightmaps", text="Re-encode Lightmaps")
 
-        # Generate lightmaps button
-        layout.operator("vircadia.generate_lightmaps", text="Generate Lightmaps")
+        # Generate lightmaps button, or progress and Cancel while a bake runs
+        if bake_job.is_running():
+            layout.label(text=f"Baking: {bake_job.active_job.status_text()}", icon='RENDER_STILL')
+            layout.operator("vircadia.cancel_lightmap_bake", text="Cancel Bake", icon='CANCEL')
+            # Command-line bakes have no panel; they stop when this file is created next to the .blend
+            layout.label(text=f"Or create {bake_job.active_job.cancel_path}")
+        else:
+            layout.operator("vircadia.generate_lightmaps", text="Generate Lightmaps")
         
         # Add the Clear Lightmaps button
         layout.operator("vircadia.clear_lightmaps", text="Clear Lightmaps")
 
+        if progressive_bake.is_running():
+            layout.operator("vircadia.stop_progressive_bake", text="Stop Progressive Bake")
+
+        # Outcome of the last bake; per-group timings are in the .bake_log.jsonl next to the .blend
+        if bake_job.last_summary:
+            layout.label(text=f"Last bake: {bake_job.last_summary}", icon='INFO')
+
+def update_bake_profile(self, context):
+    if self.vircadia_lightmap_bake_profile != 'CUSTOM':
+        lightmap_utils.apply_bake_profile(self, self.vircadia_lightmap_bake_profile)
+
 def register():
     bpy.types.Scene.vircadia_lightmap_automatic_grouping = bpy.props.BoolProperty(
         name="Automatic Grouping",
@@ -90,9 +141,16 @@ def register():
         name="Max Resolution",
         default=8192,
         min=64,
-        max=8192,
+        max=16384,
         description="Maximum lightmap resolution"
     )
+    bpy.types.Scene.vircadia_lightmap_memory_budget = bpy.props.FloatProperty(
+        name="Memory Budget",
+        default=0.0,
+        min=0.0,
+        max=4096.0,
+        description="Total lightmap texture memory in MB. Resolutions are solved across all lightmaps by surface area and the objects' vircadia_lightmap_importance. 0 uses the texel density as is"
+    )
     bpy.types.Scene.vircadia_lightmap_factor_shared_materials = bpy.props.BoolProperty(
         name="Factor Shared Materials",
         default=True,
@@ -124,6 +182,23 @@ def register():
         default='LIGHTMAP_PACK',
         description="Choose the UV unwrapping method for lightmap generation"
     )
+    bpy.types.Scene.vircadia_lightmap_use_atlas = bpy.props.BoolProperty(
+        name="Atlas Packing",
+        default=False,
+        description="Pack lightmap charts from all selected objects into shared power-of-two pages"
+    )
+    bpy.types.Scene.vircadia_lightmap_atlas_page_size = bpy.props.EnumProperty(
+        name="Atlas Page Size",
+        items=[
+            ('512', "512", "512x512 pages"),
+            ('1024', "1024", "1024x1024 pages"),
+            ('2048', "2048", "2048x2048 pages"),
+            ('4096', "4096", "4096x4096 pages"),
+            ('8192', "8192", "8192x8192 pages")
+        ],
+        default='2048',
+        description="Size of each lightmap atlas page"
+    )
 
     # Register properties for bake settings
     bpy.types.Scene.vircadia_lightmap_bake_type = bpy.props.EnumProperty(
@@ -169,13 +244,20 @@ def register():
     )
     bpy.types.Scene.vircadia_lightmap_use_denoising = bpy.props.BoolProperty(
         name="Use Denoising",
-        default=True
+        default=True,
+        description="Denoise each lightmap after baking. Costs an albedo bake, a normal bake with Albedo and Normal input passes, and a denoise render per lightmap"
+    )
+    bpy.types.Scene.vircadia_lightmap_keep_bake_passes = bpy.props.BoolProperty(
+        name="Keep Bake Passes",
+        default=False,
+        description="Keep the raw bake, albedo and normal passes packed in the .blend so Re-denoise Lightmaps can run without baking again. Adds up to three images per lightmap"
     )
     bpy.types.Scene.vircadia_lightmap_denoiser = bpy.props.EnumProperty(
         name="Denoiser",
         items=[
             ('OPTIX', 'OptiX', 'Use OptiX denoiser'),
-            ('OPENIMAGEDENOISE', 'OpenImageDenoise', 'Use OpenImageDenoise denoiser')
+            ('OPENIMAGEDENOISE', 'OpenImageDenoise', 'Use OpenImageDenoise denoiser'),
+            ('BILATERAL', 'Bilateral (CPU)', 'Edge-aware filter guided by the albedo and normal passes, no GPU or OIDN needed')
         ],
         default='OPTIX'
     )
@@ -205,6 +287,18 @@ def register():
         ],
         default='HIGH'
     )
+    bpy.types.Scene.vircadia_lightmap_bake_profile = bpy.props.EnumProperty(
+        name="Bake Profile",
+        items=[
+            ('CUSTOM', 'Custom', 'Keep the settings below as they are'),
+            ('DRAFT', 'Draft', 'Few samples and light post-processing for quick layout checks'),
+            ('PREVIEW', 'Preview', 'Moderate samples for lighting iteration'),
+            ('PRODUCTION', 'Production', 'Full quality for shipping lightmaps')
+        ],
+        default='CUSTOM',
+        update=update_bake_profile,
+        description="Apply a named set of bake settings in one go"
+    )
     bpy.types.Scene.vircadia_lightmap_bake_margin = bpy.props.IntProperty(
         name="Bake Margin",
         default=4,
@@ -212,21 +306,112 @@ def register():
         max=64,
         description="Extends the baked result as a post process filter"
     )
+    bpy.types.Scene.vircadia_lightmap_dilation_passes = bpy.props.IntProperty(
+        name="Dilation Passes",
+        default=0,
+        min=0,
+        max=64,
+        description="Grow baked texels into empty lightmap space after baking (0 disables dilation)"
+    )
+    bpy.types.Scene.vircadia_lightmap_seam_welding = bpy.props.BoolProperty(
+        name="Weld Seams",
+        default=False,
+        description="Average lightmap texels on both sides of UV seams to hide discontinuities"
+    )
+    bpy.types.Scene.vircadia_lightmap_tile_size = bpy.props.IntProperty(
+        name="Tile Size",
+        default=0,
+        min=0,
+        max=8192,
+        description="Bake lightmaps larger than this in separate tiles to limit memory use (0 disables tiling)"
+    )
+    bpy.types.Scene.vircadia_lightmap_progressive = bpy.props.BoolProperty(
+        name="Progressive Bake",
+        default=False,
+        description="Bake at preview samples first, then keep refining in the background up to the full sample count"
+    )
+    bpy.types.Scene.vircadia_lightmap_preview_samples = bpy.props.IntProperty(
+        name="Preview Samples",
+        default=16,
+        min=1,
+        description="Samples used for the first, instant progressive pass"
+    )
+    bpy.types.Scene.vircadia_lightmap_noise_threshold = bpy.props.FloatProperty(
+        name="Noise Threshold",
+        default=0.005,
+        min=0.0,
+        max=1.0,
+        precision=4,
+        description="Stop refining once the average change between passes drops below this value. Keep it above 1/255 (about 0.004) for 8-bit lightmaps"
+    )
+    bpy.types.Scene.vircadia_lightmap_time_budget = bpy.props.FloatProperty(
+        name="Time Budget",
+        default=600.0,
+        min=0.0,
+        subtype='TIME_ABSOLUTE',
+        unit='TIME_ABSOLUTE',
+        description="Stop refining after this many seconds"
+    )
+
+    # Register properties for lightmap output encoding
+    bpy.types.Scene.vircadia_lightmap_encoding = bpy.props.EnumProperty(
+        name="Encoding",
+        items=[
+            ('NONE', "None", "Export the baked lightmaps as they are"),
+            ('RGBM', "RGBM", "8-bit RGBM, HDR range stored as a shared multiplier in alpha"),
+            ('RGBD', "RGBD", "8-bit RGBD as decoded by Babylon.js"),
+            ('HALF_EXR', "Half Float", "16-bit half float EXR/KTX2 output")
+        ],
+        default='NONE',
+        description="How baked lightmaps are encoded for export"
+    )
+    bpy.types.Scene.vircadia_lightmap_rgbm_range = bpy.props.FloatProperty(
+        name="RGBM Range",
+        default=6.0,
+        min=1.0,
+        max=64.0,
+        description="Maximum lightmap intensity representable in RGBM"
+    )
+    bpy.types.Scene.vircadia_lightmap_write_ktx2 = bpy.props.BoolProperty(
+        name="Write KTX2",
+        default=False,
+        description="Also write a KTX2 container next to each encoded lightmap"
+    )
+    bpy.types.Scene.vircadia_lightmap_generate_mips = bpy.props.BoolProperty(
+        name="Mipmaps",
+        default=True,
+        description="Include a full mip chain in KTX2 lightmaps"
+    )
+    bpy.types.Scene.vircadia_lightmap_output_dir = bpy.props.StringProperty(
+        name="Output Directory",
+        default="//lightmaps/",
+        subtype='DIR_PATH',
+        description="Where encoded lightmap files are written"
+    )
 
     bpy.utils.register_class(VIRCADIA_PT_lightmap_panel)
 
 def unregister():
     bpy.utils.unregister_class(VIRCADIA_PT_lightmap_panel)
 
+    del bpy.types.Scene.vircadia_lightmap_encoding
+    del bpy.types.Scene.vircadia_lightmap_rgbm_range
+    del bpy.types.Scene.vircadia_lightmap_write_ktx2
+    del bpy.types.Scene.vircadia_lightmap_generate_mips
+    del bpy.types.Scene.vircadia_lightmap_output_dir
+
     del bpy.types.Scene.vircadia_lightmap_color_space
     del bpy.types.Scene.vircadia_lightmap_texel_density
     del bpy.types.Scene.vircadia_lightmap_min_resolution
     del bpy.types.Scene.vircadia_lightmap_max_resolution
+    del bpy.types.Scene.vircadia_lightmap_memory_budget
     del bpy.types.Scene.vircadia_lightmap_factor_shared_materials
     del bpy.types.Scene.vircadia_lightmap_unwrap_context
     del bpy.types.Scene.vircadia_lightmap_margin
     del bpy.types.Scene.vircadia_lightmap_uv_type
     del bpy.types.Scene.vircadia_lightmap_automatic_grouping
+    del bpy.types.Scene.vircadia_lightmap_use_atlas
+    del bpy.types.Scene.vircadia_lightmap_atlas_page_size
 
     # Unregister properties for bake settings
     del bpy.types.Scene.vircadia_lightmap_bake_type
@@ -239,11 +424,20 @@ def unregister():
     del bpy.types.Scene.vircadia_lightmap_samples
     del bpy.types.Scene.vircadia_lightmap_adaptive_min_samples
     del bpy.types.Scene.vircadia_lightmap_use_denoising
+    del bpy.types.Scene.vircadia_lightmap_keep_bake_passes
     del bpy.types.Scene.vircadia_lightmap_denoiser
     del bpy.types.Scene.vircadia_lightmap_denoising_input_passes
     del bpy.types.Scene.vircadia_lightmap_denoising_prefilter
     del bpy.types.Scene.vircadia_lightmap_denoising_quality
+    del bpy.types.Scene.vircadia_lightmap_bake_profile
     del bpy.types.Scene.vircadia_lightmap_bake_margin
+    del bpy.types.Scene.vircadia_lightmap_dilation_passes
+    del bpy.types.Scene.vircadia_lightmap_seam_welding
+    del bpy.types.Scene.vircadia_lightmap_tile_size
+    del bpy.types.Scene.vircadia_lightmap_progressive
+    del bpy.types.Scene.vircadia_lightmap_preview_samples
+    del bpy.types.Scene.vircadia_lightmap_noise_threshold
+    del bpy.types.Scene.vircadia_lightmap_time_budget
 
 if __name__ == "__main__":
     register()
\ No newline at end of file
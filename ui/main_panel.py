@@ -9,13 +9,20 @@ import asyncio
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 from ..import_export.world_import_export_test import TestGLTFExporter
 from ..world_connection.world_connection_manager import world_connection_manager
+from ..lightmap.lightmap_utils import build_material_object_index
+from ..lightmap import lightmap_registry
+from ..utils import entity_index
 
 def update_visibility(self, context):
-    for obj in bpy.data.objects:
-        update_object_visibility(obj, context.scene)
+    # One classification pass, then every object is visited exactly once
+    index = entity_index.classify_objects()
+    for obj in index.objects:
+        update_object_visibility(obj, context.scene, index)
     update_lightmap_visibility(context.scene)
 
-    # Update scene world based on hide_lightmaps state
+    # Update scene world based on hide_lightmaps state (there is no screen when running headless)
+    if context.screen is None:
+        return
     for area in context.screen.areas:
         if area.type == 'VIEW_3D':
             for space in area.spaces:
@@ -28,13 +35,12 @@ def update_visibility(self, context):
                         context.scene.vircadia_previous_scene_world = space.shading.use_scene_world
                         space.shading.use_scene_world = False
 
-def update_object_visibility(obj, scene):
+def update_object_visibility(obj, scene, index):
     # Check if object is a collision object
-    is_collision = any(name in obj.name.lower() for name in ["collision", "collider", "collides"]) or \
-                   (obj.parent and any(name in obj.parent.name.lower() for name in ["collision", "collider", "collides"]))
+    is_collision = index.is_collision(obj) or (obj.parent is not None and index.is_collision(obj.parent))
 
     # Check if object is an LOD level (except LOD0)
-    is_lod = any(f"_LOD{i}" in obj.name for i in range(1, 100))  # Checking up to LOD99
+    is_lod = index.is_lod(obj)
 
     # Update visibility based on settings
     if is_collision:
@@ -45,10 +51,6 @@ def update_object_visibility(obj, scene):
     elif obj.type == 'ARMATURE':
         obj.hide_set(scene.vircadia_hide_armatures)
 
-    # Apply settings to children recursively
-    for child in obj.children:
-        update_object_visibility(child, scene)
-
 def update_lightmap_visibility(scene):
     if scene.vircadia_hide_lightmaps:
         hide_lightmaps(scene)
@@ -57,13 +59,13 @@ def update_lightmap_visibility(scene):
 
 def hide_lightmaps(scene):
     print("Starting to hide lightmaps...")
-    for mat in bpy.data.materials:
+    # Only materials known to the lightmap registry can carry lightmap nodes
+    for mat, lightmap_node in lightmap_registry.iter_lightmap_materials():
         if mat.use_nodes:
             nodes = mat.node_tree.nodes
             links = mat.node_tree.links
 
             # Find lightmap-related nodes
-            lightmap_node = next((node for node in nodes if node.type == 'TEX_IMAGE' and 'vircadia_lightmapData' in node.label), None)
             mix_node = next((node for node in nodes if node.type == 'MIX_RGB' and lightmap_node in [link.from_node for link in node.inputs[2].links]), None)
             principled_node = next((node for node in nodes if node.type == 'BSDF_PRINCIPLED'), None)
 
@@ -102,19 +104,20 @@ def hide_lightmaps(scene):
 def show_lightmaps(scene):
     print("Starting to show lightmaps...")
     lightmaps_found = False
-    for mat in bpy.data.materials:
+    material_index = build_material_object_index()
+    for mat, lightmap_node in lightmap_registry.iter_lightmap_materials():
         if mat.use_nodes:
             nodes = mat.node_tree.nodes
             links = mat.node_tree.links
 
-            # Find and enable lightmap-related nodes
-            lightmap_node = next((node for node in nodes if node.type == 'TEX_IMAGE' and node.label.startswith('vircadia_lightmapData_')), None)
+            # Enable lightmap-related nodes
             if lightmap_node:
                 lightmap_node.mute = False
                 lightmaps_found = True
 
                 # Get the mesh object using this material
-                obj = next((obj for obj in bpy.data.objects if obj.type == 'MESH' and mat.name in obj.material_slots), None)
+                material_objects = material_index.get(mat.name)
+                obj = material_objects[0] if material_objects else None
                 if obj:
                     mesh = obj.data
                     
@@ -186,7 +189,8 @@ def show_lightmaps(scene):
 
     if not lightmaps_found:
         scene.vircadia_hide_lightmaps = True
-        bpy.ops.vircadia.show_warning('INVOKE_DEFAULT', message="No lightmaps found in the scene.")
+        if not bpy.app.background:
+            bpy.ops.vircadia.show_warning('INVOKE_DEFAULT', message="No lightmaps found in the scene.")
     
     print("Lightmaps shown and materials modified.")
 
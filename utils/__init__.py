@@ -5,13 +5,20 @@ from . import collection_utils
 from . import error_handling
 from . import panel_utils
 from . import world_setup
+from . import json_stream
+from . import primitive_cache
+from . import template_cache
+from . import entity_index
+from . import export_presets
 
 def register():
     property_utils.register()
     object_creation.register()
     world_setup.register()
+    primitive_cache.register()
 
 def unregister():
+    primitive_cache.unregister()
     world_setup.unregister()
     object_creation.unregister()
     property_utils.unregister()
\ No newline at end of file
@@ -0,0 +1,84 @@
+import bpy
+import re
+
+# "collisions" and "colliders" are covered by their singular forms
+COLLISION_KEYWORDS = ("collision", "collider", "collides")
+
+# LOD1 and up; LOD0 is the visible base level
+LOD_PATTERN = re.compile(r"_LOD[1-9]")
+
+LIGHTMAP_DATA_NAME = "vircadia_lightmapData"
+
+def is_collision_name(name):
+    name = name.lower()
+    return any(keyword in name for keyword in COLLISION_KEYWORDS)
+
+def is_lod_name(name):
+    return LOD_PATTERN.search(name) is not None
+
+class EntityIndex:
+    # One classification pass over the scene's objects, shared by the exporters and visibility code
+
+    def __init__(self, objects):
+        self.objects = list(objects)
+        self.entities = []
+        self.collisions = set()
+        self.collision_trees = set()
+        self.lods = set()
+        self.zones = set()
+        self.webs = set()
+        self.keylights = set()
+        self.suns = set()
+        self.other_lights = set()
+        self.lightmap_data = None
+        self.has_models = False
+
+        for obj in self.objects:
+            name = obj.name
+            if is_collision_name(name):
+                self.collisions.add(name)
+            if is_lod_name(name):
+                self.lods.add(name)
+            if name == LIGHTMAP_DATA_NAME:
+                self.lightmap_data = obj
+            if "keylight" in name.lower():
+                self.keylights.add(name)
+
+            entity_type = obj.get("type")
+            if entity_type is not None:
+                self.entities.append(obj)
+
+            if obj.type == 'MESH':
+                if entity_type == 'Zone':
+                    self.zones.add(name)
+                elif entity_type == 'Web':
+                    self.webs.add(name)
+                excluded = str(entity_type).lower() in ("zone", "web", "light", "image", "text", "shape")
+                if not excluded and name not in self.collisions:
+                    self.has_models = True
+            elif obj.type == 'LIGHT':
+                if obj.data.type == 'SUN':
+                    self.suns.add(name)
+                elif obj.data.type in ('POINT', 'SPOT', 'AREA'):
+                    self.other_lights.add(name)
+
+        # Collision objects together with everything parented under them
+        for obj in self.objects:
+            parent = obj
+            while parent is not None:
+                if parent.name in self.collisions:
+                    self.collision_trees.add(obj.name)
+                    break
+                parent = parent.parent
+
+    def is_collision(self, obj):
+        return obj.name in self.collisions
+
+    def is_collision_tree(self, obj):
+        return obj.name in self.collision_trees
+
+    def is_lod(self, obj):
+        return obj.name in self.lods
+
+def classify_objects(objects=None):
+    return EntityIndex(bpy.data.objects if objects is None else objects)
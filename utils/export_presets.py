@@ -0,0 +1,139 @@
+import bpy
+import os
+import ast
+from .template_cache import TEMPLATES_DIR
+
+# Settings passed on to export_scene.gltf; the rest of a saved preset is UI state or output paths
+EXTRA_SETTINGS = {'use_selection', 'use_visible', 'use_active_collection', 'use_active_scene'}
+
+MAIN_PRESET = "Vircadia_GLTF"
+COLLISION_PRESET = "Vircadia_Collisions"
+
+# Presets made from another preset with a few settings changed: name -> (base preset, overrides)
+DERIVED_PRESETS = {
+    # Seconds instead of minutes for look-dev: no Draco, no image re-encoding
+    "Vircadia_Preview": (MAIN_PRESET, {
+        'export_draco_mesh_compression_enable': False,
+        'export_image_format': 'AUTO',
+        'export_optimize_animation_size': False,
+    }),
+}
+
+# Value types accepted for each kind of operator property
+RNA_TYPES = {
+    'BOOLEAN': (bool,),
+    'INT': (int,),
+    'FLOAT': (int, float),
+    'STRING': (str,),
+    'ENUM': (str,),
+}
+
+# Preset path -> (mtime, ExportPreset), and derived preset name -> (base ExportPreset, ExportPreset)
+_presets = {}
+
+class ExportPreset:
+    # Parsed and validated glTF operator preset. settings is shared, so never modify it;
+    # export_settings returns a copy for one export.
+
+    def __init__(self, name, settings, path=None):
+        self.name = name
+        self.settings = settings
+        self.path = path
+
+    def export_settings(self, filepath=None):
+        settings = dict(self.settings)
+        if filepath is not None:
+            settings['filepath'] = filepath
+        return settings
+
+    def derive(self, name, overrides):
+        return ExportPreset(name, validate_settings(dict(self.settings, **overrides), name))
+
+def preset_path(name):
+    return os.path.join(TEMPLATES_DIR, name if name.endswith(".py") else f"{name}.py")
+
+def parse_preset(path):
+    # Presets are scripts written by Blender's operator preset menu: one "op.<name> = <literal>" per line.
+    # Values are read as Python literals, so '1.0' stays a string and 1.0 a float.
+    with open(path, 'r') as f:
+        tree = ast.parse(f.read(), filename=path)
+
+    settings = {}
+    for node in tree.body:
+        if not isinstance(node, ast.Assign) or len(node.targets) != 1:
+            continue
+        target = node.targets[0]
+        if not (isinstance(target, ast.Attribute) and isinstance(target.value, ast.Name) and target.value.id == 'op'):
+            continue
+        try:
+            settings[target.attr] = ast.literal_eval(node.value)
+        except ValueError:
+            raise ValueError(f"{os.path.basename(path)}, line {node.lineno}: value of '{target.attr}' is not a literal")
+
+    return {key: value for key, value in settings.items() if key.startswith('export_') or key in EXTRA_SETTINGS}
+
+def operator_properties():
+    # Properties of the installed glTF exporter, or None when it isn't available
+    try:
+        return {prop.identifier: prop for prop in bpy.ops.export_scene.gltf.get_rna_type().properties}
+    except (AttributeError, KeyError, RuntimeError):
+        return None
+
+def validate_settings(settings, preset_name):
+    # Drop settings this Blender's exporter doesn't know or would reject, so one bad line in a
+    # preset saved by another version doesn't fail the whole export
+    properties = operator_properties()
+    if properties is None:
+        return settings
+
+    valid = {}
+    for key, value in settings.items():
+        prop = properties.get(key)
+        if prop is None:
+            print(f"Preset {preset_name}: ignoring '{key}', not supported by this glTF exporter")
+            continue
+        expected = RNA_TYPES.get(prop.type)
+        if expected is None or getattr(prop, 'is_array', False) or getattr(prop, 'is_enum_flag', False):
+            valid[key] = value
+            continue
+        if not isinstance(value, expected) or (prop.type != 'BOOLEAN' and isinstance(value, bool)):
+            print(f"Preset {preset_name}: ignoring '{key}', expected {prop.type.lower()} but got {value!r}")
+            continue
+        if prop.type == 'ENUM' and value not in {item.identifier for item in prop.enum_items}:
+            print(f"Preset {preset_name}: ignoring '{key}', '{value}' is not one of its options")
+            continue
+        valid[key] = float(value) if prop.type == 'FLOAT' else value
+    return valid
+
+def get_preset(name):
+    # Parsed preset, reloaded only when its file changes on disk
+    if name in DERIVED_PRESETS:
+        # Rebuilt whenever its base preset is reloaded
+        base_name, overrides = DERIVED_PRESETS[name]
+        base = get_preset(base_name)
+        cached = _presets.get(name)
+        if cached is None or cached[0] is not base:
+            cached = (base, base.derive(name, overrides))
+            _presets[name] = cached
+        return cached[1]
+
+    path = preset_path(name)
+    mtime = os.stat(path).st_mtime_ns
+    cached = _presets.get(path)
+    if cached is None or cached[0] != mtime:
+        preset_name = os.path.splitext(os.path.basename(path))[0]
+        cached = (mtime, ExportPreset(preset_name, validate_settings(parse_preset(path), preset_name), path))
+        _presets[path] = cached
+    return cached[1]
+
+def list_presets():
+    # Preset files shipped in templates/, followed by the derived presets
+    names = sorted(
+        os.path.splitext(filename)[0]
+        for filename in os.listdir(TEMPLATES_DIR)
+        if filename.endswith(".py") and not filename.startswith("_")
+    )
+    return names + [name for name in DERIVED_PRESETS if name not in names]
+
+def clear():
+    _presets.clear()
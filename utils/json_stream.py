@@ -0,0 +1,139 @@
+import json
+import math
+
+# Characters read per refill; a single value may span any number of chunks
+CHUNK_SIZE = 1 << 20
+
+WHITESPACE = " \t\n\r"
+
+# Characters that can continue a number; "2." or "1e" decode as 2 and 1 if the rest is still unread
+NUMBER_CHARS = "0123456789.eE+-"
+
+class ChunkedJSONReader:
+    # Decodes one JSON value at a time from a text file, keeping only the unread tail in memory
+
+    def __init__(self, f, chunk_size=CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def fill(self, size=None):
+        if self.eof:
+            return False
+        chunk = self.f.read(size or self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        # Drop what has been consumed before growing the buffer
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        # Next non-whitespace character, or "" at end of file
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, chars):
+        char = self.peek()
+        if not char or char not in chars:
+            raise json.JSONDecodeError(f"Expected one of {chars!r}", self.buffer, self.pos)
+        self.pos += 1
+        return char
+
+    def decode_value(self):
+        self.peek()
+        read_size = self.chunk_size
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # Most likely the value runs past the buffer; read more, doubling so huge values stay linear
+                if not self.fill(read_size):
+                    raise
+                read_size *= 2
+                continue
+            # A number is only complete once something other than a number character follows it
+            if isinstance(value, (int, float)) and not self.eof and self.number_may_continue(end):
+                if self.fill(read_size):
+                    read_size *= 2
+                    continue
+            self.pos = end
+            return value
+
+    def number_may_continue(self, end):
+        return end == len(self.buffer) or self.buffer[end] in NUMBER_CHARS
+
+    def iter_array(self):
+        # Yield the elements of the array starting at the current position
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.decode_value()
+            if self.expect(",]") == "]":
+                return
+
+def iter_array_items(f, key, chunk_size=CHUNK_SIZE):
+    # Yield each element of the top-level object's `key` array without loading the whole document.
+    # Other top-level values are decoded and discarded as they are passed.
+    reader = ChunkedJSONReader(f, chunk_size)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        name = reader.decode_value()
+        reader.expect(":")
+        if name == key and reader.peek() == "[":
+            yield from reader.iter_array()
+        else:
+            reader.decode_value()
+        if reader.expect(",}") == "}":
+            return
+
+def round_floats(value, precision):
+    # Copy with every float rounded; json then prints the shortest form, e.g. 0.30000000000000004 -> 0.3
+    if isinstance(value, float):
+        return round(value, precision) if math.isfinite(value) else value
+    if isinstance(value, dict):
+        return {key: round_floats(item, precision) for key, item in value.items()}
+    if isinstance(value, list):
+        return [round_floats(item, precision) for item in value]
+    return value
+
+def write_array_document(f, key, items, header=None, indent=None, float_precision=None):
+    # Write {<header fields>, key: [items...]} taking items one at a time, so the whole document
+    # never has to exist in memory. Each value goes through json.dumps, which uses the C encoder
+    # unless indent is set. Returns the number of items written.
+    separator = ":" if indent is None else ": "
+    newline = "" if indent is None else "\n"
+
+    def pad(level):
+        return "" if indent is None else " " * (indent * level)
+
+    def encode(value, level):
+        if float_precision is not None:
+            value = round_floats(value, float_precision)
+        text = json.dumps(value, indent=indent, separators=(",", separator))
+        # Strings are escaped, so every newline in the output is indentation
+        return text.replace("\n", "\n" + pad(level)) if indent is not None else text
+
+    f.write("{")
+    for name, value in (header or {}).items():
+        f.write(newline + pad(1) + json.dumps(name) + separator + encode(value, 1) + ",")
+    f.write(newline + pad(1) + json.dumps(key) + separator + "[")
+    count = 0
+    for item in items:
+        f.write(("," if count else "") + newline + pad(2) + encode(item, 2))
+        count += 1
+    f.write((newline + pad(1) if count else "") + "]" + newline + "}")
+    return count
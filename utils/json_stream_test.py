@@ -0,0 +1,71 @@
+import io
+import json
+import unittest
+from . import json_stream
+
+DOCUMENT = json.dumps({
+    "DataVersion": 3,
+    "Scale": 1.25e3,
+    "Entities": [
+        1, 2.5, 123456, -7, 1e-5, -2E+2, True, None, "text, with [brackets]",
+        {"name": "Box", "position": {"x": 0.125, "y": -3.5, "z": 1e10}, "tags": []},
+        [], {},
+    ],
+    "Offset": -0.5,
+}, indent=1)
+
+def read_items(text, key, chunk_size):
+    return list(json_stream.iter_array_items(io.StringIO(text), key, chunk_size))
+
+class TestIterArrayItems(unittest.TestCase):
+    def test_every_chunk_size(self):
+        # Every possible split point, including the middle of numbers such as "2." + "5"
+        expected = json.loads(DOCUMENT)["Entities"]
+        for chunk_size in range(1, len(DOCUMENT) + 2):
+            self.assertEqual(read_items(DOCUMENT, "Entities", chunk_size), expected, f"chunk size {chunk_size}")
+
+    def test_numbers_split_at_chunk_boundary(self):
+        for chunk_size in (1, 2, 3):
+            self.assertEqual(read_items('{"Entities":[1, 2.5, 123456, -7]}', "Entities", chunk_size), [1, 2.5, 123456, -7])
+            self.assertEqual(read_items('{"Scale":12.75,"Entities":[3]}', "Entities", chunk_size), [3])
+
+    def test_empty_and_missing(self):
+        self.assertEqual(read_items('{"Entities":[]}', "Entities", 4), [])
+        self.assertEqual(read_items('{}', "Entities", 4), [])
+        self.assertEqual(read_items('{"Other":[1,2]}', "Entities", 4), [])
+
+    def test_truncated_document_raises(self):
+        for chunk_size in (1, 7, 4096):
+            with self.assertRaises(json.JSONDecodeError):
+                read_items('{"Entities":[{"a":1},{"b":2', "Entities", chunk_size)
+            with self.assertRaises(json.JSONDecodeError):
+                read_items('{"Entities":[1, 2.', "Entities", chunk_size)
+
+class TestWriteArrayDocument(unittest.TestCase):
+    def round_trip(self, **options):
+        items = json.loads(DOCUMENT)["Entities"]
+        f = io.StringIO()
+        count = json_stream.write_array_document(f, "Entities", iter(items), header={"DataVersion": 3}, **options)
+        self.assertEqual(count, len(items))
+        return json.loads(f.getvalue())
+
+    def test_compact(self):
+        document = self.round_trip()
+        self.assertEqual(document["DataVersion"], 3)
+        self.assertEqual(document["Entities"], json.loads(DOCUMENT)["Entities"])
+
+    def test_indented(self):
+        self.assertEqual(self.round_trip(indent=2)["Entities"], json.loads(DOCUMENT)["Entities"])
+
+    def test_float_precision(self):
+        document = self.round_trip(float_precision=2)
+        self.assertEqual(document["Entities"][1], 2.5)
+        self.assertEqual(document["Entities"][9]["position"]["x"], 0.12)
+
+    def test_empty(self):
+        f = io.StringIO()
+        self.assertEqual(json_stream.write_array_document(f, "Entities", []), 0)
+        self.assertEqual(json.loads(f.getvalue()), {"Entities": []})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,7 @@
 import bpy
 import os
 from mathutils import Vector
-from . import coordinate_utils, collection_utils, property_utils
+from . import coordinate_utils, collection_utils, property_utils, primitive_cache
 
 def extract_filename_from_url(url):
     return os.path.basename(url)
@@ -19,7 +19,21 @@ def get_blender_object_type(vircadia_type):
     }
     return type_mapping.get(vircadia_type.lower(), "EMPTY")
 
-def create_blender_object(entity):
+def create_object_data(blender_type, name):
+    # Datablock for a new entity object; None makes an empty
+    if blender_type == "MESH":
+        # Shapes and zones share one unit cube, sized through the object's scale
+        return primitive_cache.get_primitive_mesh("box")
+    if blender_type == "LIGHT":
+        return bpy.data.lights.new(name, type='POINT')
+    if blender_type == "FONT":
+        return bpy.data.curves.new(name, type='FONT')
+    return None
+
+def create_blender_object(entity, collections=None):
+    # Built with the data API rather than bpy.ops, so there are no operator undo pushes or
+    # view layer updates per entity; bulk callers update the view layer once when done.
+    # collections: optional dict reused across calls to cache the type collections.
     vircadia_type = entity.get("type", "").lower()
     shape_type = entity.get("shape", "").lower()
 
@@ -38,22 +52,19 @@ def create_blender_object(entity):
         custom_name = vircadia_type
         blender_name = entity.get("name", vircadia_type)
 
-    collection = collection_utils.get_or_create_collection(vircadia_type)
-    bpy.context.view_layer.active_layer_collection = bpy.context.view_layer.layer_collection.children[collection.name]
-
-    if vircadia_type == "zone":
-        bpy.ops.mesh.primitive_cube_add(size=1, enter_editmode=False, align='WORLD', location=(0, 0, 0), scale=(1, 1, 1))
-    elif blender_type == "MESH":
-        bpy.ops.mesh.primitive_cube_add(size=1, enter_editmode=False, align='WORLD', location=(0, 0, 0), scale=(1, 1, 1))
-    elif blender_type == "LIGHT":
-        bpy.ops.object.light_add(type='POINT', location=(0, 0, 0))
-    elif blender_type == "FONT":
-        bpy.ops.object.text_add(location=(0, 0, 0))
+    if collections is None:
+        collection = collection_utils.get_or_create_collection(vircadia_type)
     else:
-        bpy.ops.object.empty_add(type='PLAIN_AXES')
-
-    obj = bpy.context.active_object
-    obj.name = blender_name
+        collection = collections.get(vircadia_type)
+        if collection is None:
+            collection = collections[vircadia_type] = collection_utils.get_or_create_collection(vircadia_type)
+
+    obj = bpy.data.objects.new(blender_name, create_object_data(blender_type, blender_name))
+    if obj.type == 'EMPTY':
+        obj.empty_display_type = 'PLAIN_AXES'
+    elif primitive_cache.is_shared_primitive(obj.data):
+        primitive_cache.use_object_materials(obj)
+    collection.objects.link(obj)
 
     # Set the custom "name" property
     obj["name"] = custom_name
@@ -0,0 +1,164 @@
+import bpy
+import hashlib
+from array import array
+from bpy.app.handlers import persistent
+
+# Marks a mesh as the shared datablock of a primitive shape, and records its pristine geometry
+PRIMITIVE_PROPERTY = "vircadia_primitive"
+FINGERPRINT_PROPERTY = "vircadia_primitive_fingerprint"
+
+# Corners and quads of a 1m cube centred on the origin, matching primitive_cube_add(size=1)
+UNIT_CUBE_VERTICES = [
+    (-0.5, -0.5, -0.5), (-0.5, -0.5, 0.5), (-0.5, 0.5, -0.5), (-0.5, 0.5, 0.5),
+    (0.5, -0.5, -0.5), (0.5, -0.5, 0.5), (0.5, 0.5, -0.5), (0.5, 0.5, 0.5),
+]
+UNIT_CUBE_FACES = [
+    (0, 1, 3, 2), (2, 3, 7, 6), (6, 7, 5, 4), (4, 5, 1, 0), (2, 6, 4, 0), (7, 3, 1, 5),
+]
+
+# Shape name -> shared mesh; references go stale on undo and file load, so handlers clear it
+_meshes = {}
+
+def build_unit_cube(name):
+    mesh = bpy.data.meshes.new(name)
+    mesh.from_pydata(UNIT_CUBE_VERTICES, [], UNIT_CUBE_FACES)
+    # Every face gets the full 0-1 square, so textures map once per side
+    uv_layer = mesh.uv_layers.new(name="UVMap")
+    uv_layer.data.foreach_set("uv", [0.0, 0.0, 1.0, 0.0, 1.0, 1.0, 0.0, 1.0] * len(UNIT_CUBE_FACES))
+    mesh.update()
+    return mesh
+
+PRIMITIVE_BUILDERS = {
+    "box": build_unit_cube,
+}
+
+def mesh_fingerprint(mesh):
+    # Hash of positions, topology and UVs, cheap for the handful of vertices a primitive has
+    digest = hashlib.sha1()
+    co = array('f', [0.0]) * (len(mesh.vertices) * 3)
+    mesh.vertices.foreach_get("co", co)
+    digest.update(co.tobytes())
+    loop_vertices = array('i', [0]) * len(mesh.loops)
+    mesh.loops.foreach_get("vertex_index", loop_vertices)
+    digest.update(loop_vertices.tobytes())
+    for uv_layer in mesh.uv_layers:
+        uvs = array('f', [0.0]) * (len(uv_layer.data) * 2)
+        uv_layer.data.foreach_get("uv", uvs)
+        digest.update(uv_layer.name.encode())
+        digest.update(uvs.tobytes())
+    return digest.hexdigest()
+
+def is_shared_primitive(mesh):
+    return isinstance(mesh, bpy.types.Mesh) and PRIMITIVE_PROPERTY in mesh
+
+def ensure_material_slot(mesh):
+    # The shared mesh carries one empty slot that its users link to the object, see use_object_materials
+    if len(mesh.materials) == 0:
+        mesh.materials.append(None)
+
+def use_object_materials(obj):
+    # Slots on a shared primitive hold their material on the object, so giving one entity a
+    # material doesn't change every other entity using the mesh
+    for slot in obj.material_slots:
+        slot.link = 'OBJECT'
+
+def has_data_materials(mesh):
+    # Materials assigned to the mesh itself would show on every user
+    return any(mat is not None for mat in mesh.materials)
+
+def find_primitive_mesh(shape):
+    mesh = _meshes.get(shape)
+    if mesh is not None:
+        try:
+            if mesh.get(PRIMITIVE_PROPERTY) == shape:
+                return mesh
+        except ReferenceError:
+            pass
+    # After a reload the shared mesh is still in the file, just not in the cache
+    for mesh in bpy.data.meshes:
+        if mesh.library is None and mesh.get(PRIMITIVE_PROPERTY) == shape:
+            ensure_material_slot(mesh)
+            _meshes[shape] = mesh
+            return mesh
+    return None
+
+def get_primitive_mesh(shape):
+    # One mesh per primitive shape, shared by every entity and sized through the object transform
+    mesh = find_primitive_mesh(shape)
+    if mesh is None:
+        mesh = PRIMITIVE_BUILDERS[shape](f"vircadia_primitive_{shape}")
+        mesh[PRIMITIVE_PROPERTY] = shape
+        mesh[FINGERPRINT_PROPERTY] = mesh_fingerprint(mesh)
+        ensure_material_slot(mesh)
+        _meshes[shape] = mesh
+    return mesh
+
+def new_primitive_object(name, shape, collection):
+    obj = bpy.data.objects.new(name, get_primitive_mesh(shape))
+    use_object_materials(obj)
+    collection.objects.link(obj)
+    return obj
+
+def unmark_primitive(mesh):
+    for key in (PRIMITIVE_PROPERTY, FINGERPRINT_PROPERTY):
+        if key in mesh:
+            del mesh[key]
+
+def make_single_user(obj):
+    # Give obj its own copy of a shared primitive before its geometry or mesh materials are changed
+    if obj.type != 'MESH' or not is_shared_primitive(obj.data):
+        return False
+    mesh = obj.data.copy()
+    unmark_primitive(mesh)
+    mesh.name = obj.name
+    obj.data = mesh
+    return True
+
+def split_edited_primitive(mesh):
+    # The mesh no longer matches its primitive, in geometry or through a material assigned to the
+    # mesh itself: the object that changed it keeps it, everyone else moves to a fresh shared copy
+    shape = mesh[PRIMITIVE_PROPERTY]
+    unmark_primitive(mesh)
+    if _meshes.get(shape) == mesh:
+        del _meshes[shape]
+
+    editor = bpy.context.view_layer.objects.active if bpy.context.view_layer else None
+    if editor is None or editor.data != mesh:
+        # Changed by a script rather than by editing one object; all users keep the change
+        return
+    mesh.name = editor.name
+    pristine = get_primitive_mesh(shape)
+    for obj in bpy.data.objects:
+        if obj.data == mesh and obj != editor:
+            obj.data = pristine
+            use_object_materials(obj)
+    print(f"Vircadia: {editor.name} now has its own mesh, other {shape} entities keep the shared one")
+
+@persistent
+def primitive_edit_handler(scene, depsgraph):
+    for update in depsgraph.updates:
+        # Not only geometry updates: material slot changes on the mesh come through as other updates
+        if not isinstance(update.id, bpy.types.Mesh):
+            continue
+        mesh = update.id.original
+        # Edit mode changes only reach the mesh on leaving edit mode, which is when they are checked
+        if not is_shared_primitive(mesh) or mesh.is_editmode:
+            continue
+        if has_data_materials(mesh) or mesh_fingerprint(mesh) != mesh.get(FINGERPRINT_PROPERTY):
+            split_edited_primitive(mesh)
+
+@persistent
+def primitive_cache_load_post(dummy):
+    _meshes.clear()
+
+def register():
+    bpy.app.handlers.depsgraph_update_post.append(primitive_edit_handler)
+    bpy.app.handlers.load_post.append(primitive_cache_load_post)
+    bpy.app.handlers.undo_post.append(primitive_cache_load_post)
+    bpy.app.handlers.redo_post.append(primitive_cache_load_post)
+
+def unregister():
+    bpy.app.handlers.redo_post.remove(primitive_cache_load_post)
+    bpy.app.handlers.undo_post.remove(primitive_cache_load_post)
+    bpy.app.handlers.load_post.remove(primitive_cache_load_post)
+    bpy.app.handlers.depsgraph_update_post.remove(primitive_edit_handler)
@@ -0,0 +1,47 @@
+import os
+import json
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "templates")
+
+# Template path -> (mtime, parsed template), shared by every exporter and operator
+_templates = {}
+
+# (filename, compiler) -> (parsed template, compiled result); recompiled when the template reloads
+_compiled = {}
+
+def copy_template(value):
+    # Structural copy of parsed JSON: new dicts and lists, shared immutable strings and numbers.
+    # Much cheaper than copy.deepcopy, which has to handle arbitrary objects and cycles.
+    if isinstance(value, dict):
+        return {key: copy_template(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [copy_template(item) for item in value]
+    return value
+
+def get_template(filename):
+    # Parsed template, reloaded only when the file changes on disk. Shared, so never modify it;
+    # use load_template for a copy that can be filled in.
+    path = os.path.join(TEMPLATES_DIR, filename)
+    mtime = os.stat(path).st_mtime_ns
+    cached = _templates.get(path)
+    if cached is None or cached[0] != mtime:
+        with open(path, 'r') as f:
+            cached = (mtime, json.load(f))
+        _templates[path] = cached
+    return cached[1]
+
+def load_template(filename):
+    return copy_template(get_template(filename))
+
+def get_compiled(filename, compiler):
+    # Result of compiler(template), computed once per version of the template file
+    template = get_template(filename)
+    cached = _compiled.get((filename, compiler))
+    if cached is None or cached[0] is not template:
+        cached = (template, compiler(template))
+        _compiled[(filename, compiler)] = cached
+    return cached[1]
+
+def clear():
+    _templates.clear()
+    _compiled.clear()
@@ -1,15 +1,18 @@
 import bpy
+from . import entity_index
 
-def update_visibility(scene, context):
-    for obj in bpy.data.objects:
-        update_object_visibility(obj, scene)
+def update_visibility(scene, context, index=None):
+    if index is None:
+        index = entity_index.classify_objects()
+    for obj in index.objects:
+        update_object_visibility(obj, scene, index)
 
-def update_object_visibility(obj, scene):
+def update_object_visibility(obj, scene, index=None):
     # Check if object is a collision object
-    is_collision = any(name in obj.name.lower() for name in ["collision", "collider", "collides", "collisions", "colliders"])
+    is_collision = index.is_collision(obj) if index else entity_index.is_collision_name(obj.name)
 
     # Check if object is an LOD level (except LOD0)
-    is_lod = any(f"_LOD{i}" in obj.name for i in range(1, 100))  # Checking up to LOD99
+    is_lod = index.is_lod(obj) if index else entity_index.is_lod_name(obj.name)
 
     # Update visibility based on settings
     if is_collision: